@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_archive.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Compare extracting an archive before the run with the
+             ArchiveStorage that reads the archive directly.  The synthetic
+             corpus is packed as a zip or a tar.gz, then each way copies
+             every image into the year folders and dates it, the
+             metadata-only pipeline.  The names and the modified times of
+             both destinations must be the same, except for the files dated
+             by their creation time.  Run from the 'application' directory:
+
+             python -m Benchmark.bench_archive --count 500 --format tgz
+"""
+
+import argparse, os, shutil, tarfile, tempfile, time, zipfile
+from Benchmark.synthetic_corpus import MANIFEST_FILE, generate_corpus
+from Processor.process_directory import ProcessDirectory
+from Processor.process_image import ProcessImage
+from Processor.storage import Storage, get_storage
+
+
+def run(storage: Storage, source: str, destination: str) -> list[tuple[str, int]]:
+    """
+    Returns:
+        list[tuple[str, int]]: New name and modified time of the files dated
+        by their EXIF, their Takeout JSON or their name
+    """
+
+    process_image: ProcessImage = ProcessImage()
+    process_image.set_storage(storage)
+    filepaths: list[str] = list(
+        ProcessDirectory(storage).build_file_queue(source, True)
+    )
+    storage.prefetch(filepaths)
+    dated: list[str] = []
+    for filepath in filepaths:
+        process_image.init(filepath)
+        process_image.process_move_image_to_folder(False, True, destination)
+        process_image.process_created_date()
+        if process_image.get_date_source() != "file":
+            dated.append(process_image.get_filepath())
+    storage.close()
+    return sorted(
+        (os.path.relpath(filepath, destination), int(os.stat(filepath).st_mtime))
+        for filepath in dated
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--format", choices=("zip", "tgz"), default="zip")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus: str = os.path.join(directory, "corpus")
+        # Smaller images, the corpus is generated faster
+        generate_corpus(corpus, args.count, sizes=((1024, 768),))
+        os.remove(os.path.join(corpus, MANIFEST_FILE))
+
+        archive: str = os.path.join(directory, f"corpus.{args.format}")
+        if args.format == "zip":
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as file:
+                for path, _, filenames in os.walk(corpus):
+                    for filename in sorted(filenames):
+                        filepath: str = os.path.join(path, filename)
+                        file.write(filepath, os.path.relpath(filepath, directory))
+        else:
+            with tarfile.open(archive, "w:gz") as file:
+                file.add(corpus, "corpus")
+
+        start: float = time.perf_counter()
+        extracted: str = os.path.join(directory, "extracted")
+        shutil.unpack_archive(archive, extracted)
+        expected: list[tuple[str, int]] = run(
+            get_storage(), extracted, os.path.join(directory, "extracted-out")
+        )
+        extract_time: float = time.perf_counter() - start
+        extract_bytes: int = sum(
+            os.path.getsize(os.path.join(path, filename))
+            for path, _, filenames in os.walk(extracted)
+            for filename in filenames
+        )
+        shutil.rmtree(extracted)
+
+        start = time.perf_counter()
+        actual: list[tuple[str, int]] = run(
+            get_storage(paths=(archive,)), archive, os.path.join(directory, "out")
+        )
+        stream_time: float = time.perf_counter() - start
+
+        print(
+            f"{'Extracted':>10}: {extract_time:7.2f}s "
+            f"{args.count / extract_time:8.1f} files/s "
+            f"{extract_bytes / 2**20:8.1f} MiB extracted"
+        )
+        print(
+            f"{'Streamed':>10}: {stream_time:7.2f}s "
+            f"{args.count / stream_time:8.1f} files/s "
+            f"{0:8.1f} MiB extracted"
+        )
+        if not expected or actual != expected:
+            raise SystemExit("The archive and the extracted files differ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_cold_start.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Cold start of each AI backend, loaded from the Hugging Face hub
+             cache as before and from the snapshot written by
+             prepare_models.py.  Every load runs in a new interpreter, so
+             the time includes importing torch and transformers, and the
+             peak memory of the process is reported with it.  Drop the page
+             cache between runs for a truly cold disk.  Run from the
+             'application' directory after 'python prepare_models.py':
+
+             python -m Benchmark.bench_cold_start --repeat 3
+             python -m Benchmark.bench_cold_start --backends ClipProcessor
+"""
+
+import argparse, json, os, resource, statistics, subprocess, sys, tempfile, time
+
+BACKENDS: tuple[str, ...] = ("HuggingFacePipeline", "ClipProcessor", "AutomodelLLM")
+MODULES: dict[str, str] = {
+    "HuggingFacePipeline": "Processor.AIProessor.huggingface_pipeline",
+    "ClipProcessor": "Processor.AIProessor.clip_processor",
+    "AutomodelLLM": "Processor.AIProessor.automodel_llm",
+}
+
+
+def load(backend: str) -> None:
+    """
+    Child process: load the backend and print the timings as JSON.
+    """
+
+    start: float = time.perf_counter()
+    import importlib, torch
+
+    imported: float = time.perf_counter()
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    getattr(importlib.import_module(MODULES[backend]), backend)(device)
+    loaded: float = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import": imported - start,
+                "load": loaded - imported,
+                "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+        )
+    )
+
+
+def run(backend: str, models_dir: str | None) -> dict[str, float]:
+    """
+    Args:
+        models_dir (str | None): Snapshot directory, None for the default
+            one.  An empty directory loads from the hub cache.
+    """
+
+    application_dir: str = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))
+    )
+    env: dict[str, str] = dict(os.environ)
+    if models_dir is not None:
+        env["IMAGE_PROCESSOR_MODELS"] = models_dir
+    completed = subprocess.run(
+        [sys.executable, "-m", "Benchmark.bench_cold_start", "--child", backend],
+        cwd=application_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Could not load [{backend}]\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        load(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as no_snapshots:
+        for backend in args.backends:
+            for name, models_dir in (("hub", no_snapshots), ("snapshot", None)):
+                runs = [run(backend, models_dir) for _ in range(args.repeat)]
+                print(
+                    f"{backend:20} {name:8} "
+                    f"import {statistics.median(r['import'] for r in runs):6.2f} s "
+                    f"load {statistics.median(r['load'] for r in runs):6.2f} s "
+                    f"max rss {max(r['max_rss'] for r in runs) / 1024:7.0f} MB"
+                )
+
+
+if __name__ == "__main__":
+    main()
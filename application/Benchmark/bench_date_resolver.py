@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_date_resolver.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Micro-benchmark of the per-file date resolution.  Compares the
+             previous approach (a loop over uncompiled patterns and strptime
+             attempts) against the DateResolver.  Run from the 'application'
+             directory:
+
+             python -m Benchmark.bench_date_resolver
+"""
+
+import argparse, datetime, re, timeit
+from Processor.date_resolver import DateResolver
+
+FILENAMES: tuple[str, ...] = (
+    "20230514_183022.jpg",
+    "2023-05-14_18-30-22.jpg",
+    "20230514.jpg",
+    "2023-05-14 vacation.png",
+    "IMG_4821.jpg",
+    "DSC00001.JPG",
+)
+TIMESTAMPS: tuple[str, ...] = (
+    "2023:05:14 18:30:22",
+    "2023-05-14 18:30:22",
+    "2023-05-14 18:30:22.250000",
+)
+
+
+def legacy_filename(filename: str) -> datetime.datetime | None:
+    for pattern in (
+        r"^(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})",
+        r"^(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})",
+        r"^(\d{4})(\d{2})(\d{2})",
+        r"^(\d{4})-(\d{2})-(\d{2})",
+    ):
+        match = re.match(pattern, filename)
+        if match:
+            return datetime.datetime(*(int(value) for value in match.groups()))
+    return None
+
+
+def legacy_timestamp(timestamp: str) -> datetime.datetime | None:
+    for format in ("%Y:%m:%d %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M:%S.%f"):
+        try:
+            return datetime.datetime.strptime(timestamp, format)
+        except ValueError:
+            pass
+    return None
+
+
+def legacy_strip(filename: str) -> str:
+    patterns = [
+        r"\d{4}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\.: ]?\d{1,2}[-_\.: ]?\d{1,2}",
+        r"\d{4}[-_\.]\d{1,2}[-_\.]\d{1,2}",
+        r"\d{14}",
+        r"\d{8}",
+    ]
+    return re.compile(r"^(" + "|".join(patterns) + r")\s*[-_]?\s*").sub("", filename)
+
+
+def report(name: str, statement, count: int, items: int) -> None:
+    seconds: float = min(timeit.repeat(statement, number=count, repeat=5))
+    print(f"{name:<28} {seconds / (count * items) * 1e9:8.0f} ns per value")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    resolver: DateResolver = DateResolver()
+    for filename in FILENAMES:
+        assert resolver.from_filename(filename) == legacy_filename(filename), filename
+        assert resolver.strip_prefix(filename) == legacy_strip(filename), filename
+    for timestamp in TIMESTAMPS:
+        assert resolver.parse(timestamp) == legacy_timestamp(timestamp), timestamp
+
+    names: int = len(FILENAMES)
+    stamps: int = len(TIMESTAMPS)
+    report(
+        "filename (legacy)",
+        lambda: [legacy_filename(f) for f in FILENAMES],
+        args.number,
+        names,
+    )
+    report(
+        "filename (resolver)",
+        lambda: [resolver.from_filename(f) for f in FILENAMES],
+        args.number,
+        names,
+    )
+    report(
+        "filename batch (resolver)",
+        lambda: resolver.resolve_filenames(FILENAMES),
+        args.number,
+        names,
+    )
+    report(
+        "timestamp (legacy)",
+        lambda: [legacy_timestamp(t) for t in TIMESTAMPS],
+        args.number,
+        stamps,
+    )
+    report(
+        "timestamp (resolver)",
+        lambda: [resolver.parse(t) for t in TIMESTAMPS],
+        args.number,
+        stamps,
+    )
+    report(
+        "strip prefix (legacy)",
+        lambda: [legacy_strip(f) for f in FILENAMES],
+        args.number,
+        names,
+    )
+    report(
+        "strip prefix (resolver)",
+        lambda: [resolver.strip_prefix(f) for f in FILENAMES],
+        args.number,
+        names,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_file_queue.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Compare the memory used by a list of full paths against the
+             FileQueue for the same set of synthetic files.  Run from the
+             'application' directory:
+
+             python -m Benchmark.bench_file_queue --files 1000000
+"""
+
+import argparse, os, time, tracemalloc
+from typing import Callable, Generator
+from Processor.file_queue import FileQueue
+
+
+def synthetic_paths(
+    count: int, files_per_dir: int
+) -> Generator[tuple[str, str], None, None]:
+    """
+    Generate a photo-library-like layout with long directory prefixes.
+    """
+
+    root: str = os.path.join(
+        os.sep, "mnt", "nas", "photo_library", "family_archive", "camera_uploads"
+    )
+    for index in range(count):
+        year: int = 2000 + (index // files_per_dir) % 25
+        directory: str = os.path.join(
+            root, str(year), f"album_{index // files_per_dir:06d}"
+        )
+        yield directory, f"IMG_{index:08d}.jpg"
+
+
+def measure(build: Callable[[], object]) -> tuple[object, int, float]:
+    tracemalloc.start()
+    start: float = time.perf_counter()
+    container: object = build()
+    elapsed: float = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return container, current, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--files-per-dir", type=int, default=500)
+    args = parser.parse_args()
+
+    def build_list() -> list[str]:
+        return [
+            os.path.join(directory, filename)
+            for directory, filename in synthetic_paths(args.files, args.files_per_dir)
+        ]
+
+    def build_queue() -> FileQueue:
+        file_queue: FileQueue = FileQueue()
+        for directory, filename in synthetic_paths(args.files, args.files_per_dir):
+            file_queue.add(directory, filename)
+        return file_queue
+
+    per_million: float = 1_000_000 / args.files / (1024 * 1024)
+    for name, build in (("list[str]", build_list), ("FileQueue", build_queue)):
+        container, current, elapsed = measure(build)
+        print(
+            f"{name:>10}: {current * per_million:8.1f} MiB per million entries, "
+            f"build {elapsed:6.2f}s"
+        )
+        if isinstance(container, FileQueue):
+            print(
+                f"{'':>10}  nbytes() reports "
+                f"{container.nbytes() * per_million:8.1f} MiB per million entries"
+            )
+        del container
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_florence_tasks.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Marginal cost of each extra Florence-2 task.  The image is encoded
+             once per call to AutomodelLLM.process, so adding the OCR and the
+             object detection tasks should only add their decoding time and
+             not another pass of the vision encoder.  Needs a CUDA device and
+             the Florence-2 model.  Run from the 'application' directory:
+
+             python -m Benchmark.bench_florence_tasks image1.jpg image2.jpg
+"""
+
+import argparse, time
+import torch
+from PIL import Image
+from Processor.AIProessor.automodel_llm import AutomodelLLM
+from Processor.AIProessor.image_to_text_abstract import ImageTask
+
+SCENARIOS: tuple[tuple[str, frozenset[ImageTask]], ...] = (
+    ("caption", frozenset()),
+    ("caption + ocr", frozenset({ImageTask.OCR})),
+    ("caption + objects", frozenset({ImageTask.OBJECTS})),
+    ("caption + ocr + objects", frozenset({ImageTask.OCR, ImageTask.OBJECTS})),
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--level", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model: AutomodelLLM = AutomodelLLM("cuda")
+    images: list[Image.Image] = []
+    for filepath in args.images:
+        with Image.open(filepath) as image:
+            images.append(image.convert("RGB"))
+
+    # Warm up the kernels and the prompt cache
+    model.process(images[0], args.level)
+
+    results: dict[str, float] = {}
+    for name, tasks in SCENARIOS:
+        torch.cuda.synchronize()
+        start: float = time.perf_counter()
+        for _ in range(args.repeat):
+            for image in images:
+                model.process(image, args.level, tasks=tasks)
+        torch.cuda.synchronize()
+        results[name] = (time.perf_counter() - start) / args.repeat / len(images)
+
+    baseline: float = results["caption"]
+    for name, elapsed in results.items():
+        print(f"{name:26} {elapsed:8.3f} s per image  +{elapsed - baseline:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_generation_profiles.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Latency and output length of every generation profile, for the
+             captioning pipelines and for Florence-2.  The images are
+             preprocessed before the timing starts so only the generation is
+             measured.  Florence-2 needs a CUDA device and is skipped
+             without one.  Run from the 'application' directory:
+
+             python -m Benchmark.bench_generation_profiles image1.jpg image2.jpg
+"""
+
+import argparse, statistics, time
+import torch
+from PIL import Image
+from Processor.AIProessor.automodel_llm import AutomodelLLM
+from Processor.AIProessor.generation_profile import GENERATION_PROFILES
+from Processor.AIProessor.huggingface_pipeline import HuggingFacePipeline
+from Processor.AIProessor.image_pyramid import ImagePyramid
+from Processor.AIProessor.image_to_text_abstract import (
+    ImageDescription,
+    ImageToTextBase,
+)
+
+
+def bench(
+    backend: ImageToTextBase, images: list[Image.Image], repeat: int, device: str
+) -> None:
+    pyramids: list[ImagePyramid] = [
+        ImagePyramid(image, backend.get_preprocess_specs()) for image in images
+    ]
+    for level, profile in enumerate(GENERATION_PROFILES):
+        words: list[int] = []
+        start: float = time.perf_counter()
+        for _ in range(repeat):
+            for image, pyramid in zip(images, pyramids):
+                result = backend.process(
+                    image, level, backend.preprocess(pyramid), profile=profile
+                )
+                if isinstance(result, ImageDescription):
+                    result = result.captions
+                words.extend(len(text.split()) for text in result)
+        if device == "cuda":
+            torch.cuda.synchronize()
+        elapsed: float = (time.perf_counter() - start) / repeat / len(images)
+        print(
+            f"{backend.get_name():22} {profile.name:10} {elapsed:8.3f} s per image "
+            f"{statistics.mean(words):6.1f} words"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--repeat", type=int, default=2)
+    args = parser.parse_args()
+
+    device: str = "cuda" if torch.cuda.is_available() else "cpu"
+    images: list[Image.Image] = []
+    for filepath in args.images:
+        with Image.open(filepath) as image:
+            images.append(image.convert("RGB"))
+
+    backends: list[ImageToTextBase] = [HuggingFacePipeline(device)]
+    if device == "cuda":
+        backends.append(AutomodelLLM(device))
+    for backend in backends:
+        # Warm up the kernels and the prompt caches
+        backend.process(images[0], 0)
+        bench(backend, images, args.repeat, device)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_inference_pool.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Throughput and memory of the CPU inference pool for several
+             numbers of worker processes.  The models are loaded once and
+             the same ImageToText is reused for every run, as in the
+             application.  The throughput and the RSS/PSS of every worker
+             are also written to benchmark_inference_pool.log.  Run from the
+             'application' directory on a machine without a GPU:
+
+             python -m Benchmark.bench_inference_pool --workers 1 2 4 a.jpg b.jpg
+"""
+
+import argparse, logging, os, time
+import Helper.log_config as log_config
+from Processor.AIProessor.image_to_text import ImageToText
+from Processor.AIProessor.inference_pool import get_process_memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--repeat", type=int, default=4)
+    parser.add_argument("--level", type=int, default=0, choices=(0, 1, 2))
+    args = parser.parse_args()
+
+    log_config.setup_logging("benchmark_inference_pool.log", logging.INFO)
+    image_to_text: ImageToText = ImageToText()
+    filepaths: list[str] = args.images * args.repeat
+    parent_rss: int = get_process_memory(os.getpid()).get("rss", 0)
+    print(f"Parent rss {parent_rss / 1024**2:.0f} MB with the models loaded")
+
+    try:
+        for workers in args.workers:
+            os.environ["IMAGE_PROCESSOR_INFERENCE_WORKERS"] = str(workers)
+            start: float = time.perf_counter()
+            image_to_text.start_prefetch(filepaths, args.level)
+            for filepath in filepaths:
+                image_to_text.process(filepath, args.level)
+            elapsed: float = time.perf_counter() - start
+            # Stopping the pool writes the memory of every worker to the log
+            image_to_text.stop_prefetch()
+            print(
+                f"workers {workers:3} {len(filepaths) / elapsed:8.2f} files/s "
+                f"({elapsed:.1f} s)"
+            )
+    finally:
+        log_config.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_preprocess.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   CPU time of the image preprocessing for all of the captioning
+             backends.  Compares running the image processor of every model
+             on the full resolution image against one shared ImagePyramid,
+             and reports the largest difference of the pixel values.  The
+             image processors are built locally with the settings of the
+             models in use so nothing is downloaded.  With --batch, the
+             processors are called on a list of images and compared against
+             the PixelBatch path that normalizes the whole batch at once.
+             Run from the 'application' directory:
+
+             python -m Benchmark.bench_preprocess --width 8000 --height 6000
+             python -m Benchmark.bench_preprocess --width 1600 --batch 16
+"""
+
+import argparse, time
+import numpy as np
+from PIL import Image
+from transformers import BlipImageProcessor, CLIPImageProcessor, ViTImageProcessor
+from Processor.AIProessor.image_pyramid import (
+    ImagePyramid,
+    PixelBatch,
+    PreprocessSpec,
+)
+
+IMAGENET_MEAN: list[float] = [0.485, 0.456, 0.406]
+IMAGENET_STD: list[float] = [0.229, 0.224, 0.225]
+
+
+def build_processors() -> dict[str, object]:
+    return {
+        "vit-gpt2-coco-en": ViTImageProcessor(
+            size={"height": 224, "width": 224},
+            image_mean=[0.5, 0.5, 0.5],
+            image_std=[0.5, 0.5, 0.5],
+            resample=Image.Resampling.BILINEAR,
+        ),
+        "blip-image-captioning-base": BlipImageProcessor(),
+        "StreetCLIP": CLIPImageProcessor(
+            size={"shortest_edge": 336}, crop_size={"height": 336, "width": 336}
+        ),
+        "Florence-2-large": CLIPImageProcessor(
+            size={"height": 768, "width": 768},
+            do_center_crop=False,
+            image_mean=IMAGENET_MEAN,
+            image_std=IMAGENET_STD,
+        ),
+    }
+
+
+def build_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    """
+    Smooth gradient with some noise, closer to a photo than pure noise.
+    """
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    x: np.ndarray = np.linspace(0, 1, width)[None, :, None]
+    y: np.ndarray = np.linspace(0, 1, height)[:, None, None]
+    phase: np.ndarray = np.arange(3) + seed
+    pixels: np.ndarray = 127.5 + 127.5 * np.sin(6 * x + 3 * y + phase)
+    pixels += rng.integers(-10, 10, pixels.shape)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+def report(
+    reference: dict[str, np.ndarray],
+    values: dict[str, np.ndarray],
+    processor_time: float,
+    pyramid_time: float,
+) -> None:
+    for name in reference:
+        difference: np.ndarray = np.abs(reference[name] - values[name])
+        print(
+            f"{name:28} {str(values[name].shape):20} "
+            f"max diff {difference.max():.6f} mean diff {difference.mean():.6f}"
+        )
+    print(f"Image processors : {processor_time:8.3f} s CPU per image")
+    print(f"Shared pyramid   : {pyramid_time:8.3f} s CPU per image")
+
+
+def bench_single(
+    image: Image.Image,
+    processors: dict[str, object],
+    specs: dict[str, PreprocessSpec],
+    repeat: int,
+) -> None:
+    reference: dict[str, np.ndarray] = {}
+    start: float = time.process_time()
+    for _ in range(repeat):
+        for name, processor in processors.items():
+            reference[name] = processor(images=image, return_tensors="np")[
+                "pixel_values"
+            ][0]
+    processor_time: float = (time.process_time() - start) / repeat
+
+    values: dict[str, np.ndarray] = {}
+    start = time.process_time()
+    for _ in range(repeat):
+        pyramid: ImagePyramid = ImagePyramid(image, list(specs.values()))
+        for name, spec in specs.items():
+            values[name] = pyramid.pixel_array(spec)
+    pyramid_time: float = (time.process_time() - start) / repeat
+
+    report(reference, values, processor_time, pyramid_time)
+
+
+def bench_batch(
+    images: list[Image.Image],
+    processors: dict[str, object],
+    specs: dict[str, PreprocessSpec],
+    repeat: int,
+) -> None:
+    reference: dict[str, np.ndarray] = {}
+    start: float = time.process_time()
+    for _ in range(repeat):
+        for name, processor in processors.items():
+            reference[name] = processor(images=images, return_tensors="np")[
+                "pixel_values"
+            ]
+    processor_time: float = (time.process_time() - start) / repeat / len(images)
+
+    # The buffers are allocated once, as in the backends.
+    batches: dict[str, PixelBatch] = {
+        name: PixelBatch(spec) for name, spec in specs.items()
+    }
+    values: dict[str, np.ndarray] = {}
+    start = time.process_time()
+    for _ in range(repeat):
+        pyramids: list[ImagePyramid] = [
+            ImagePyramid(image, list(specs.values())) for image in images
+        ]
+        for name, batch in batches.items():
+            values[name] = batch.fill(pyramids).numpy()
+    pyramid_time: float = (time.process_time() - start) / repeat / len(images)
+
+    report(reference, values, processor_time, pyramid_time)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--batch", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processors: dict[str, object] = build_processors()
+    specs: dict[str, PreprocessSpec] = {
+        name: PreprocessSpec.from_image_processor(processor)
+        for name, processor in processors.items()
+    }
+
+    print(f"Image {args.width}x{args.height} batch {args.batch or 1}")
+    if args.batch:
+        images: list[Image.Image] = [
+            build_image(args.width, args.height, seed) for seed in range(args.batch)
+        ]
+        bench_batch(images, processors, specs, args.repeat)
+    else:
+        image: Image.Image = build_image(args.width, args.height)
+        bench_single(image, processors, specs, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_storage.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Compare the Storage and the LatencyAwareStorage on a synthetic
+             corpus with a latency added to every round trip, as on a NAS.
+             Each storage scans a fresh copy of the corpus, reads the dates,
+             moves the files into the year folders and renames them, the
+             metadata-only pipeline without the process pool.  The names
+             and the modified times of both copies must be the same, except
+             for the files dated by their creation time, which is the time
+             of the copy.  Run from the 'application' directory:
+
+             python -m Benchmark.bench_storage --count 200 --latency 2
+"""
+
+import argparse, os, shutil, tempfile, time
+from Benchmark.synthetic_corpus import MANIFEST_FILE, generate_corpus
+from Processor.process_directory import ProcessDirectory
+from Processor.process_image import ProcessImage
+from Processor.storage import LatencyAwareStorage, Storage
+
+
+def run(
+    storage: Storage, source: str, destination: str
+) -> tuple[float, list[tuple[str, int]]]:
+    """
+    Returns:
+        tuple[float, list[tuple[str, int]]]: Seconds to process every file
+        of the source, and the new name and modified time of the files
+        dated by their EXIF or their name
+    """
+
+    process_image: ProcessImage = ProcessImage()
+    process_image.set_storage(storage)
+    start: float = time.perf_counter()
+    filepaths: list[str] = list(
+        ProcessDirectory(storage).build_file_queue(source, True)
+    )
+    storage.prefetch(filepaths)
+    dated: list[str] = []
+    for filepath in filepaths:
+        process_image.init(filepath)
+        process_image.process_move_image_to_folder(True, False, destination)
+        process_image.process_created_date()
+        if process_image.get_date_source() != "file":
+            dated.append(process_image.get_filepath())
+    storage.close()
+    elapsed: float = time.perf_counter() - start
+    return elapsed, sorted(
+        (os.path.relpath(filepath, destination), int(os.stat(filepath).st_mtime))
+        for filepath in dated
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=2.0, help="Milliseconds per round trip"
+    )
+    parser.add_argument("--depth", type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus: str = os.path.join(directory, "corpus")
+        # Small images, the time is in the round trips
+        generate_corpus(corpus, args.count, sizes=((320, 240),))
+        os.remove(os.path.join(corpus, MANIFEST_FILE))
+
+        results: dict[str, tuple[float, list[tuple[str, int]]]] = {}
+        for name, storage in (
+            ("Storage", Storage(args.latency / 1000)),
+            ("LatencyAware", LatencyAwareStorage(args.depth, args.latency / 1000)),
+        ):
+            source: str = os.path.join(directory, f"{name}-source")
+            destination: str = os.path.join(directory, f"{name}-destination")
+            shutil.copytree(corpus, source)
+            elapsed, files = run(storage, source, destination)
+            results[name] = (elapsed, files)
+            print(
+                f"{name:>12}: {elapsed:7.2f}s {args.count / elapsed:8.1f} files/s "
+                f"({args.latency} ms per round trip)"
+            )
+
+        baseline, expected = results["Storage"]
+        elapsed, actual = results["LatencyAware"]
+        print(f"{'':>12}  speedup {baseline / elapsed:.1f}x")
+        if not expected or actual != expected:
+            raise SystemExit("The storages did not produce the same files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   bench_suite.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Throughput of every stage of the processing on a synthetic
+             corpus, see synthetic_corpus.py: the directory scan, the EXIF
+             read in ProcessImage.init, the comment write, the rename, the
+             copy and the move, the description with the stub backends and
+             the whole Worker loop.  Each stage that changes files works on
+             its own copy of the corpus.  The AI backends are replaced by the
+             stand-ins of stub_backends.py, so no network or GPU is needed.
+             The results are written as JSON and can be compared with an
+             earlier run.  Run from the 'application' directory:
+
+             python -m Benchmark.bench_suite --count 120 --output after.json
+             python -m Benchmark.bench_suite --corpus /tmp/corpus \\
+                 --stages init rename --compare before.json
+             python -m Benchmark.bench_suite --stages describe \\
+                 --memory memory.txt --memory-every 10
+"""
+
+import argparse, datetime, json, logging, os, platform, shutil, statistics
+import tempfile, time
+from typing import Any, Callable
+import Helper.log_config as log_config
+import Helper.memory_profile as memory_profile
+import Helper.tracing as tracing
+from Processor.process_directory import ProcessDirectory
+from Processor.process_image import ProcessImage
+from Benchmark import synthetic_corpus
+
+COMMENT: str = "A photo of a tree, a lake and a mountain. Written by the benchmark."
+
+
+############################################################################
+# stages
+############################################################################
+# Each stage gets the corpus directory, a scratch directory and the
+# arguments, and returns the time of every file or of every repetition.
+def stage_scan(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    rval: list[float] = []
+    for _ in range(args.repeat):
+        start: float = time.perf_counter()
+        ProcessDirectory().build_file_queue(corpus, True)
+        rval.append(time.perf_counter() - start)
+    return rval
+
+
+def stage_init(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    process_image: ProcessImage = ProcessImage()
+    return [
+        timed(process_image.init, filepath) for filepath in list_files(corpus)
+    ]
+
+
+def stage_write_comment(
+    corpus: str, scratch: str, args: argparse.Namespace
+) -> list[float]:
+    process_image: ProcessImage = ProcessImage()
+    rval: list[float] = []
+    for filepath in list_files(copy_corpus(corpus, scratch)):
+        process_image.init(filepath)
+        rval.append(timed(process_image._write_exif_comment, COMMENT))
+    return rval
+
+
+def stage_rename(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    process_image: ProcessImage = ProcessImage()
+    rval: list[float] = []
+    for filepath in list_files(copy_corpus(corpus, scratch)):
+        process_image.init(filepath)
+        rval.append(timed(process_image.process_created_date))
+    return rval
+
+
+def stage_copy(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    return move_or_copy(copy_corpus(corpus, scratch), scratch, False)
+
+
+def stage_move(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    return move_or_copy(copy_corpus(corpus, scratch), scratch, True)
+
+
+def stage_describe(
+    corpus: str, scratch: str, args: argparse.Namespace
+) -> list[float]:
+    from Processor.AIProessor.image_to_text import ImageToText
+    from Benchmark.stub_backends import STUB_BACKENDS
+
+    image_to_text: ImageToText = ImageToText(backends=STUB_BACKENDS)
+    return [
+        timed(image_to_text.process, filepath, args.level)
+        for filepath in list_files(corpus)
+    ]
+
+
+def stage_worker(corpus: str, scratch: str, args: argparse.Namespace) -> list[float]:
+    """
+    The whole loop of the application with the AI description, the rename
+    and the copy into year and month folders.  The Worker is run on this
+    thread, its signals are not connected.
+    """
+
+    from Benchmark.stub_backends import STUB_BACKENDS
+
+    process_image: ProcessImage = ProcessImage()
+    process_image.post_process(backends=STUB_BACKENDS)
+    return [run_worker(process_image, corpus, scratch, args, True)]
+
+
+def stage_worker_metadata(
+    corpus: str, scratch: str, args: argparse.Namespace
+) -> list[float]:
+    """
+    The whole loop without the AI description, run by the MetadataPool.
+    """
+
+    return [run_worker(ProcessImage(), corpus, scratch, args, False)]
+
+
+STAGES: dict[str, Callable[[str, str, argparse.Namespace], list[float]]] = {
+    "scan": stage_scan,
+    "init": stage_init,
+    "write_comment": stage_write_comment,
+    "rename": stage_rename,
+    "copy": stage_copy,
+    "move": stage_move,
+    "describe": stage_describe,
+    "worker": stage_worker,
+    "worker_metadata": stage_worker_metadata,
+}
+# Stages timed once for the whole corpus rather than per file
+WHOLE_CORPUS_STAGES: tuple[str, ...] = ("scan", "worker", "worker_metadata")
+
+
+############################################################################
+# helpers
+############################################################################
+def timed(function: Callable[..., Any], *args: Any) -> float:
+    start: float = time.perf_counter()
+    function(*args)
+    rval: float = time.perf_counter() - start
+    # One call per file, for the samples of the memory profile
+    memory_profile.file_done()
+    return rval
+
+
+def list_files(directory: str) -> list[str]:
+    return list(ProcessDirectory().build_file_queue(directory, True))
+
+
+def copy_corpus(corpus: str, scratch: str) -> str:
+    """
+    Returns:
+        str: A fresh copy of the corpus, not timed
+    """
+
+    target: str = os.path.join(scratch, "corpus")
+    shutil.rmtree(target, ignore_errors=True)
+    shutil.copytree(
+        corpus, target, ignore=shutil.ignore_patterns(synthetic_corpus.MANIFEST_FILE)
+    )
+    return target
+
+
+def move_or_copy(directory: str, scratch: str, move: bool) -> list[float]:
+    destination: str = os.path.join(scratch, "sorted")
+    shutil.rmtree(destination, ignore_errors=True)
+    process_image: ProcessImage = ProcessImage()
+    rval: list[float] = []
+    for filepath in list_files(directory):
+        process_image.init(filepath)
+        rval.append(
+            timed(
+                process_image.process_move_image_to_folder,
+                move,
+                not move,
+                destination,
+                True,
+            )
+        )
+    return rval
+
+
+def run_worker(
+    process_image: ProcessImage,
+    corpus: str,
+    scratch: str,
+    args: argparse.Namespace,
+    classify: bool,
+) -> float:
+    from MainWindow.processing_options import ProcessingOptions
+    from Worker.worker import Worker
+
+    options: dict[str, Any] = {
+        option.name: option.value["checked"] for option in ProcessingOptions
+    }
+    options.update(
+        {
+            ProcessingOptions.MOVE_FILES.name: False,
+            ProcessingOptions.COPY_FILES.name: True,
+            ProcessingOptions.CREATE_MONTH_FOLDER.name: True,
+            ProcessingOptions.CLASSIFY_IMAGE.name: classify,
+            "ai_level": args.level,
+        }
+    )
+    destination: str = os.path.join(scratch, "sorted")
+    shutil.rmtree(destination, ignore_errors=True)
+    worker = Worker(process_image, copy_corpus(corpus, scratch), destination, options)
+    start: float = time.perf_counter()
+    worker.run()
+    return time.perf_counter() - start
+
+
+def summarize(name: str, times: list[float], files: int, nbytes: int) -> dict:
+    """
+    Returns:
+        dict: Throughput of the stage and, per file, the median and the 95th
+        percentile in milliseconds
+    """
+
+    if name in WHOLE_CORPUS_STAGES:
+        seconds: float = statistics.median(times)
+        per_file: list[float] = [seconds / files]
+    else:
+        seconds = sum(times)
+        per_file = times
+    rval: dict[str, Any] = {
+        "files": files,
+        "seconds": round(seconds, 4),
+        "files_per_second": round(files / seconds, 2) if seconds else None,
+        "mb_per_second": round(nbytes / 1024**2 / seconds, 2) if seconds else None,
+        "p50_ms": round(statistics.median(per_file) * 1000, 3),
+        "p95_ms": round(
+            (
+                statistics.quantiles(per_file, n=20)[-1]
+                if len(per_file) > 1
+                else per_file[0]
+            )
+            * 1000,
+            3,
+        ),
+    }
+    return rval
+
+
+def compare(results: dict[str, Any], filename: str) -> None:
+    with open(filename, "r", encoding="utf-8") as file:
+        baseline: dict[str, Any] = json.load(file)
+    print(f"\nCompared with [{filename}] of [{baseline.get('created')}]")
+    for name, stage in results["stages"].items():
+        before: dict[str, Any] | None = baseline.get("stages", {}).get(name)
+        if not before or not before.get("files_per_second"):
+            continue
+        if not stage.get("files_per_second"):
+            continue
+        print(
+            f"{name:<16} {before['files_per_second']:10.2f} -> "
+            f"{stage['files_per_second']:10.2f} files/s "
+            f"x{stage['files_per_second'] / before['files_per_second']:.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--corpus", help="Generated when missing or empty")
+    parser.add_argument("--count", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=list(STAGES)
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--level", type=int, default=0, choices=(0, 1, 2))
+    parser.add_argument("--output", default="bench_suite.json")
+    parser.add_argument("--compare", help="Results of an earlier run")
+    parser.add_argument("--trace", help="Also write a Chrome trace of the spans")
+    parser.add_argument("--memory", help="Also write a memory profile report")
+    parser.add_argument(
+        "--memory-every", type=int, default=20, help="Files between two snapshots"
+    )
+    args = parser.parse_args()
+
+    log_config.setup_logging("bench_suite.log", logging.WARNING)
+    if args.trace:
+        tracing.enable(args.trace)
+        # The latency summary is logged at INFO
+        logging.getLogger(tracing.__name__).setLevel(logging.INFO)
+    scratch: str = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        corpus: str = args.corpus or os.path.join(scratch, "source")
+        if not os.path.isdir(corpus) or not os.listdir(corpus):
+            print(f"Generating [{args.count}] files into [{corpus}]")
+            synthetic_corpus.generate_corpus(corpus, args.count, args.seed)
+        manifest: dict[str, Any] = synthetic_corpus.load_manifest(corpus)
+        files: int = len(manifest["files"])
+        nbytes: int = sum(entry["nbytes"] for entry in manifest["files"])
+        if args.memory:
+            # After the corpus is generated, which is not measured
+            memory_profile.enable(args.memory, args.memory_every)
+            logging.getLogger(memory_profile.__name__).setLevel(logging.INFO)
+
+        results: dict[str, Any] = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "corpus": {"seed": manifest["seed"], "files": files, "bytes": nbytes},
+            "level": args.level,
+            "stages": {},
+        }
+        for name in args.stages:
+            try:
+                with memory_profile.stage(f"bench {name}"):
+                    times: list[float] = STAGES[name](corpus, scratch, args)
+                results["stages"][name] = summarize(name, times, files, nbytes)
+            except Exception as e:
+                # e.g. PySide6 or torch is not installed
+                results["stages"][name] = {"error": repr(e)}
+            stage: dict[str, Any] = results["stages"][name]
+            if "error" in stage:
+                print(f"{name:<16} failed {stage['error']}")
+            else:
+                print(
+                    f"{name:<16} {stage['files_per_second']:10.2f} files/s "
+                    f"{stage['mb_per_second']:8.2f} MB/s "
+                    f"p50 {stage['p50_ms']:8.2f} ms p95 {stage['p95_ms']:8.2f} ms"
+                )
+
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        if args.trace:
+            print(f"Trace written to [{tracing.finish()}], see bench_suite.log")
+        if args.memory:
+            print(f"Memory profile written to [{memory_profile.finish()}]")
+        print(f"Results written to [{args.output}]")
+        if args.compare:
+            compare(results, args.compare)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        log_config.shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
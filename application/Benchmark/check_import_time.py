@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   check_import_time.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Import time budget of the main window.  Runs 'python -X
+             importtime' on the module in a fresh interpreter and fails when
+             the total import time is over the budget, or when one of the
+             heavy modules that must be loaded in the background is imported.
+             Prints the slowest imports.  Run from the 'application'
+             directory:
+
+             python -m Benchmark.check_import_time
+             python -m Benchmark.check_import_time --module Worker.worker --budget 0.8
+"""
+
+import argparse, os, subprocess, sys
+
+# Only loaded in the background by the ModelLoader, or on first use.
+DEFERRED_MODULES: tuple[str, ...] = (
+    "torch",
+    "transformers",
+    "huggingface_hub",
+    "PIL",
+    "piexif",
+    "numpy",
+)
+
+
+def measure(module: str) -> list[tuple[int, int, str]]:
+    """
+    Returns:
+        list[tuple[int, int, str]]: (self us, cumulative us, indented name)
+        of every import, in the order printed by -X importtime
+    """
+
+    application_dir: str = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=application_dir,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Could not import [{module}]\n{completed.stderr}")
+
+    rval: list[tuple[int, int, str]] = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|", 2)
+        rval.append((int(own), int(cumulative), name.rstrip()))
+    return rval
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="MainWindow.new_window")
+    parser.add_argument("--budget", type=float, default=1.5, help="seconds")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    imports: list[tuple[int, int, str]] = measure(args.module)
+    # Top level imports have a single space before the name
+    total: float = (
+        sum(cumulative for _, cumulative, name in imports if not name.startswith("  "))
+        / 1e6
+    )
+    loaded: set[str] = {name.strip() for _, _, name in imports}
+
+    print(f"Slowest imports of [{args.module}]:")
+    slowest = sorted(imports, key=lambda item: -item[0])[: args.top]
+    for own, cumulative, name in slowest:
+        print(
+            f"{own / 1000:9.1f} ms self {cumulative / 1000:9.1f} ms total "
+            f"{name.strip()}"
+        )
+
+    errors: list[str] = []
+    if total > args.budget:
+        errors.append(
+            f"Import time [{total:.2f}]s is over the budget [{args.budget}]s"
+        )
+    for module in DEFERRED_MODULES:
+        if module in loaded:
+            errors.append(f"[{module}] is imported at start up, it must be deferred")
+
+    print(f"Total import time [{total:.3f}]s, budget [{args.budget}]s")
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   check_preprocess.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   The pixel values of the backends must match the transformers
+             image processors of their models, built locally as in
+             bench_preprocess.  normalize_array must match the rescale and
+             normalize of the image processors on the same pixels.  The
+             ImagePyramid of one image, and the PixelBatch of every model,
+             must match the image processor on small images and on large
+             images that the pyramid reduces first, in landscape and in
+             portrait.  Fails when a difference is over the tolerance.
+
+             Tolerance, in levels of the 0-255 pixels, i.e. times
+             rescale_factor / std once normalized: a large image is reduced
+             with a box filter before the resize, so a pixel may be off by
+             up to 2 levels (0.035 for the Florence-2 spec) and by 0.5 level
+             on average.  An image that is not reduced matches to the
+             float32 precision.  Run from the 'application' directory:
+
+             python -m Benchmark.check_preprocess
+"""
+
+import numpy as np
+from PIL import Image
+from Benchmark.bench_preprocess import build_image, build_processors
+from Processor.AIProessor.image_pyramid import (
+    ImagePyramid,
+    PixelBatch,
+    PreprocessSpec,
+    normalize_array,
+)
+
+# Largest and mean difference allowed in pixel levels when the image is
+# reduced, see the tolerance above
+MAX_LEVELS: float = 2.0
+MEAN_LEVELS: float = 0.5
+# float32 rounding
+EPSILON: float = 1e-5
+# (width, height, reduced by the pyramid)
+IMAGES: tuple[tuple[int, int, bool], ...] = (
+    (640, 480, False),
+    (3000, 4000, False),
+    (8000, 6000, True),
+    (6000, 8000, True),
+)
+# (width, height, batch size, reduced by the pyramid)
+BATCHES: tuple[tuple[int, int, int, bool], ...] = (
+    (1600, 1200, 3, False),
+    (8000, 6000, 2, True),
+)
+
+
+def get_tolerance(spec: PreprocessSpec, levels: float) -> float:
+    return levels * spec.rescale_factor / min(spec.image_std) + EPSILON
+
+
+def compare(
+    what: str,
+    spec: PreprocessSpec,
+    reference: np.ndarray,
+    values: np.ndarray,
+    reduced: bool,
+) -> list[str]:
+    """
+    Returns:
+        list[str]: The failures, empty when the values match
+    """
+
+    if reference.shape != values.shape:
+        return [f"{what} has the shape {values.shape} instead of {reference.shape}"]
+    difference: np.ndarray = np.abs(reference - values)
+    max_allowed: float = get_tolerance(spec, MAX_LEVELS) if reduced else EPSILON
+    mean_allowed: float = get_tolerance(spec, MEAN_LEVELS) if reduced else EPSILON
+    print(
+        f"{what:48} max diff {difference.max():.6f} (<= {max_allowed:.6f}) "
+        f"mean diff {difference.mean():.6f} (<= {mean_allowed:.6f})"
+    )
+    failures: list[str] = []
+    if difference.max() > max_allowed:
+        failures.append(f"{what} max diff {difference.max():.6f} > {max_allowed:.6f}")
+    if difference.mean() > mean_allowed:
+        failures.append(
+            f"{what} mean diff {difference.mean():.6f} > {mean_allowed:.6f}"
+        )
+    return failures
+
+
+def check_normalize(
+    processors: dict[str, object], specs: dict[str, PreprocessSpec]
+) -> list[str]:
+    """
+    normalize_array on the level of the pyramid against the rescale and the
+    normalize of the image processor on the same pixels.
+    """
+
+    failures: list[str] = []
+    image: Image.Image = build_image(1024, 768)
+    pyramid: ImagePyramid = ImagePyramid(image, list(specs.values()))
+    for name, processor in processors.items():
+        pixels: np.ndarray = np.asarray(pyramid.level(specs[name]), dtype=np.uint8)
+        reference: np.ndarray = processor.normalize(
+            processor.rescale(pixels.astype(np.float32), processor.rescale_factor),
+            processor.image_mean,
+            processor.image_std,
+        )
+        values: np.ndarray = np.empty(pixels.shape, dtype=np.float32)
+        normalize_array(pixels, specs[name], values)
+        failures += compare(
+            f"normalize_array {name}", specs[name], reference, values, False
+        )
+    return failures
+
+
+def check_pyramids(
+    processors: dict[str, object], specs: dict[str, PreprocessSpec]
+) -> list[str]:
+    """
+    pixel_values of one pyramid shared by every model against the image
+    processor of each model on the full resolution image.
+    """
+
+    failures: list[str] = []
+    for width, height, reduced in IMAGES:
+        image: Image.Image = build_image(width, height)
+        pyramid: ImagePyramid = ImagePyramid(image, list(specs.values()))
+        for name, processor in processors.items():
+            reference: np.ndarray = processor(images=image, return_tensors="np")[
+                "pixel_values"
+            ]
+            failures += compare(
+                f"ImagePyramid {name} {width}x{height}",
+                specs[name],
+                reference,
+                pyramid.pixel_values(specs[name]).numpy(),
+                reduced,
+            )
+    return failures
+
+
+def check_batches(
+    processors: dict[str, object], specs: dict[str, PreprocessSpec]
+) -> list[str]:
+    failures: list[str] = []
+    batches: dict[str, PixelBatch] = {
+        name: PixelBatch(spec) for name, spec in specs.items()
+    }
+    for width, height, size, reduced in BATCHES:
+        images: list[Image.Image] = [
+            build_image(width, height, seed) for seed in range(size)
+        ]
+        pyramids: list[ImagePyramid] = [
+            ImagePyramid(image, list(specs.values())) for image in images
+        ]
+        for name, processor in processors.items():
+            reference: np.ndarray = processor(images=images, return_tensors="np")[
+                "pixel_values"
+            ]
+            failures += compare(
+                f"PixelBatch {name} {size}x{width}x{height}",
+                specs[name],
+                reference,
+                batches[name].fill(pyramids).numpy(),
+                reduced,
+            )
+    return failures
+
+
+def main() -> None:
+    processors: dict[str, object] = build_processors()
+    specs: dict[str, PreprocessSpec] = {
+        name: PreprocessSpec.from_image_processor(processor)
+        for name, processor in processors.items()
+    }
+
+    failures: list[str] = check_normalize(processors, specs)
+    failures += check_pyramids(processors, specs)
+    failures += check_batches(processors, specs)
+    if failures:
+        raise SystemExit("\n".join(["The preprocessing does not match"] + failures))
+    print("The preprocessing matches the image processors")
+
+
+if __name__ == "__main__":
+    main()
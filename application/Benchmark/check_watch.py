@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   check_watch.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   The watch of a folder must go on when a file cannot be
+             processed.  A file is removed after it settled and before the
+             Worker reads it, then a later file must still be processed and
+             the watch must still run.  Without the AI description, so it
+             runs without the models.  Run from the 'application' directory:
+
+             python -m Benchmark.check_watch
+"""
+
+import os, tempfile, threading, time
+from typing import Callable
+from unittest import mock
+from Benchmark.synthetic_corpus import make_image
+from MainWindow.processing_options import ProcessingOptions
+from Processor.folder_watcher import FolderWatcher
+from Processor.process_image import ProcessImage
+from Worker.watch_runner import WatchRunner
+
+# Removed between the watcher and the Worker
+GONE_FILE: str = "gone.jpg"
+TIMEOUT: float = 20.0
+
+
+def wait_for(condition, what: str) -> None:
+    deadline: float = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Timed out waiting for {what}")
+        time.sleep(0.05)
+
+
+def main() -> None:
+    wait: Callable[..., list[str]] = FolderWatcher.wait
+
+    def wait_and_remove(watcher: FolderWatcher, *args, **kwargs) -> list[str]:
+        filepaths: list[str] = wait(watcher, *args, **kwargs)
+        for filepath in filepaths:
+            if os.path.basename(filepath) == GONE_FILE:
+                os.remove(filepath)
+        return filepaths
+
+    with tempfile.TemporaryDirectory() as directory:
+        source: str = os.path.join(directory, "drop")
+        destination: str = os.path.join(directory, "sorted")
+        os.makedirs(source)
+        options: dict = {
+            ProcessingOptions.CREATED_DATE.name: True,
+            ProcessingOptions.RECURSE_DIRECTORY.name: True,
+            ProcessingOptions.MOVE_FILES.name: True,
+            ProcessingOptions.COPY_FILES.name: False,
+            ProcessingOptions.CREATE_MONTH_FOLDER.name: False,
+            ProcessingOptions.CLASSIFY_IMAGE.name: False,
+            ProcessingOptions.OCR_TEXT.name: False,
+            ProcessingOptions.OBJECT_LABELS.name: False,
+            ProcessingOptions.NETWORK_STORAGE.name: False,
+            "ai_level": 0,
+        }
+        runner: WatchRunner = WatchRunner(
+            ProcessImage(), source, destination, options, settle=0.2
+        )
+        errors: list[str] = []
+        runner.log_message.connect(
+            lambda message, type: errors.append(message) if type == "error" else None
+        )
+
+        def moved() -> list[str]:
+            return [
+                filename
+                for _, _, filenames in os.walk(destination)
+                for filename in filenames
+            ]
+
+        outcome: list[str] = []
+
+        def drop_files() -> None:
+            try:
+                # The watcher lists the folder before it hands out files
+                time.sleep(0.5)
+                make_image((64, 48), 1).save(os.path.join(source, GONE_FILE))
+                make_image((64, 48), 2).save(os.path.join(source, "first.jpg"))
+                wait_for(lambda: len(moved()) == 1, "the first file")
+                make_image((64, 48), 3).save(os.path.join(source, "later.jpg"))
+                wait_for(lambda: len(moved()) == 2, "the later file")
+                outcome.append("done")
+            except SystemExit as e:
+                outcome.append(str(e))
+            finally:
+                runner.setStop()
+
+        with mock.patch.object(FolderWatcher, "wait", wait_and_remove):
+            thread: threading.Thread = threading.Thread(target=drop_files)
+            thread.start()
+            # On this thread, like run_jobs, the messages are sent directly
+            runner.run()
+            thread.join()
+
+        if outcome != ["done"]:
+            raise SystemExit(f"The watch ended. {outcome} {errors}")
+        if any(message.startswith("Watching [") for message in errors):
+            raise SystemExit(f"The watch failed. {errors}")
+        if not any(GONE_FILE in message for message in errors):
+            raise SystemExit(f"The removed file was not reported. {errors}")
+        print(f"Watch went on after [{GONE_FILE}] was removed, moved {moved()}")
+
+
+if __name__ == "__main__":
+    main()
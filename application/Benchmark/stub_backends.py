@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   stub_backends.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Stand-ins for the AI backends, so that the benchmarks run without
+             the network or a GPU.  Each one has a tiny torch model with fixed
+             weights that goes through the same steps as a real backend (the
+             shared pyramid, the batch buffers, a forward pass) and picks the
+             words of its caption from the output.  The same image always
+             gets the same description.
+
+             ImageToText(backends=STUB_BACKENDS)
+"""
+
+import torch
+from typing import Any
+from PIL import Image, ImageFile
+from Processor.AIProessor.generation_profile import GenerationProfile
+from Processor.AIProessor.image_pyramid import ImagePyramid, PixelBatch, PreprocessSpec
+from Processor.AIProessor.image_to_text_abstract import (
+    ImageDescription,
+    ImageTask,
+    ImageToTextBase,
+)
+
+# fmt: off
+WORDS: tuple[str, ...] = (
+    "beach", "bicycle", "bird", "boat", "bridge", "building", "car", "cat",
+    "child", "city", "cloud", "dog", "field", "flower", "forest", "house",
+    "lake", "mountain", "person", "river", "road", "sky", "snow", "street",
+    "sunset", "table", "train", "tree", "water", "window", "woman", "man",
+)
+# fmt: on
+# Words of the caption for Brief, Standard and Full
+CAPTION_WORDS: tuple[int, int, int] = (3, 6, 10)
+
+
+class StubBackend(ImageToTextBase):
+    """
+    Average pools the image to 8x8 and scores every word with a linear layer
+    seeded from the name of the backend.
+    """
+
+    __name: str = "stub"
+    __spec: PreprocessSpec = PreprocessSpec(
+        size=(64, 64),
+        shortest_edge=None,
+        crop_size=None,
+        resample=int(Image.Resampling.BICUBIC),
+        rescale_factor=1 / 255,
+        image_mean=(0.5, 0.5, 0.5),
+        image_std=(0.5, 0.5, 0.5),
+    )
+
+    def __init__(self, device: str, name: str | None = None) -> None:
+        self.__name = name or self.__name
+        generator: torch.Generator = torch.Generator().manual_seed(
+            sum(self.__name.encode("utf-8"))
+        )
+        self.__model: torch.nn.Module = torch.nn.Sequential(
+            torch.nn.AdaptiveAvgPool2d(8),
+            torch.nn.Flatten(),
+            torch.nn.Linear(3 * 8 * 8, len(WORDS)),
+        ).eval()
+        with torch.no_grad():
+            for parameter in self.__model.parameters():
+                parameter.copy_(torch.randn(parameter.shape, generator=generator))
+        self.__batch: PixelBatch = PixelBatch(self.__spec)
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_models(self) -> list[Any]:
+        return [self.__model]
+
+    def get_preprocess_specs(self) -> list[PreprocessSpec]:
+        return [self.__spec]
+
+    def preprocess(self, pyramid: ImagePyramid) -> torch.Tensor:
+        return pyramid.pixel_values(self.__spec)
+
+    def preprocess_batch(self, pyramids: list[ImagePyramid]) -> list[Any]:
+        pixel_values: torch.Tensor = self.__batch.fill(pyramids)
+        return [pixel_values[index : index + 1] for index in range(len(pyramids))]
+
+    def score(self, image: ImageFile, inputs: Any) -> list[str]:
+        """
+        Returns:
+            list[str]: Every word, the best match first
+        """
+
+        if inputs is None:
+            inputs = ImagePyramid(image, [self.__spec]).pixel_values(self.__spec)
+        with torch.inference_mode():
+            scores: torch.Tensor = self.__model(inputs)[0]
+        return [WORDS[index] for index in scores.argsort(descending=True).tolist()]
+
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: Any = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> list[str]:
+        words: list[str] = self.score(image, inputs)[: CAPTION_WORDS[level]]
+        return [f"A photo of {', '.join(words[:-1])} and {words[-1]}"]
+
+
+class StubTagger(StubBackend):
+    """
+    Also answers the OCR and object tasks, like Florence-2.
+    """
+
+    def __init__(self, device: str) -> None:
+        super().__init__(device, "stub_tagger")
+
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: Any = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> ImageDescription:
+        words: list[str] = self.score(image, inputs)
+        return ImageDescription(
+            [f"An image of a {words[0]}"],
+            " ".join(words[-2:]).upper() if ImageTask.OCR in tasks else "",
+            tuple(words[:4]) if ImageTask.OBJECTS in tasks else (),
+        )
+
+
+STUB_BACKENDS: tuple[type[ImageToTextBase], ...] = (StubBackend, StubTagger)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   synthetic_corpus.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Reproducible corpus of images for the benchmarks.  The same seed
+             always gives the same files: JPEG, PNG and WebP images of
+             controlled sizes, with the EXIF date taken, GPS coordinates and
+             an existing UserComment on some of them, and files that only
+             have the date in their name.  A corpus.json manifest lists
+             every file with the date source the application should find.
+             Run from the 'application' directory:
+
+             python -m Benchmark.synthetic_corpus /tmp/corpus --count 200
+"""
+
+import argparse, datetime, json, os, random
+from typing import Any, NamedTuple
+import numpy as np
+import piexif
+from piexif import helper as pi_helper
+from PIL import Image
+
+MANIFEST_FILE: str = "corpus.json"
+FORMATS: tuple[str, ...] = ("jpeg", "png", "webp")
+EXTENSIONS: dict[str, str] = {"jpeg": ".jpg", "png": ".png", "webp": ".webp"}
+# (width, height) of the images, from thumbnails to phone photos
+SIZES: tuple[tuple[int, int], ...] = ((640, 480), (1600, 1200), (4032, 3024))
+# Date sources in the order ProcessImage checks them
+DATE_SOURCES: tuple[str, ...] = ("exif", "filename", "file")
+
+
+class CorpusFile(NamedTuple):
+    """
+    One generated image and what it contains.
+    """
+
+    filename: str
+    format: str
+    size: tuple[int, int]
+    date_source: str
+    date: str | None
+    gps: bool
+    user_comment: bool
+    nbytes: int
+
+
+############################################################################
+# generate_corpus
+############################################################################
+def generate_corpus(
+    directory: str,
+    count: int,
+    seed: int = 0,
+    sizes: tuple[tuple[int, int], ...] = SIZES,
+    sub_directories: int = 4,
+) -> list[CorpusFile]:
+    """
+    Write the corpus and its manifest.  The files are spread over a few
+    sub-directories so that the recursive scan has some work to do.
+
+    Args:
+        directory (str): Created if it does not exist, must be empty
+        count (int): Number of images
+        seed (int): Seed of every random choice and of the pixels
+        sizes (tuple[tuple[int, int], ...]): Sizes to cycle through
+        sub_directories (int): Number of sub-directories
+
+    Returns:
+        list[CorpusFile]: The generated files, in manifest order
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    if os.listdir(directory):
+        raise FileExistsError(f"The directory [{directory}] is not empty")
+
+    rng: random.Random = random.Random(seed)
+    rval: list[CorpusFile] = []
+    for index in range(count):
+        format: str = FORMATS[index % len(FORMATS)]
+        size: tuple[int, int] = sizes[index % len(sizes)]
+        date: datetime.datetime = datetime.datetime(2015, 1, 1) + datetime.timedelta(
+            seconds=rng.randrange(10 * 365 * 24 * 3600)
+        )
+        # piexif can only read and write the EXIF of JPEG and WebP files
+        date_source: str = rng.choice(
+            DATE_SOURCES if format != "png" else DATE_SOURCES[1:]
+        )
+        gps: bool = date_source == "exif" and rng.random() < 0.5
+        user_comment: bool = date_source == "exif" and rng.random() < 0.3
+
+        name: str = f"IMG_{index:05d}{EXTENSIONS[format]}"
+        if date_source == "filename":
+            name = f"{date:%Y%m%d_%H%M%S}_{index:05d}{EXTENSIONS[format]}"
+        relative: str = os.path.join(f"dir_{index % sub_directories:02d}", name)
+        path: str = os.path.join(directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        image: Image.Image = make_image(size, seed * 1_000_003 + index)
+        exif: bytes | None = None
+        if date_source == "exif":
+            exif = make_exif(date, gps, user_comment, rng)
+        save_image(image, path, format, exif)
+        if date_source == "file":
+            # Neither EXIF nor a dated name, the file time is used
+            os.utime(path, (date.timestamp(), date.timestamp()))
+
+        rval.append(
+            CorpusFile(
+                filename=relative,
+                format=format,
+                size=size,
+                date_source=date_source,
+                date=date.isoformat() if date_source != "file" else None,
+                gps=gps,
+                user_comment=user_comment,
+                nbytes=os.path.getsize(path),
+            )
+        )
+
+    with open(os.path.join(directory, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "seed": seed,
+                "count": count,
+                "files": [entry._asdict() for entry in rval],
+            },
+            file,
+            indent=2,
+        )
+    return rval
+
+
+def load_manifest(directory: str) -> dict[str, Any]:
+    with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def make_image(size: tuple[int, int], seed: int) -> Image.Image:
+    """
+    A smooth gradient with a few blocks and some noise, which compresses
+    like a photo rather than like a flat color.
+    """
+
+    rng: np.random.Generator = np.random.default_rng(seed)
+    width, height = size
+    x: np.ndarray = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    y: np.ndarray = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    colors: np.ndarray = rng.uniform(0, 255, (3, 3)).astype(np.float32)
+    pixels: np.ndarray = np.empty((height, width, 3), dtype=np.float32)
+    for channel in range(3):
+        pixels[:, :, channel] = (
+            colors[channel, 0] * x + colors[channel, 1] * y + colors[channel, 2] * x * y
+        ) / 2
+    for _ in range(6):
+        left, top = int(rng.integers(0, width // 2)), int(rng.integers(0, height // 2))
+        right = left + int(rng.integers(width // 8, width // 2))
+        bottom = top + int(rng.integers(height // 8, height // 2))
+        pixels[top:bottom, left:right] = rng.uniform(0, 255, 3)
+    pixels += rng.standard_normal(pixels.shape, dtype=np.float32) * 6
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def make_exif(
+    date: datetime.datetime, gps: bool, user_comment: bool, rng: random.Random
+) -> bytes:
+    timestamp: bytes = date.strftime("%Y:%m:%d %H:%M:%S").encode("ascii")
+    exif_dict: dict[str, Any] = {
+        "0th": {piexif.ImageIFD.Make: b"Synthetic", piexif.ImageIFD.Model: b"Corpus"},
+        "Exif": {
+            piexif.ExifIFD.DateTimeOriginal: timestamp,
+            piexif.ExifIFD.DateTimeDigitized: timestamp,
+            piexif.ExifIFD.SubSecTimeOriginal: f"{rng.randrange(1000):03d}".encode(),
+        },
+        "GPS": {},
+        "1st": {},
+        "thumbnail": None,
+    }
+    if user_comment:
+        exif_dict["Exif"][piexif.ExifIFD.UserComment] = pi_helper.UserComment.dump(
+            "An existing comment", encoding="unicode"
+        )
+    if gps:
+        latitude: float = rng.uniform(-80, 80)
+        longitude: float = rng.uniform(-180, 180)
+        exif_dict["GPS"] = {
+            piexif.GPSIFD.GPSLatitudeRef: b"N" if latitude >= 0 else b"S",
+            piexif.GPSIFD.GPSLatitude: to_dms(abs(latitude)),
+            piexif.GPSIFD.GPSLongitudeRef: b"E" if longitude >= 0 else b"W",
+            piexif.GPSIFD.GPSLongitude: to_dms(abs(longitude)),
+        }
+    return piexif.dump(exif_dict)
+
+
+def to_dms(value: float) -> tuple[tuple[int, int], ...]:
+    degrees: int = int(value)
+    minutes: int = int((value - degrees) * 60)
+    seconds: float = (value - degrees - minutes / 60) * 3600
+    return ((degrees, 1), (minutes, 1), (int(seconds * 100), 100))
+
+
+def save_image(
+    image: Image.Image, path: str, format: str, exif: bytes | None
+) -> None:
+    options: dict[str, Any] = {"exif": exif} if exif else {}
+    if format == "jpeg":
+        image.save(path, "JPEG", quality=90, **options)
+    elif format == "webp":
+        image.save(path, "WEBP", quality=80, method=0, **options)
+    else:
+        image.save(path, "PNG", compress_level=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory")
+    parser.add_argument("--count", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files: list[CorpusFile] = generate_corpus(args.directory, args.count, args.seed)
+    print(
+        f"Wrote [{len(files)}] files, "
+        f"[{sum(entry.nbytes for entry in files) / 1024**2:.1f}] MB to "
+        f"[{args.directory}]"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   app_paths.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Location of the files that the application keeps between runs,
+             such as the tuning of the AI models for this machine.  The
+             directory is '~/.image_processor' unless the environment
+             variable IMAGE_PROCESSOR_HOME is set.
+"""
+
+import os
+
+HOME_ENV: str = "IMAGE_PROCESSOR_HOME"
+
+
+def get_config_dir() -> str:
+    """
+    Returns:
+        str: The configuration directory, created if it does not exist
+    """
+
+    config_dir: str = os.environ.get(HOME_ENV) or os.path.join(
+        os.path.expanduser("~"), ".image_processor"
+    )
+    os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
+
+def get_config_file(filename: str) -> str:
+    """
+    Returns:
+        str: Path of the file within the configuration directory
+    """
+
+    return os.path.join(get_config_dir(), filename)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   cancel_token.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Cooperative cancellation and pause of a run.  The window sets
+             the token and the processing checks it at its cancellation
+             points: between the stages of a file in ProcessImage, between
+             the AI backends and after every generated token.  A paused run
+             waits at its next check with everything it has loaded, so that
+             resume continues at once, and the time it waits does not count
+             toward the deadline of the image.
+"""
+
+import threading, time
+from typing import Any, Callable
+
+
+class Cancelled(Exception):
+    """
+    Raised at a cancellation point once the run is cancelled.
+    """
+
+
+class CancelToken:
+    """
+    # Cancel Token
+
+    Shared by the thread that controls the run and the threads that do the
+    work.  Every method is thread safe.  Created with a multiprocessing
+    context, the token is also shared with the processes forked after it,
+    see InferencePool.
+    """
+
+    def __init__(self, context: Any = None) -> None:
+        """
+        Args:
+            context (Any): multiprocessing context of the processes that share
+                the token, None when it is only shared by threads
+        """
+
+        module: Any = context or threading
+        self.__cancelled: threading.Event = module.Event()
+        # Set while the run may continue, cleared by pause
+        self.__running: threading.Event = module.Event()
+        self.__running.set()
+        self.__lock: threading.Lock = module.Lock()
+        # Seconds paused before the current pause, time.monotonic() at which
+        # the current pause started
+        self.__paused: Any = (
+            context.Array("d", 2, lock=False) if context else [0.0, 0.0]
+        )
+        self.__listeners: list[Callable[["CancelToken"], None]] = []
+
+    def cancel(self) -> None:
+        with self.__lock:
+            self.__cancelled.set()
+            # A paused run must wake up to see that it is cancelled
+            self.__set_running()
+        self.__notify()
+
+    def pause(self) -> None:
+        with self.__lock:
+            if self.__cancelled.is_set() or not self.__running.is_set():
+                return
+            self.__paused[1] = time.monotonic()
+            self.__running.clear()
+        self.__notify()
+
+    def resume(self) -> None:
+        with self.__lock:
+            self.__set_running()
+        self.__notify()
+
+    def is_cancelled(self) -> bool:
+        return self.__cancelled.is_set()
+
+    def is_paused(self) -> bool:
+        return not self.__running.is_set()
+
+    def check(self) -> None:
+        """
+        Cancellation point: wait while the run is paused.
+
+        Raises:
+            Cancelled: The run is cancelled
+        """
+
+        if not self.__running.is_set():
+            self.__running.wait()
+        if self.__cancelled.is_set():
+            raise Cancelled()
+
+    def get_active_time(self) -> float:
+        """
+        Clock of the deadlines of a run, see ImageBudget: time.monotonic()
+        without the time the run was paused, so that a pause does not use up
+        the deadline of the image being described.
+
+        Returns:
+            float: Seconds, only differences are meaningful
+        """
+
+        with self.__lock:
+            now: float = time.monotonic()
+            paused: float = self.__paused[0]
+            if not self.__running.is_set():
+                paused += now - self.__paused[1]
+        return now - paused
+
+    def add_listener(self, listener: Callable[["CancelToken"], None]) -> None:
+        """
+        Args:
+            listener (Callable[[CancelToken], None]): Called with the token
+                after it is cancelled, paused or resumed
+        """
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[["CancelToken"], None]) -> None:
+        if listener in self.__listeners:
+            self.__listeners.remove(listener)
+
+    def __set_running(self) -> None:
+        if not self.__running.is_set():
+            self.__paused[0] += time.monotonic() - self.__paused[1]
+            self.__running.set()
+
+    def __notify(self) -> None:
+        for listener in list(self.__listeners):
+            listener(self)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   lazy_import.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Import a module on first use instead of at import time.  Used for
+             the heavy modules that are not needed to show the main window,
+             so that the window responds while they are still unused.
+
+             piexif = lazy_import.lazy_module("piexif")
+"""
+
+import importlib.util, sys, threading
+from types import ModuleType
+
+__lock: threading.Lock = threading.Lock()
+
+
+def lazy_module(name: str) -> ModuleType:
+    """
+    Return the module, registered in sys.modules, without running its code.
+    The code runs on the first access to one of its attributes.  Only top
+    level modules are supported since finding a sub-module imports its
+    parent.
+
+    Args:
+        name (str): Name of the module, e.g. 'piexif'
+
+    Returns:
+        ModuleType: The module, loaded on first use
+    """
+
+    with __lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module: ModuleType = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
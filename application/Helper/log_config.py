@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   log_config.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Logging setup for the application.  Records are put on a queue
+             by a QueueHandler and written to the log file by a background
+             QueueListener, so the worker never waits on the disk.
+
+             The following environment variables configure the logging:
+
+             IMAGE_PROCESSOR_LOG_LEVEL  - level of the root logger (INFO)
+             IMAGE_PROCESSOR_TRACE      - glob (fnmatch) of file paths for
+                                          which the step-by-step DEBUG trace
+                                          of the processors is written,
+                                          e.g. '*IMG_1234*' or '*'
+"""
+
+import atexit, datetime, fnmatch, logging, multiprocessing, os, queue
+from logging import Logger, LogRecord
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT: str = "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s - %(message)s"
+
+# Loggers that produce the per-file trace.  Their level is raised to DEBUG
+# only while a file matching the trace pattern is being processed.
+TRACE_LOGGERS: tuple[str, ...] = ("Processor", "Worker")
+
+# Argument types that are safe to format later on the listener thread.
+_IMMUTABLE_TYPES: tuple[type, ...] = (
+    str,
+    int,
+    float,
+    bool,
+    bytes,
+    type(None),
+    datetime.date,
+    datetime.datetime,
+)
+
+__listener: QueueListener = None
+__process_listener: QueueListener = None
+__process_queue: multiprocessing.Queue = None
+__trace_pattern: str = None
+__trace_active: bool = False
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves the message formatting to the listener thread
+    whenever the arguments cannot change after the call.  The standard
+    QueueHandler formats every record on the calling thread.
+    """
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        if record.exc_info or not all(
+            isinstance(arg, _IMMUTABLE_TYPES) for arg in _record_args(record)
+        ):
+            return super().prepare(record)
+        return record
+
+
+class _ForwardHandler(logging.Handler):
+    """
+    Hand the records received from the child processes to the logger of
+    the same name in this process, so they end up in the same log file.
+    """
+
+    def emit(self, record: LogRecord) -> None:
+        logging.getLogger(record.name).handle(record)
+
+
+def _record_args(record: LogRecord) -> tuple:
+    if isinstance(record.args, dict):
+        return tuple(record.args.values())
+    return record.args or ()
+
+
+############################################################################
+# setup_logging
+############################################################################
+def setup_logging(filename: str, level: int | str | None = None) -> QueueListener:
+    """
+    Route all of the logging through a queue to a background thread that
+    writes the log file.
+
+    Args:
+        filename (str): Log file, overwritten on every start
+        level (int | str | None): Root level, defaults to the environment
+            variable IMAGE_PROCESSOR_LOG_LEVEL or INFO
+
+    Returns:
+        QueueListener: The started listener
+    """
+
+    global __listener, __trace_pattern
+
+    if __listener:
+        return __listener
+
+    level = level or os.environ.get("IMAGE_PROCESSOR_LOG_LEVEL", "INFO")
+    __trace_pattern = os.environ.get("IMAGE_PROCESSOR_TRACE") or None
+
+    file_handler: logging.FileHandler = logging.FileHandler(
+        filename, mode="w", encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root: Logger = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+
+    __listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    __listener.start()
+    atexit.register(shutdown_logging)
+
+    if __trace_pattern:
+        logging.getLogger(__name__).info(
+            "Per-file trace enabled for pattern [%s]", __trace_pattern
+        )
+    return __listener
+
+
+############################################################################
+# shutdown_logging
+############################################################################
+def shutdown_logging() -> None:
+    """
+    Flush the queue and stop the background writer.
+    """
+
+    global __listener, __process_listener, __process_queue
+
+    if __process_listener:
+        __process_listener.stop()
+        __process_listener = None
+        __process_queue = None
+    if __listener:
+        __listener.stop()
+        __listener = None
+
+
+############################################################################
+# get_process_log_queue
+############################################################################
+def get_process_log_queue(start_method: str = "spawn") -> multiprocessing.Queue:
+    """
+    Queue used by the child processes to send their log records back to
+    this process.  Pass it to setup_process_logging in the initializer of
+    the child process.
+
+    Args:
+        start_method (str): Start method of the processes using the queue
+
+    Returns:
+        multiprocessing.Queue: Queue shared with the child processes
+    """
+
+    global __process_listener, __process_queue
+
+    if not __process_queue:
+        __process_queue = multiprocessing.get_context(start_method).Queue()
+        __process_listener = QueueListener(__process_queue, _ForwardHandler())
+        __process_listener.start()
+    return __process_queue
+
+
+############################################################################
+# setup_process_logging
+############################################################################
+def setup_process_logging(log_queue: multiprocessing.Queue, level: int) -> None:
+    """
+    Configure the logging of a child process so that every record is sent
+    to the parent process through the given queue.
+    """
+
+    global __trace_pattern
+
+    __trace_pattern = os.environ.get("IMAGE_PROCESSOR_TRACE") or None
+    root: Logger = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    # The standard QueueHandler formats the message before it is pickled.
+    root.addHandler(QueueHandler(log_queue))
+
+
+############################################################################
+# trace_file
+############################################################################
+def trace_file(filepath: str) -> None:
+    """
+    Called once per file before it is processed.  Turns the DEBUG trace of
+    the processors on or off depending on the trace pattern.  Does nothing
+    when no pattern is configured.
+    """
+
+    global __trace_active
+
+    if not __trace_pattern:
+        return
+    active: bool = fnmatch.fnmatch(filepath, __trace_pattern)
+    if active == __trace_active:
+        return
+    __trace_active = active
+    for name in TRACE_LOGGERS:
+        logging.getLogger(name).setLevel(logging.DEBUG if active else logging.NOTSET)
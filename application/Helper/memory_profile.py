@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   memory_profile.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Memory profiling of a run, to find leaks and the memory cost of
+             each image without external tools.  Each Worker stage, each AI
+             backend call and each model load records its growth of the
+             resident memory (RSS) and of the Python heap (tracemalloc).
+             Every N files the RSS is sampled and a tracemalloc snapshot is
+             compared with the previous one, so that a steady climb shows
+             the code sites that keep allocating.  At the end of the run a
+             text report is written.  The tensors of torch are not seen by
+             tracemalloc, their cost shows in the RSS columns only.
+
+             IMAGE_PROCESSOR_MEMORY        - file of the report, e.g.
+                                             'memory.txt'.  Profiling is off
+                                             when it is not set.
+             IMAGE_PROCESSOR_MEMORY_EVERY  - files between two snapshots,
+                                             default 50
+
+             with memory_profile.stage("Classify Image"):
+                 ...
+"""
+
+import contextlib, linecache, logging, os, sys, threading, time, tracemalloc
+from logging import Logger
+from typing import Iterator
+
+MEMORY_ENV: str = "IMAGE_PROCESSOR_MEMORY"
+EVERY_ENV: str = "IMAGE_PROCESSOR_MEMORY_EVERY"
+# Code sites listed in the report and in each interval
+TOP_SITES: int = 15
+INTERVAL_SITES: int = 5
+
+__filename: str | None = None
+__enabled: bool = False
+__every: int = 50
+__lock: threading.Lock = threading.Lock()
+__start: float = 0.0
+__files: int = 0
+# name -> [calls, rss total, rss max, python total, python max] in bytes
+__stages: dict[str, list[int]] = {}
+# (files, seconds, rss, python, python peak)
+__samples: list[tuple[int, float, int, int, int]] = []
+# (files, [(site, size diff, count diff)]) of each interval
+__intervals: list[tuple[int, list[tuple[str, int, int]]]] = []
+__first_snapshot: tracemalloc.Snapshot = None
+__last_snapshot: tracemalloc.Snapshot = None
+__null_stage: contextlib.nullcontext = contextlib.nullcontext()
+__logger: Logger = logging.getLogger(__name__)
+
+
+def is_enabled() -> bool:
+    return __enabled
+
+
+def enable(filename: str, every: int = 50) -> None:
+    """
+    Turn the profiling on, e.g. from a benchmark, and start a new profile.
+    The Python allocations are only traced from here on.
+
+    Args:
+        filename (str): File of the report written by finish
+        every (int): Files between two snapshots
+    """
+
+    global __filename, __enabled, __every, __start, __files
+    global __first_snapshot, __last_snapshot
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    with __lock:
+        __filename = filename
+        __every = max(1, every)
+        __start = time.perf_counter()
+        __files = 0
+        __stages.clear()
+        __samples.clear()
+        __intervals.clear()
+        __first_snapshot = __last_snapshot = None
+        __enabled = True
+    sample()
+
+
+def disable() -> None:
+    global __enabled
+
+    __enabled = False
+    tracemalloc.stop()
+
+
+############################################################################
+# stage
+############################################################################
+def stage(name: str) -> contextlib.AbstractContextManager:
+    """
+    Measure the memory growth of the enclosed block.
+
+    Returns:
+        contextlib.AbstractContextManager: The measure, a shared no-op
+        context when profiling is off
+    """
+
+    if not __enabled:
+        return __null_stage
+    return _measure(name)
+
+
+@contextlib.contextmanager
+def _measure(name: str) -> Iterator[None]:
+    rss: int = get_resident_memory()
+    python: int = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        rss = get_resident_memory() - rss
+        python = tracemalloc.get_traced_memory()[0] - python
+        with __lock:
+            stats: list[int] | None = __stages.get(name)
+            if stats is None:
+                stats = __stages[name] = [0, 0, 0, 0, 0]
+            stats[0] += 1
+            stats[1] += rss
+            stats[2] = max(stats[2], rss)
+            stats[3] += python
+            stats[4] = max(stats[4], python)
+
+
+def file_done() -> None:
+    """
+    Count a completed file, every N files the memory is sampled.
+    """
+
+    global __files
+
+    if not __enabled:
+        return
+    with __lock:
+        __files += 1
+        due: bool = __files % __every == 0
+    if due:
+        sample()
+
+
+############################################################################
+# sample
+############################################################################
+def sample() -> None:
+    """
+    Record the RSS and the Python heap and compare a tracemalloc snapshot
+    with the one of the previous sample.
+    """
+
+    global __first_snapshot, __last_snapshot
+
+    if not __enabled:
+        return
+    snapshot: tracemalloc.Snapshot = _take_snapshot()
+    python, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    rss: int = get_resident_memory()
+    with __lock:
+        files: int = __files
+        previous: tracemalloc.Snapshot | None = __last_snapshot
+    sites: list[tuple[str, int, int]] | None = (
+        _top_sites(snapshot, previous, "lineno", INTERVAL_SITES)
+        if previous is not None
+        else None
+    )
+    with __lock:
+        __samples.append((files, time.perf_counter() - __start, rss, python, peak))
+        if sites is not None:
+            __intervals.append((files, sites))
+        if __first_snapshot is None:
+            __first_snapshot = snapshot
+        __last_snapshot = snapshot
+    __logger.info(
+        "Memory after [%s] files: rss [%.1f] MB python [%.1f] MB peak [%.1f] MB",
+        files,
+        rss / 1024**2,
+        python / 1024**2,
+        peak / 1024**2,
+    )
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        )
+    )
+
+
+def _top_sites(
+    snapshot: tracemalloc.Snapshot,
+    previous: tracemalloc.Snapshot,
+    key: str,
+    limit: int,
+) -> list[tuple[str, int, int]]:
+    """
+    Returns:
+        list[tuple[str, int, int]]: The sites that grew the most, with
+        their growth in bytes and in blocks
+    """
+
+    rval: list[tuple[str, int, int]] = []
+    for stat in snapshot.compare_to(previous, key):
+        if stat.size_diff <= 0:
+            continue
+        frame: tracemalloc.Frame = stat.traceback[0]
+        site: str = frame.filename if key == "filename" else f"{frame}"
+        rval.append((site, stat.size_diff, stat.count_diff))
+        if len(rval) == limit:
+            break
+    return rval
+
+
+############################################################################
+# finish
+############################################################################
+def finish() -> str | None:
+    """
+    End of a run: take a last sample and write the report.  Does nothing
+    when profiling is off.
+
+    Returns:
+        str | None: The report file, None when profiling is off
+    """
+
+    if not __enabled:
+        return None
+    if not __samples or __samples[-1][0] != __files:
+        sample()
+    text: str = report()
+    temporary: str = __filename + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temporary, __filename)
+    __logger.info("Wrote the memory profile to [%s]", __filename)
+    return __filename
+
+
+def report() -> str:
+    """
+    Returns:
+        str: The RSS samples, the growth of every stage, the code sites that
+        grew the most over the run and in each interval
+    """
+
+    with __lock:
+        samples: list[tuple[int, float, int, int, int]] = list(__samples)
+        stages: dict[str, list[int]] = {
+            name: list(stats) for name, stats in __stages.items()
+        }
+        intervals: list[tuple[int, list[tuple[str, int, int]]]] = list(__intervals)
+        first, last = __first_snapshot, __last_snapshot
+
+    mb: float = 1024**2
+    lines: list[str] = [
+        f"Memory profile of pid [{os.getpid()}] python [{sys.version.split()[0]}]",
+        "",
+        "Samples",
+        f"{'files':>7} {'seconds':>9} {'rss MB':>9} {'python MB':>10} "
+        f"{'peak MB':>9}",
+    ]
+    for files, seconds, rss, python, peak in samples:
+        lines.append(
+            f"{files:7} {seconds:9.1f} {rss / mb:9.1f} {python / mb:10.1f} "
+            f"{peak / mb:9.1f}"
+        )
+    if len(samples) > 1 and samples[-1][0] > samples[0][0]:
+        count: int = samples[-1][0] - samples[0][0]
+        lines.append(
+            f"Growth per file: rss [{(samples[-1][2] - samples[0][2]) / count:,.0f}]"
+            f" bytes python [{(samples[-1][3] - samples[0][3]) / count:,.0f}] bytes"
+        )
+
+    lines += [
+        "",
+        "Stages, growth of the memory kept after each call",
+        f"{'stage':<40} {'calls':>7} {'rss MB':>9} {'max MB':>8} "
+        f"{'rss/call KB':>12} {'python MB':>10} {'max MB':>8} {'python/call KB':>15}",
+    ]
+    for name, (calls, rss, rss_max, python, python_max) in sorted(
+        stages.items(), key=lambda item: -item[1][1]
+    ):
+        lines.append(
+            f"{name:<40} {calls:7} {rss / mb:9.1f} {rss_max / mb:8.1f} "
+            f"{rss / calls / 1024:12.1f} {python / mb:10.1f} {python_max / mb:8.1f} "
+            f"{python / calls / 1024:15.1f}"
+        )
+
+    if first is not None and last is not None and first is not last:
+        for key, title in (("filename", "files"), ("lineno", "lines")):
+            lines += ["", f"Python growth over the run by {title}"]
+            lines += _format_sites(_top_sites(last, first, key, TOP_SITES))
+    for files, sites in intervals:
+        lines += ["", f"Python growth up to [{files}] files"]
+        lines += _format_sites(sites)
+    return "\n".join(lines) + "\n"
+
+
+def _format_sites(sites: list[tuple[str, int, int]]) -> list[str]:
+    if not sites:
+        return ["  none"]
+    return [
+        f"  {size / 1024:+12,.1f} KB {count:+9,} blocks  {site}"
+        for site, size, count in sites
+    ]
+
+
+############################################################################
+# get_resident_memory
+############################################################################
+def get_resident_memory() -> int:
+    """
+    Returns:
+        int: Current resident memory in bytes, or the peak where the current
+        value is not available
+    """
+
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        # No /proc, e.g. macOS
+        import resource
+    except ImportError:
+        # Windows
+        return 0
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+if os.environ.get(MEMORY_ENV):
+    # Started on import so that the loading of the models is traced too
+    enable(os.environ[MEMORY_ENV], int(os.environ.get(EVERY_ENV) or 50))
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   metrics_endpoint.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Prometheus metrics of the processing, served over HTTP on
+             localhost for the monitoring of long runs.  The endpoint is off
+             unless a port is configured, and every update is then a flag
+             check.  When on, an update is a dictionary lookup under a lock;
+             the text is only built when Prometheus scrapes /metrics.  The
+             resident memory of the process is read at scrape time.
+
+             IMAGE_PROCESSOR_METRICS_PORT  - port of the endpoint on
+                                             127.0.0.1, e.g. 9464
+
+             scrape_configs:
+               - job_name: image_processor
+                 static_configs:
+                   - targets: ["localhost:9464"]
+"""
+
+import bisect, http.server, logging, os, threading
+from logging import Logger
+from Helper.memory_profile import get_resident_memory
+
+PORT_ENV: str = "IMAGE_PROCESSOR_METRICS_PORT"
+PREFIX: str = "image_processor_"
+# Upper bounds in seconds of the latency histograms
+BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+    120.0,
+)  # fmt: skip
+# name: (type, help).  Every metric is declared here.
+METRICS: dict[str, tuple[str, str]] = {
+    "files_total": ("counter", "Files through each stage"),
+    "files_done_total": ("counter", "Files completed by the worker"),
+    "bytes_read_total": ("counter", "Bytes of the files completed"),
+    "bytes_copied_total": ("counter", "Bytes moved or copied, by operation"),
+    "errors_total": ("counter", "Failed steps, by stage"),
+    "stage_seconds": ("histogram", "Latency of each stage of a file"),
+    "inference_seconds": ("histogram", "Latency of each AI backend per image"),
+    "run_files": ("gauge", "Files of the current run"),
+}
+
+__enabled: bool = False
+__lock: threading.Lock = threading.Lock()
+# (name, labels) -> value, or [bucket counts..., count] and sum for histograms
+__values: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+__histograms: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+__server: http.server.ThreadingHTTPServer = None
+__logger: Logger = logging.getLogger(__name__)
+
+
+def is_enabled() -> bool:
+    return __enabled
+
+
+############################################################################
+# start
+############################################################################
+def start(port: int | None = None) -> int | None:
+    """
+    Start serving /metrics on 127.0.0.1, once per process.
+
+    Args:
+        port (int | None): Port to listen on, defaults to the environment
+            variable IMAGE_PROCESSOR_METRICS_PORT.  Nothing is started
+            without a port.
+
+    Returns:
+        int | None: The port, None when the endpoint is off
+    """
+
+    global __enabled, __server
+
+    with __lock:
+        if __server:
+            return __server.server_address[1]
+        port = port or int(os.environ.get(PORT_ENV) or 0)
+        if not port:
+            return None
+        try:
+            __server = http.server.ThreadingHTTPServer(
+                ("127.0.0.1", port), _MetricsHandler
+            )
+        except OSError as e:
+            __logger.warning("Could not serve the metrics on port [%s]. [%s]", port, e)
+            return None
+        __server.daemon_threads = True
+        threading.Thread(
+            target=__server.serve_forever, name="metrics-endpoint", daemon=True
+        ).start()
+        __enabled = True
+    __logger.info("Serving the metrics on http://127.0.0.1:%s/metrics", port)
+    return port
+
+
+def stop() -> None:
+    global __enabled, __server
+
+    with __lock:
+        __enabled = False
+        server, __server = __server, None
+    if server:
+        server.shutdown()
+        server.server_close()
+
+
+############################################################################
+# updates
+############################################################################
+def inc(name: str, value: float = 1, **labels: str) -> None:
+    if not __enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with __lock:
+        __values[key] = __values.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float, **labels: str) -> None:
+    if not __enabled:
+        return
+    with __lock:
+        __values[(name, tuple(sorted(labels.items())))] = value
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    if not __enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with __lock:
+        # One count per bucket (not cumulative), then the count and the sum
+        histogram: list[float] | None = __histograms.get(key)
+        if histogram is None:
+            histogram = __histograms[key] = [0] * (len(BUCKETS) + 3)
+        histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+
+############################################################################
+# render
+############################################################################
+def render() -> str:
+    """
+    Returns:
+        str: Every metric in the Prometheus text exposition format
+    """
+
+    with __lock:
+        values: dict = dict(__values)
+        histograms: dict = {key: list(value) for key, value in __histograms.items()}
+
+    lines: list[str] = []
+    for name, (kind, help) in METRICS.items():
+        lines.append(f"# HELP {PREFIX}{name} {help}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for (metric, labels), value in values.items():
+            if metric == name:
+                lines.append(f"{PREFIX}{name}{_labels(labels)} {value:g}")
+        for (metric, labels), histogram in histograms.items():
+            if metric != name:
+                continue
+            cumulative: float = 0
+            for bound, count in zip(BUCKETS + (None,), histogram):
+                cumulative += count
+                le: str = "+Inf" if bound is None else f"{bound:g}"
+                lines.append(
+                    f"{PREFIX}{name}_bucket{_labels(labels + (('le', le),))} "
+                    f"{cumulative:g}"
+                )
+            lines.append(f"{PREFIX}{name}_count{_labels(labels)} {histogram[-2]:g}")
+            lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {histogram[-1]:.6f}")
+
+    lines.append(f"# HELP {PREFIX}resident_memory_bytes Resident memory")
+    lines.append(f"# TYPE {PREFIX}resident_memory_bytes gauge")
+    lines.append(f"{PREFIX}resident_memory_bytes {get_resident_memory()}")
+    return "\n".join(lines) + "\n"
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body: bytes = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes are not worth a line in the log file
+        pass
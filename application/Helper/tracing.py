@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   tracing.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Span tracing of the processing stages.  The ProcessImage steps,
+             each AI backend and each Worker step are wrapped in spans.
+             When tracing is off, a span is a single flag check.  When it is
+             on, every span is kept in memory and, at the end of the run,
+             written as a Chrome trace (chrome://tracing or
+             https://ui.perfetto.dev), with a latency histogram of every
+             stage in the log.
+
+             IMAGE_PROCESSOR_SPANS  - file of the Chrome trace, e.g.
+                                      'trace.json'.  Tracing is off when
+                                      it is not set.
+
+             with tracing.span("exif.load", "process_image"):
+                 ...
+
+             @tracing.traced("process_image")
+             def init(self, filepath: str) -> None:
+"""
+
+import bisect, contextlib, functools, json, logging, os, statistics, threading, time
+from logging import Logger
+from typing import Any, Callable, Iterator, TypeVar
+
+SPANS_ENV: str = "IMAGE_PROCESSOR_SPANS"
+# Upper bounds in milliseconds of the histogram buckets
+HISTOGRAM_BUCKETS: tuple[float, ...] = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+Function = TypeVar("Function", bound=Callable[..., Any])
+
+__filename: str | None = os.environ.get(SPANS_ENV) or None
+__enabled: bool = __filename is not None
+# Complete events, (name, category, thread id, start ns, duration ns, args)
+__events: list[tuple[str, str, int, int, int, dict | None]] = []
+__thread_names: dict[int, str] = {}
+__origin_ns: int = time.perf_counter_ns()
+__null_span: contextlib.nullcontext = contextlib.nullcontext()
+__logger: Logger = logging.getLogger(__name__)
+
+
+def is_enabled() -> bool:
+    return __enabled
+
+
+def enable(filename: str) -> None:
+    """
+    Turn the tracing on, e.g. from a benchmark, and start a new trace.
+
+    Args:
+        filename (str): File of the Chrome trace written by finish
+    """
+
+    global __filename, __enabled, __origin_ns
+
+    __filename = filename
+    __events.clear()
+    __thread_names.clear()
+    __origin_ns = time.perf_counter_ns()
+    __enabled = True
+
+
+def disable() -> None:
+    global __enabled
+
+    __enabled = False
+
+
+############################################################################
+# span
+############################################################################
+def span(
+    name: str, category: str = "", **args: Any
+) -> contextlib.AbstractContextManager:
+    """
+    Time the enclosed block.
+
+    Args:
+        name (str): Name of the stage, the histogram groups spans by name
+        category (str): Group of the stage, e.g. 'worker' or 'backend'
+        args (Any): Shown with the span in the trace viewer, e.g. the file
+
+    Returns:
+        contextlib.AbstractContextManager: The span, a shared no-op context
+        when tracing is off
+    """
+
+    if not __enabled:
+        return __null_span
+    return _record(name, category, args or None)
+
+
+@contextlib.contextmanager
+def _record(name: str, category: str, args: dict | None) -> Iterator[None]:
+    start: int = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        thread: threading.Thread = threading.current_thread()
+        __thread_names.setdefault(thread.ident, thread.name)
+        # list.append is atomic, the spans of every thread go in one list
+        __events.append(
+            (name, category, thread.ident, start, time.perf_counter_ns() - start, args)
+        )
+
+
+def add_span(
+    name: str,
+    category: str,
+    start: int,
+    duration: int,
+    thread: int,
+    thread_name: str,
+    **args: Any,
+) -> None:
+    """
+    Record a span timed elsewhere, e.g. an AI backend in an inference worker
+    process, whose own spans are not written.
+
+    Args:
+        name (str): Name of the stage
+        category (str): Group of the stage
+        start (int): time.perf_counter_ns() at the start, the same clock in
+            every process on Linux
+        duration (int): Nanoseconds
+        thread (int): Row of the span in the trace viewer, e.g. the pid
+        thread_name (str): Name of the row
+        args (Any): Shown with the span in the trace viewer
+    """
+
+    if not __enabled:
+        return
+    __thread_names.setdefault(thread, thread_name)
+    __events.append((name, category, thread, start, duration, args or None))
+
+
+def traced(
+    category: str = "", name: str | None = None
+) -> Callable[[Function], Function]:
+    """
+    Decorator that wraps every call of the function in a span named after
+    the function, e.g. 'ProcessImage.init'.
+    """
+
+    def decorator(function: Function) -> Function:
+        span_name: str = name or function.__qualname__.replace(".__", ".")
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not __enabled:
+                return function(*args, **kwargs)
+            with _record(span_name, category, None):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+############################################################################
+# finish
+############################################################################
+def finish() -> str | None:
+    """
+    End of a run: write the Chrome trace, log the histogram of every stage
+    and start a new trace.  Does nothing when tracing is off.
+
+    Returns:
+        str | None: The trace file, None when tracing is off
+    """
+
+    if not __enabled:
+        return None
+    events: list[tuple[str, str, int, int, int, dict | None]] = list(__events)
+    __events.clear()
+    export_chrome_trace(events, __filename)
+    for line in summary(events).splitlines():
+        __logger.info(line)
+    __logger.info("Wrote [%s] spans to [%s]", len(events), __filename)
+    return __filename
+
+
+def export_chrome_trace(
+    events: list[tuple[str, str, int, int, int, dict | None]], filename: str
+) -> None:
+    """
+    Write the spans in the Chrome trace event format, as complete ('X')
+    events in microseconds.
+    """
+
+    pid: int = os.getpid()
+    trace_events: list[dict[str, Any]] = [
+        {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": pid,
+            "tid": tid,
+            "args": {"name": thread_name},
+        }
+        for tid, thread_name in __thread_names.items()
+    ]
+    for name, category, tid, start, duration, args in events:
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "pid": pid,
+            "tid": tid,
+            "ts": (start - __origin_ns) / 1000,
+            "dur": duration / 1000,
+        }
+        if args:
+            event["args"] = {key: str(value) for key, value in args.items()}
+        trace_events.append(event)
+
+    temporary: str = filename + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
+    os.replace(temporary, filename)
+
+
+def summary(events: list[tuple[str, str, int, int, int, dict | None]]) -> str:
+    """
+    Returns:
+        str: One line per stage, slowest total first, with the count, the
+        total, p50, p95 and max in milliseconds and the number of spans in
+        each histogram bucket
+    """
+
+    durations: dict[str, list[float]] = {}
+    for name, _, _, _, duration, _ in events:
+        durations.setdefault(name, []).append(duration / 1e6)
+
+    labels: list[str] = [f"<{bound:g}" for bound in HISTOGRAM_BUCKETS]
+    labels.append(f">={HISTOGRAM_BUCKETS[-1]:g}")
+    lines: list[str] = [
+        f"{'stage':<40} {'count':>7} {'total ms':>10} {'p50':>8} {'p95':>8} "
+        f"{'max':>8}  {' '.join(labels)}"
+    ]
+    for name, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+        buckets: list[int] = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for value in values:
+            buckets[bisect.bisect_right(HISTOGRAM_BUCKETS, value)] += 1
+        p95: float = (
+            statistics.quantiles(values, n=20)[-1] if len(values) > 1 else values[0]
+        )
+        lines.append(
+            f"{name:<40} {len(values):7} {sum(values):10.1f} "
+            f"{statistics.median(values):8.2f} {p95:8.2f} {max(values):8.2f}  "
+            + " ".join(
+                f"{count:>{len(label)}}" for count, label in zip(buckets, labels)
+            )
+        )
+    return "\n".join(lines)
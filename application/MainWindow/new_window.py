@@ -9,7 +9,6 @@
 
 import logging, keyring
 from logging import Logger
-from huggingface_hub import login
 
 from PySide6.QtWidgets import (
     QMainWindow,
@@ -31,16 +30,22 @@ from PySide6.QtWidgets import (
     QTextBrowser,
     QDialogButtonBox,
     QComboBox,
+    QListWidget,
+    QListWidgetItem,
 )
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QTextCursor, QAction, QKeySequence, QIcon
 from Worker.worker import Worker
+from Worker.job_runner import JobRunner
+from Worker.model_loader import ModelLoader
 from .processing_options import ProcessingOptions
 from Helper.snippet import Snippet
 import Helper.file_to_string as helper
 
 from Processor.process_image import ProcessImage
+from Processor.run_metrics import format_snapshot
+from Processor.job_queue import Job, JobQueue, JobState
 
 
 
@@ -66,9 +71,19 @@ class MainWindow:
     __progress_layout: QVBoxLayout = None
     __log_text_edit: QTextEdit = None
     __progress_bar: QProgressBar = None
+    __metrics_label: QLabel = None
+    __metrics_timer: QTimer = None
     __start_button: QPushButton = None
+    __pause_button: QPushButton = None
     __quit_app_button: QPushButton = None
-    __worker: Worker = None
+    __jobs_group_box: QGroupBox = None
+    __jobs_list: QListWidget = None
+    __interleave_checkbox: QCheckBox = None
+    __job_queue: JobQueue = None
+    # The Worker of 'Start Processing' or the JobRunner of 'Run Queue'
+    __worker: Worker | JobRunner = None
+    __model_loader: ModelLoader = None
+    __process_image: ProcessImage = None
     __about_message: str = None
     __application_message: str = None
     __snippet: Snippet = None
@@ -80,6 +95,12 @@ class MainWindow:
     #
     __SERVICE_NAME = "ImageProcessorApplication"
     __TOKEN_KEY = "HuggingFaceAPIToken"
+    # Refresh period of the run metrics in milliseconds
+    __METRICS_INTERVAL = 1000
+    # Characters kept in the notification area, the oldest messages are
+    # removed beyond that so that a long run does not grow the document
+    # without bound.
+    __LOG_MAX_CHARACTERS = 2_000_000
 
     __logger: Logger = logging.getLogger(__name__)
     __root_dir: str = None
@@ -103,6 +124,7 @@ class MainWindow:
         self.__create_log_text_edit()
         self.__create_progress_bar()
         self.__create_start_button()
+        self.__create_jobs_group_box()
         self.__update_widget_dependencies()
 
     ############################################################################
@@ -112,11 +134,35 @@ class MainWindow:
         """Shows the main window."""
         self.__window.show()
         
-    def post_process(self):
-        
+    ############################################################################
+    # post_process
+    ############################################################################
+    def post_process(self) -> None:
+        """
+        Start loading the AI models in the background.  The window stays
+        responsive and the progress is shown in the status bar.
+        """
+
         self.__logger.info("Processing post_process")
-        self.__process_image:ProcessImage = ProcessImage()
-        self.__process_image.post_process()
+        if self.__model_loader and self.__model_loader.isRunning():
+            return
+        self.__model_loader = ModelLoader(self.__huggingface_token)
+        self.__model_loader.progress.connect(self.__on_model_progress)
+        self.__model_loader.loaded.connect(self.__on_models_loaded)
+        self.__model_loader.failed.connect(self.__on_models_failed)
+        self.__model_loader.start()
+
+    def __on_model_progress(self, message: str, percent: int) -> None:
+        self.__window.statusBar().showMessage(f"{message} ... {percent}%")
+
+    def __on_models_loaded(self, process_image: ProcessImage) -> None:
+        self.__process_image = process_image
+        self.__window.statusBar().showMessage("AI models are ready", 10000)
+        self.update_log_area("AI models are ready")
+
+    def __on_models_failed(self, error: str) -> None:
+        self.__window.statusBar().showMessage("Could not load the AI models")
+        self.update_log_area(f"Could not load the AI models [{error}]", "error")
 
     ############################################################################
     # open_directory_dialog
@@ -275,6 +321,19 @@ class MainWindow:
                 ProcessingOptions.CREATE_MONTH_FOLDER.name
             ].setChecked(False)
 
+    ############################################################################
+    # _classify_image_select
+    ############################################################################
+    def _classify_image_select(self) -> None:
+        # The OCR text and object labels are part of the AI description
+        checked: bool = self.__options_checkbox[
+            ProcessingOptions.CLASSIFY_IMAGE.name
+        ].isChecked()
+        for option in (ProcessingOptions.OCR_TEXT, ProcessingOptions.OBJECT_LABELS):
+            self.__options_checkbox[option.name].setEnabled(checked)
+            if not checked:
+                self.__options_checkbox[option.name].setChecked(False)
+
     ############################################################################
     # start_task
     ############################################################################
@@ -283,33 +342,18 @@ class MainWindow:
         Starts the background worker thread to simulate a task.
         """
 
-        if not self.__huggingface_token:
-            self.__create_message_box(
-                "Missing Huggingface Token",
-                "Please set the huggingface token using 'File Menu'",
-                "See the 'Help Application' section for more information",
-                QMessageBox.Icon.Critical,
-            )
-            return
-
-        if not self.__src_dir_path_line_edit.text():
-            self.__create_message_box(
-                "Missing Selection",
-                "Please select a source directory before processing.",
-                "See 'Source Directory Selection'",
-                QMessageBox.Icon.Warning,
-            )
+        if not self.__validate_form():
             return
 
         if (
-            self.__options_checkbox[ProcessingOptions.MOVE_FILES.name].isChecked()
-            or self.__options_checkbox[ProcessingOptions.COPY_FILES.name].isChecked()
-        ) and not self.__move_file_dir_path_line_edit.text():
+            self.__options_checkbox[ProcessingOptions.CLASSIFY_IMAGE.name].isChecked()
+            and not self.__process_image
+        ):
             self.__create_message_box(
-                "Missing Selection",
-                "You selected to move or copy the files to a destination directory, but haven't provided the destination directory.",
-                "See 'Destination Directory Selection'",
-                QMessageBox.Icon.Warning,
+                "AI Models Loading",
+                "The AI models are still loading, see the status bar.",
+                "Uncheck 'AI Description' to process the files without them.",
+                QMessageBox.Icon.Information,
             )
             return
 
@@ -338,6 +382,47 @@ class MainWindow:
             self.__worker.log_message.connect(self.update_log_area)
             self.__worker.finished.connect(self.task_finished)
             self.__worker.start()
+            self.__metrics_label.setText("")
+            self.__metrics_timer.start()
+
+    def __validate_form(self) -> bool:
+        """
+        Returns:
+            bool: True when the directories of the form can be processed
+            with its options, otherwise a message box tells what is missing
+        """
+
+        if not self.__huggingface_token:
+            self.__create_message_box(
+                "Missing Huggingface Token",
+                "Please set the huggingface token using 'File Menu'",
+                "See the 'Help Application' section for more information",
+                QMessageBox.Icon.Critical,
+            )
+            return False
+
+        if not self.__src_dir_path_line_edit.text():
+            self.__create_message_box(
+                "Missing Selection",
+                "Please select a source directory before processing.",
+                "See 'Source Directory Selection'",
+                QMessageBox.Icon.Warning,
+            )
+            return False
+
+        if (
+            self.__options_checkbox[ProcessingOptions.MOVE_FILES.name].isChecked()
+            or self.__options_checkbox[ProcessingOptions.COPY_FILES.name].isChecked()
+        ) and not self.__move_file_dir_path_line_edit.text():
+            self.__create_message_box(
+                "Missing Selection",
+                "You selected to move or copy the files to a destination directory, but haven't provided the destination directory.",
+                "See 'Destination Directory Selection'",
+                QMessageBox.Icon.Warning,
+            )
+            return False
+
+        return True
 
     def stop_task(self, message_box: bool = True):
         if self.__worker is None or not self.__worker.isRunning():
@@ -351,6 +436,27 @@ class MainWindow:
         else:
             self.__worker.setStop()
             self.__worker.requestInterruption()
+            self.__pause_button.setText("Pause Processing")
+
+    def pause_task(self) -> None:
+        """
+        Pause or resume the running task.  A paused task keeps the models
+        and its queue, it continues where it stopped.
+        """
+
+        if self.__worker is None or not self.__worker.isRunning():
+            return
+        if self.__worker.is_paused():
+            self.__worker.resume()
+            self.__pause_button.setText("Pause Processing")
+            self.update_log_area("Resumed", "header")
+        else:
+            self.__worker.pause()
+            self.__pause_button.setText("Resume Processing")
+            self.update_log_area(
+                "Pausing after the current step.  Press Resume to continue.",
+                "header",
+            )
 
     def update_log_area(self, message: str, type: str = "default") -> None:
         """
@@ -385,6 +491,127 @@ class MainWindow:
         # the last item written.
         self.__log_text_edit.moveCursor(QTextCursor.MoveOperation.End)
         self.__log_text_edit.insertHtml(html_message)
+        self.__trim_log_area()
+
+    def __trim_log_area(self) -> None:
+        """
+        Remove the oldest quarter of the notification area once it is over
+        __LOG_MAX_CHARACTERS, so that the trim is rare.
+        """
+
+        document = self.__log_text_edit.document()
+        if document.characterCount() <= self.__LOG_MAX_CHARACTERS:
+            return
+        cursor: QTextCursor = QTextCursor(document)
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Right,
+            QTextCursor.MoveMode.KeepAnchor,
+            document.characterCount() - self.__LOG_MAX_CHARACTERS * 3 // 4,
+        )
+        cursor.movePosition(
+            QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor
+        )
+        cursor.removeSelectedText()
+        self.__log_text_edit.moveCursor(QTextCursor.MoveOperation.End)
+
+    ############################################################################
+    # job queue
+    ############################################################################
+    def add_job(self) -> None:
+        """
+        Add the directories and the options of the form to the job queue.
+        """
+
+        if not self.__validate_form():
+            return
+        job: Job = self.__job_queue.add(
+            self.__src_dir_path_line_edit.text(),
+            self.__move_file_dir_path_line_edit.text(),
+            {key: value.isChecked() for key, value in self.__options_checkbox.items()},
+            self.__ai_option.currentIndex(),
+        )
+        self.update_log_area(f"Added job [{job.describe()}]", "header")
+        self.__refresh_jobs()
+
+    def remove_job(self) -> None:
+        item: QListWidgetItem | None = self.__jobs_list.currentItem()
+        if item is None:
+            return
+        job: Job | None = self.__job_queue.get_job(
+            item.data(Qt.ItemDataRole.UserRole)
+        )
+        if job and job.state == JobState.RUNNING:
+            self.__create_message_box(
+                "Job Running",
+                "The job is running and cannot be removed.",
+                "Stop the queue with 'Stop Processing' first.",
+                QMessageBox.Icon.Warning,
+            )
+            return
+        if job:
+            self.__job_queue.remove(job.id)
+        self.__refresh_jobs()
+
+    def clear_finished_jobs(self) -> None:
+        self.__job_queue.clear_finished()
+        self.__refresh_jobs()
+
+    def run_queue(self) -> None:
+        """
+        Run the pending jobs with the loaded models, one after the other or
+        interleaved.  Jobs added while the queue runs are picked up.
+        """
+
+        if self.__worker is not None and self.__worker.isRunning():
+            self.__create_message_box(
+                "Processing",
+                "The application is already processing files.",
+                "Jobs added to the queue are picked up by a running queue.",
+            )
+            return
+
+        pending: list[Job] = self.__job_queue.get_pending()
+        if not pending:
+            self.__create_message_box(
+                "No Pending Jobs",
+                "The job queue has no pending job.",
+                "Fill in the form and press 'Add to Queue'.",
+            )
+            return
+
+        if not self.__process_image and any(
+            job.options.get(ProcessingOptions.CLASSIFY_IMAGE.name) for job in pending
+        ):
+            self.__create_message_box(
+                "AI Models Loading",
+                "The AI models are still loading, see the status bar.",
+                "Jobs with 'AI Description' need them, please wait.",
+                QMessageBox.Icon.Information,
+            )
+            return
+
+        self.update_log_area(f"Running [{len(pending)}] jobs", "header")
+        self.__worker = JobRunner(
+            self.__process_image,
+            self.__job_queue,
+            interleave=self.__interleave_checkbox.isChecked(),
+        )
+        self.__worker.progress.connect(self.__progress_bar.setValue)
+        self.__worker.log_message.connect(self.update_log_area)
+        self.__worker.job_changed.connect(lambda _: self.__refresh_jobs())
+        self.__worker.finished.connect(self.task_finished)
+        self.__worker.start()
+        self.__metrics_label.setText("")
+        self.__metrics_timer.start()
+
+    def __refresh_jobs(self) -> None:
+        self.__jobs_list.clear()
+        for job in self.__job_queue.get_jobs():
+            item: QListWidgetItem = QListWidgetItem(job.describe())
+            item.setData(Qt.ItemDataRole.UserRole, job.id)
+            if job.summary:
+                item.setToolTip("\n".join(job.summary))
+            self.__jobs_list.addItem(item)
 
     ############################################################################
     # task_finished
@@ -393,8 +620,22 @@ class MainWindow:
         """
         Called when the worker thread is finished.
         """
+        self.__pause_button.setText("Pause Processing")
         self.update_log_area("Task Complete", "header")
         self.__progress_bar.setValue(100)  # Ensure it ends at 100%
+        self.__metrics_timer.stop()
+        self.__update_metrics()
+        self.__refresh_jobs()
+
+    def __update_metrics(self) -> None:
+        """
+        Show the metrics of the run under the progress bar.  Called by a
+        timer at a fixed low rate, whatever the speed of the run.
+        """
+
+        metrics = self.__worker.get_metrics() if self.__worker else None
+        if metrics:
+            self.__metrics_label.setText("\n".join(format_snapshot(metrics.snapshot())))
 
     ############################################################################
     # __create_main_window
@@ -523,6 +764,9 @@ class MainWindow:
                 self.__options_checkbox[ProcessingOptions.COPY_FILES.name]
             )
         )
+        self.__options_checkbox[ProcessingOptions.CLASSIFY_IMAGE.name].clicked.connect(
+            self._classify_image_select
+        )
 
     ############################################################################
     # __create_src_dir_group_box
@@ -619,6 +863,15 @@ class MainWindow:
         self.__progress_bar.setTextVisible(True)
         self.__progress_bar.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
+        self.__metrics_label = QLabel("")
+        self.__metrics_label.setWordWrap(True)
+        self.__metrics_label.setTextInteractionFlags(
+            Qt.TextInteractionFlag.TextSelectableByMouse
+        )
+        self.__metrics_timer = QTimer(self.__window)
+        self.__metrics_timer.setInterval(self.__METRICS_INTERVAL)
+        self.__metrics_timer.timeout.connect(self.__update_metrics)
+
     ############################################################################
     # __create_start_button
     ############################################################################
@@ -636,14 +889,75 @@ class MainWindow:
         self.__stop_button.clicked.connect(lambda: self.stop_task(message_box=True))
         self.__stop_button.setObjectName("stopButton")
 
+        self.__pause_button = QPushButton("Pause Processing")
+        self.__pause_button.clicked.connect(self.pause_task)
+        self.__pause_button.setObjectName("pauseButton")
+
         self.__button_layout: QHBoxLayout = QHBoxLayout()
         self.__button_layout.addWidget(
             self.__start_button, 0, Qt.AlignmentFlag.AlignLeft
         )
+        self.__button_layout.addWidget(
+            self.__pause_button, 0, Qt.AlignmentFlag.AlignCenter
+        )
         self.__button_layout.addWidget(
             self.__stop_button, 0, Qt.AlignmentFlag.AlignRight
         )
 
+    ############################################################################
+    # __create_jobs_group_box
+    ############################################################################
+    def __create_jobs_group_box(self) -> None:
+        """
+        Job queue, kept between the runs of the application.
+        """
+        self.__job_queue = JobQueue()
+
+        self.__jobs_group_box = QGroupBox("Job Queue")
+        self.__jobs_layout: QVBoxLayout = QVBoxLayout()
+        self.__jobs_layout.setSpacing(10)
+
+        self.__jobs_list = QListWidget()
+        self.__jobs_list.setObjectName("jobList")
+        self.__jobs_list.setMaximumHeight(120)
+
+        add_job_button: QPushButton = QPushButton("Add to Queue")
+        add_job_button.setToolTip(
+            "Add the source, destination and options above as a job"
+        )
+        add_job_button.clicked.connect(self.add_job)
+        add_job_button.setObjectName("addJobButton")
+
+        remove_job_button: QPushButton = QPushButton("Remove Job")
+        remove_job_button.clicked.connect(self.remove_job)
+        remove_job_button.setObjectName("removeJobButton")
+
+        clear_jobs_button: QPushButton = QPushButton("Clear Finished")
+        clear_jobs_button.clicked.connect(self.clear_finished_jobs)
+        clear_jobs_button.setObjectName("clearJobsButton")
+
+        self.__interleave_checkbox = QCheckBox("Interleave Jobs")
+        self.__interleave_checkbox.setToolTip(
+            "Run the jobs in turn, a few files each, instead of one after the other"
+        )
+
+        run_queue_button: QPushButton = QPushButton("Run Queue")
+        run_queue_button.clicked.connect(self.run_queue)
+        run_queue_button.setObjectName("runQueueButton")
+
+        jobs_button_layout: QHBoxLayout = QHBoxLayout()
+        jobs_button_layout.addWidget(add_job_button)
+        jobs_button_layout.addWidget(remove_job_button)
+        jobs_button_layout.addWidget(clear_jobs_button)
+        jobs_button_layout.addStretch(1)
+        jobs_button_layout.addWidget(self.__interleave_checkbox)
+        jobs_button_layout.addWidget(run_queue_button)
+
+        self.__jobs_layout.addWidget(self.__jobs_list)
+        self.__jobs_layout.addLayout(jobs_button_layout)
+        self.__jobs_group_box.setLayout(self.__jobs_layout)
+        self.__refresh_jobs()
+
     ############################################################################
     # __update_widget_dependencies
     ############################################################################
@@ -664,12 +978,14 @@ class MainWindow:
         # Add the src dir browse and all of the widgets for it
         self.__main_layout.addWidget(self.__src_dir_group_box)
         self.__main_layout.addWidget(self.__move_file_dir_group_box)
+        self.__main_layout.addWidget(self.__jobs_group_box)
 
         self.__progress_layout.addWidget(QLabel("Log:"))
         self.__progress_layout.addWidget(self.__log_text_edit)
 
         self.__progress_layout.addWidget(QLabel("Progress:"))
         self.__progress_layout.addWidget(self.__progress_bar)
+        self.__progress_layout.addWidget(self.__metrics_label)
 
         # self.__progress_layout.addWidget(
         #     self.__start_button, 0, Qt.AlignmentFlag.AlignRight
@@ -692,6 +1008,7 @@ class MainWindow:
         # Set stretch factors for the main layout
         self.__main_layout.setStretchFactor(self.__options_group_box, 0)
         self.__main_layout.setStretchFactor(self.__src_dir_group_box, 0)
+        self.__main_layout.setStretchFactor(self.__jobs_group_box, 0)
         self.__main_layout.setStretchFactor(self.__progress_group_box, 1)
 
     ############################################################################
@@ -733,17 +1050,22 @@ class MainWindow:
         return separator
 
     def __load_huggingface_token_from_user(self) -> None:
+        # The login is done by the ModelLoader, away from the GUI thread.
         self.__huggingface_token = keyring.get_password(
             self.__SERVICE_NAME, self.__TOKEN_KEY
         )
-        self.__login_huggingface()
 
     def __set_huggingface_token_from_user(self, token: str) -> None:
         self.__logger.info("Setting huggingface token to system")
         keyring.set_password(self.__SERVICE_NAME, self.__TOKEN_KEY, token)
         self.__huggingface_token = token
         self.__login_huggingface()
+        # Retry the models, they may have failed without the token
+        if not self.__process_image:
+            self.post_process()
 
     def __login_huggingface(self) -> None:
         if self.__huggingface_token:
+            from huggingface_hub import login
+
             login(token=self.__huggingface_token)
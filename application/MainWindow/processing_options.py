@@ -44,3 +44,24 @@ class ProcessingOptions(Enum):
         "checked": True,
         "enabled": True,
     }
+    OCR_TEXT = {
+        "objectName": "ai_ocr_text",
+        "title": "AI Text (OCR)",
+        "description": "With the AI description, also add the text that is written in the image",
+        "checked": False,
+        "enabled": True,
+    }
+    OBJECT_LABELS = {
+        "objectName": "ai_object_labels",
+        "title": "AI Objects",
+        "description": "With the AI description, also add the names of the objects found in the image",
+        "checked": False,
+        "enabled": True,
+    }
+    NETWORK_STORAGE = {
+        "objectName": "network_storage",
+        "title": "Network Storage",
+        "description": "The directories are on a NAS or a network share: list, read and rename several files at a time to hide the round trips",
+        "checked": False,
+        "enabled": True,
+    }
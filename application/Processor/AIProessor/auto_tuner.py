@@ -0,0 +1,273 @@
+import datetime, json, logging, os, platform, time
+import torch
+from logging import Logger
+from typing import Any, NamedTuple
+from PIL import ImageFile
+
+import Helper.app_paths as app_paths
+from .image_pyramid import ImagePyramid
+from .image_to_text_abstract import ImageDescription, ImageTask, ImageToTextBase
+from .inference_pool import BackendTiming, InferencePool
+
+TUNING_FILE: str = "tuning.json"
+
+
+class TuningConfig(NamedTuple):
+    """
+    Best settings found for one backend on this machine.
+    """
+
+    intra_op_threads: int
+    inter_op_threads: int
+    # Processes of the InferencePool, 1 runs the models in process
+    workers: int
+    images_per_second: float = 0.0
+
+
+def get_host_key(device: str) -> str:
+    """
+    Identify the machine, so that one tuning file can be shared between
+    machines through a synced home directory.
+    """
+
+    host: str = f"{platform.node()}|{os.cpu_count()}|{device}"
+    if device == "cuda":
+        host += f"|{torch.cuda.get_device_name(0)}"
+    return host
+
+
+def get_model_key(backends: list[ImageToTextBase]) -> str:
+    return "+".join(sorted(backend.get_name() for backend in backends))
+
+
+############################################################################
+# load_tuning
+############################################################################
+def load_tuning(device: str, model_key: str) -> dict[str, TuningConfig]:
+    """
+    Returns:
+        dict[str, TuningConfig]: Tuning of each backend by name, empty when
+        this machine and model set have not been tuned
+    """
+
+    filename: str = app_paths.get_config_file(TUNING_FILE)
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            tuning: dict[str, Any] = json.load(file)
+        entry: dict[str, Any] = tuning[get_host_key(device)][model_key]
+        # The tunings saved before also have a batch size, it is not used
+        return {
+            name: TuningConfig(
+                **{
+                    key: value
+                    for key, value in values.items()
+                    if key in TuningConfig._fields
+                }
+            )
+            for name, values in entry["backends"].items()
+        }
+    except (FileNotFoundError, KeyError):
+        return {}
+    except Exception as e:
+        logging.getLogger(__name__).warning(
+            "Could not read the tuning file [%s]. [%s]", filename, e
+        )
+        return {}
+
+
+############################################################################
+# save_tuning
+############################################################################
+def save_tuning(
+    device: str, model_key: str, configs: dict[str, TuningConfig]
+) -> str:
+    """
+    Store the tuning of this machine and model set, keeping the entries of
+    the other machines.
+
+    Returns:
+        str: Path of the tuning file
+    """
+
+    filename: str = app_paths.get_config_file(TUNING_FILE)
+    tuning: dict[str, Any] = {}
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            tuning = json.load(file)
+    except (FileNotFoundError, ValueError):
+        pass
+
+    tuning.setdefault(get_host_key(device), {})[model_key] = {
+        "tuned": datetime.datetime.now().isoformat(timespec="seconds"),
+        "backends": {name: config._asdict() for name, config in configs.items()},
+    }
+    # Write to a temporary file first so a crash never leaves half a file
+    temporary: str = filename + ".tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(tuning, file, indent=2)
+    os.replace(temporary, filename)
+    return filename
+
+
+def apply_inter_op_threads(threads: int) -> None:
+    """
+    torch only accepts the inter-op thread count before the first parallel
+    operation, so it is applied once when the models are loaded.
+    """
+
+    try:
+        if torch.get_num_interop_threads() != threads:
+            torch.set_num_interop_threads(threads)
+    except RuntimeError as e:
+        logging.getLogger(__name__).debug(
+            "Inter-op threads already set to [%s]. [%s]",
+            torch.get_num_interop_threads(),
+            e,
+        )
+
+
+class AutoTuner:
+    """
+    # Auto Tuner
+
+    Short calibration of every backend on a few sample images.  The thread
+    count of one process is swept first.  Then, on a CPU where it is
+    supported, the number of InferencePool worker processes is swept with
+    a real pool, each worker with its share of the cores as when the files
+    are described.  The fastest setting in images per second is kept.  A
+    full grid would take too long on a 64 core server.
+
+    The inter-op thread count cannot be changed once torch has run, so it
+    is not swept.  It is set so that the workers times the intra-op
+    threads do not exceed the cores.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        images: list[ImageFile],
+        level: int = 0,
+        min_images: int = 8,
+        pool: bool = False,
+    ) -> None:
+        """
+        Args:
+            images (list[ImageFile]): Decoded RGB sample images
+            level (int): Level of detail used for the calibration
+            min_images (int): Images processed per trial, the samples are
+                repeated when there are fewer
+            pool (bool): Also sweep the workers of an InferencePool, only on
+                a CPU where InferencePool.is_supported
+        """
+
+        self.__images = images
+        self.__level = level
+        self.__min_images = max(min_images, len(images))
+        self.__pool = pool
+        self.__cores: int = os.cpu_count() or 1
+
+    ############################################################################
+    # tune
+    ############################################################################
+    def tune(self, backend: ImageToTextBase) -> TuningConfig:
+        """
+        Returns:
+            TuningConfig: Fastest setting found for the backend
+        """
+
+        # Warm up the kernels so the first trial is not penalized
+        self.__trial(backend, self.__cores)
+
+        best: TuningConfig = max(
+            (self.__trial(backend, threads) for threads in self.__thread_candidates()),
+            key=lambda config: config.images_per_second,
+        )
+        if self.__pool:
+            # As ImageToText does before it forks the workers
+            for model in backend.get_models():
+                model.share_memory()
+            best = max(
+                [best]
+                + [
+                    self.__pool_trial(backend, workers)
+                    for workers in (2, 4)
+                    if workers <= self.__cores
+                ],
+                key=lambda config: config.images_per_second,
+            )
+        self.__logger.info("Best setting for [%s] is [%s]", backend.get_name(), best)
+        return best
+
+    def __thread_candidates(self) -> list[int]:
+        candidates: list[int] = []
+        threads: int = self.__cores
+        while threads >= 1 and len(candidates) < 4:
+            candidates.append(threads)
+            threads //= 2
+        return candidates
+
+    def __trial(self, backend: ImageToTextBase, threads: int) -> TuningConfig:
+        """
+        Describe the images one after the other in this process.
+        """
+
+        torch.set_num_threads(threads)
+        start: float = time.perf_counter()
+        for index in range(self.__min_images):
+            self.__describe(backend, index)
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+        return self.__config(
+            backend, threads, 1, self.__min_images, time.perf_counter() - start
+        )
+
+    def __pool_trial(self, backend: ImageToTextBase, workers: int) -> TuningConfig:
+        """
+        Describe the images with an InferencePool of the given workers, each
+        with its default share of the threads.
+        """
+
+        def describe(
+            key: str, level: int, tasks: frozenset[ImageTask]
+        ) -> tuple[ImageDescription, tuple[BackendTiming, ...]]:
+            self.__describe(backend, int(key))
+            return ImageDescription([]), ()
+
+        pool: InferencePool = InferencePool(describe, workers)
+        keys: list[str] = [str(index) for index in range(self.__min_images)]
+        start: float = time.perf_counter()
+        pool.start(keys, self.__level)
+        try:
+            described: int = sum(pool.take(key) is not None for key in keys)
+        finally:
+            pool.stop()
+        return self.__config(
+            backend,
+            max(1, self.__cores // workers),
+            workers,
+            described,
+            time.perf_counter() - start,
+        )
+
+    def __describe(self, backend: ImageToTextBase, index: int) -> None:
+        image: ImageFile = self.__images[index % len(self.__images)]
+        pyramid: ImagePyramid = ImagePyramid(image, backend.get_preprocess_specs())
+        backend.process(image, self.__level, backend.preprocess(pyramid))
+
+    def __config(
+        self,
+        backend: ImageToTextBase,
+        threads: int,
+        workers: int,
+        images: int,
+        elapsed: float,
+    ) -> TuningConfig:
+        config: TuningConfig = TuningConfig(
+            intra_op_threads=threads,
+            inter_op_threads=max(1, self.__cores // (threads * workers)),
+            workers=workers,
+            images_per_second=round(images / elapsed, 3),
+        )
+        self.__logger.info("Trial [%s] => [%s]", backend.get_name(), config)
+        return config
@@ -3,11 +3,15 @@ from PIL import ImageFile
 
 import logging, torch
 from logging import Logger
-from .image_to_text_abstract import ImageToTextBase
+from typing import Any
+from .image_to_text_abstract import ImageDescription, ImageTask, ImageToTextBase
+from .generation_profile import GENERATION_PROFILES, GenerationProfile
+from .image_pyramid import ImagePyramid, PixelBatch, PreprocessSpec
+from . import model_snapshot
 
 
 class AutomodelLLM(ImageToTextBase):
-    __logger: Logger = logging.getLogger(__file__)
+    __logger: Logger = logging.getLogger(__name__)
     __model_name = "microsoft/Florence-2-large"
 
     def __init__(self, device: str) -> None:
@@ -21,48 +25,194 @@ class AutomodelLLM(ImageToTextBase):
         # `"flash_attention_3"` (using [Dao-AILab/flash-attention/hopper](https://github.com/Dao-AILab/flash-attention/tree/main/hopper)).
         # By default, if available, SDPA will be used for torch>=2.1.1.
         # The default is otherwise the manual `"eager"` implementation.
+        path, kwargs = model_snapshot.resolve(self.__model_name)
+        kwargs.setdefault("torch_dtype", "auto")
         self.__model = (
             AutoModelForCausalLM.from_pretrained(
-                self.__model_name,
+                path,
                 trust_remote_code=True,
                 attn_implementation="eager",
-                torch_dtype="auto",
+                **kwargs,
             )
             .eval()
             .cuda()
         )
         self.__processor = AutoProcessor.from_pretrained(
-            self.__model_name, trust_remote_code=True
+            path,
+            trust_remote_code=True,
+            local_files_only=kwargs.get("local_files_only", False),
         )
 
+        self.__spec: PreprocessSpec = PreprocessSpec.from_image_processor(
+            self.__processor.image_processor
+        )
+        self.__batch: PixelBatch = PixelBatch(self.__spec)
         self.__prompts = ("<CAPTION>", "<DETAILED_CAPTION>", "<MORE_DETAILED_CAPTION>")
+        self.__device = device
+        # The OCR and object detection answers can be long whatever the level
+        self.__task_max_new_tokens = 1024
+        self.__ocr_prompt = "<OCR>"
+        self.__objects_prompt = "<OD>"
+        self.__input_ids: dict[str, torch.Tensor] = {}
+
+    @classmethod
+    def prepare_snapshot(cls, dtype: str) -> list[str]:
+        # Saving a remote code model copies its modeling and processing code
+        return [
+            model_snapshot.save_snapshot(
+                cls.__model_name,
+                dtype,
+                AutoModelForCausalLM.from_pretrained(
+                    cls.__model_name, trust_remote_code=True, torch_dtype=dtype
+                ),
+                [
+                    AutoProcessor.from_pretrained(
+                        cls.__model_name, trust_remote_code=True
+                    )
+                ],
+            )
+        ]
+
+    def get_models(self) -> list[Any]:
+        return [self.__model]
+
+    def get_preprocess_specs(self) -> list[PreprocessSpec]:
+        return [self.__spec]
+
+    def preprocess(self, pyramid: ImagePyramid) -> torch.Tensor:
+        """
+        The pixel values do not depend on the prompt, so they can be
+        computed ahead of time by the prefetch threads.
+        """
+
+        return pyramid.pixel_values(self.__spec)
 
-    def process(self, image: ImageFile, level: int) -> list[str]:
-        inputs = self.__processor(
-            text=self.__prompts[level], images=image, return_tensors="pt"
-        ).to("cuda", torch.float16)
-
-        generated_ids = self.__model.generate(
-            input_ids=inputs["input_ids"].cuda(),
-            pixel_values=inputs["pixel_values"].cuda(),
-            max_new_tokens=1024,
-            early_stopping=False,
-            do_sample=False,
-            num_beams=3,
+    def preprocess_batch(self, pyramids: list[ImagePyramid]) -> list[torch.Tensor]:
+        pixel_values: torch.Tensor = self.__batch.fill(pyramids)
+        return [pixel_values[index : index + 1] for index in range(len(pyramids))]
+
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: torch.Tensor | None = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> ImageDescription:
+        """
+        Run the caption prompt of the level and the prompt of every extra
+        task.  The DaViT vision encoder is the costly part of Florence and
+        its output does not depend on the prompt, so the image is encoded
+        once and the features are reused by every prompt.
+        """
+
+        pixel_values: torch.Tensor = (
+            inputs
+            if inputs is not None
+            else self.preprocess(ImagePyramid(image, [self.__spec]))
         )
+        pixel_values = pixel_values.to("cuda", torch.float16, non_blocking=True)
+        profile = profile or GENERATION_PROFILES[level]
+        task_profile: GenerationProfile = profile._replace(
+            max_new_tokens=self.__task_max_new_tokens
+        )
+
+        with torch.inference_mode():
+            image_features: torch.Tensor | None = None
+            if hasattr(self.__model, "_encode_image"):
+                image_features = self.__model._encode_image(pixel_values)
+
+            caption_prompt: str = self.__prompts[level]
+            caption: str = self.__run_task(
+                caption_prompt, profile, image, pixel_values, image_features
+            )
+            ocr: str = ""
+            if ImageTask.OCR in tasks:
+                ocr = self.__run_task(
+                    self.__ocr_prompt, task_profile, image, pixel_values, image_features
+                ).strip()
+            objects: tuple[str, ...] = ()
+            if ImageTask.OBJECTS in tasks:
+                detected: dict[str, list] = self.__run_task(
+                    self.__objects_prompt,
+                    task_profile,
+                    image,
+                    pixel_values,
+                    image_features,
+                )
+                # Unique labels, in the order of detection
+                objects = tuple(dict.fromkeys(detected.get("labels", [])))
+
+        return ImageDescription([caption], ocr, objects)
+
+    def get_name(self):
+        return "automodel_llm"
+
+    def __run_task(
+        self,
+        prompt: str,
+        profile: GenerationProfile,
+        image: ImageFile,
+        pixel_values: torch.Tensor,
+        image_features: torch.Tensor | None,
+    ) -> Any:
+        """
+        Generate and parse the answer of one task prompt.  Same steps as the
+        generate of the Florence model, starting from the encoded image when
+        there is one.
+
+        Returns:
+            Any: Parsed answer, a string for the caption and OCR tasks and a
+            dict of bboxes and labels for the object detection task
+        """
+
+        input_ids: torch.Tensor = self.__get_input_ids(prompt).cuda()
+        settings: dict[str, Any] = profile.generate_kwargs(self.__device)
+        if image_features is None:
+            generated_ids = self.__model.generate(
+                input_ids=input_ids, pixel_values=pixel_values, **settings
+            )
+        else:
+            inputs_embeds = self.__model.get_input_embeddings()(input_ids)
+            inputs_embeds, attention_mask = (
+                self.__model._merge_input_ids_with_image_features(
+                    image_features, inputs_embeds
+                )
+            )
+            generated_ids = self.__model.language_model.generate(
+                input_ids=None,
+                inputs_embeds=inputs_embeds,
+                attention_mask=attention_mask,
+                **settings,
+            )
+
         generated_text = self.__processor.batch_decode(
             generated_ids, skip_special_tokens=False
         )[0]
         parsed_answer = self.__processor.post_process_generation(
             generated_text,
-            task=self.__prompts[level],
+            task=prompt,
             image_size=(image.width, image.height),
         )
-        text: str = parsed_answer[self.__prompts[level]]
-        self.__logger.info(
-            f"automodel_llm generated leve [{self.__prompts[level]}] text [{generated_text}] -> parsed answer [{parsed_answer}] -> text [{text}]"
+        self.__logger.debug(
+            "automodel_llm task [%s] generated [%s] -> parsed answer [%s]",
+            prompt,
+            generated_text,
+            parsed_answer,
         )
-        return [text]
+        return parsed_answer[prompt]
 
-    def get_name(self):
-        return "automodel_llm"
+    def __get_input_ids(self, prompt: str) -> torch.Tensor:
+        """
+        Tokenize the task prompt once and reuse it for every image.  The
+        Florence processor expands the task token, e.g. <CAPTION>, into the
+        text prompt before tokenizing.
+        """
+
+        if prompt not in self.__input_ids:
+            construct_prompts = getattr(self.__processor, "_construct_prompts", None)
+            text: str = construct_prompts([prompt])[0] if construct_prompts else prompt
+            self.__input_ids[prompt] = self.__processor.tokenizer(
+                text, return_tensors="pt"
+            )["input_ids"]
+        return self.__input_ids[prompt]
@@ -1,6 +1,10 @@
 from PIL import ImageFile
 from transformers import CLIPProcessor, CLIPModel
-from .image_to_text_abstract import ImageToTextBase
+from .image_to_text_abstract import ImageTask, ImageToTextBase
+from .generation_profile import GenerationProfile
+from .image_pyramid import ImagePyramid, PixelBatch, PreprocessSpec
+from . import model_snapshot
+from typing import Any
 import logging
 from logging import Logger
 
@@ -10,18 +14,62 @@ class ClipProcessor(ImageToTextBase):
     __model_name = "geolocal/StreetCLIP"
     __model: CLIPModel = None
     __processor: CLIPProcessor = None
-    __logger: Logger = logging.getLogger(__file__)
+    __spec: PreprocessSpec = None
+    __batch: PixelBatch = None
+    __logger: Logger = logging.getLogger(__name__)
 
     def __init__(self, device: str) -> None:
-        self.__model = CLIPModel.from_pretrained(self.__model_name)
-        self.__processor = CLIPProcessor.from_pretrained(self.__model_name)
+        path, kwargs = model_snapshot.resolve(self.__model_name)
+        self.__model = CLIPModel.from_pretrained(path, **kwargs)
+        self.__processor = CLIPProcessor.from_pretrained(
+            path, local_files_only=kwargs.get("local_files_only", False)
+        )
+        self.__spec = PreprocessSpec.from_image_processor(
+            self.__processor.image_processor
+        )
+        self.__batch = PixelBatch(self.__spec)
 
-    def process(self, image: ImageFile, level:int) -> list[str]:
-        self.__logger.info("Processing clip processor")
-        inputs = self.__processor(images=image, return_tensors="pt", padding=True)
+    @classmethod
+    def prepare_snapshot(cls, dtype: str) -> list[str]:
+        return [
+            model_snapshot.save_snapshot(
+                cls.__model_name,
+                dtype,
+                CLIPModel.from_pretrained(cls.__model_name, torch_dtype=dtype),
+                [CLIPProcessor.from_pretrained(cls.__model_name)],
+            )
+        ]
+
+    def get_models(self) -> list[Any]:
+        return [self.__model]
+
+    def get_preprocess_specs(self) -> list[PreprocessSpec]:
+        return [self.__spec]
+
+    def preprocess(self, pyramid: ImagePyramid) -> Any:
+        return {"pixel_values": pyramid.pixel_values(self.__spec)}
+
+    def preprocess_batch(self, pyramids: list[ImagePyramid]) -> list[Any]:
+        pixel_values = self.__batch.fill(pyramids)
+        return [
+            {"pixel_values": pixel_values[index : index + 1]}
+            for index in range(len(pyramids))
+        ]
+
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: Any = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> list[str]:
+        self.__logger.debug("Processing clip processor")
+        if inputs is None:
+            inputs = self.preprocess(ImagePyramid(image, [self.__spec]))
 
         outputs = self.__model(**inputs)
-        self.__logger.info(f"OUTPUT [{outputs}]")
+        self.__logger.debug("OUTPUT [%s]", outputs)
         # this is the image-text similarity score
         logits_per_image = outputs.logits_per_image
         # we can take the softmax to get the label probabilities
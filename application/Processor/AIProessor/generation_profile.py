@@ -0,0 +1,160 @@
+import time
+from typing import Any, NamedTuple
+from Helper.cancel_token import CancelToken, Cancelled
+
+
+class GenerationProfile(NamedTuple):
+    """
+    How much effort the text generation spends for one level of detail.  The
+    Brief level must be fast, so it decodes greedily with a small token cap,
+    while the Full level keeps the beam search and the large cap.
+    """
+
+    name: str
+    num_beams: int
+    max_new_tokens: int
+    # Only used with beam search, > 1.0 favors longer texts
+    length_penalty: float = 1.0
+    # Stop the loops of repeated phrases, 0 keeps the model default
+    no_repeat_ngram_size: int = 0
+    # > 1.0 penalizes repeated tokens, 1.0 keeps the model default
+    repetition_penalty: float = 1.0
+    # Stop the beam search as soon as num_beams candidates are finished
+    early_stopping: bool = False
+    # Beam search is several times slower on a CPU, decode greedily there
+    cpu_greedy: bool = True
+    # Time of the clock 'now' at which the generation stops, None for no
+    # deadline.  Set per image by ImageToText, see ImageBudget.
+    deadline: float | None = None
+    # Checked after every token, pauses or stops the generation.  Set per
+    # run by ImageToText.
+    cancel: CancelToken | None = None
+
+    def now(self) -> float:
+        """
+        Clock of the deadline, the time the run is paused does not count.
+        """
+        return self.cancel.get_active_time() if self.cancel else time.monotonic()
+
+    ############################################################################
+    # generate_kwargs
+    ############################################################################
+    def generate_kwargs(
+        self, device: str, max_new_tokens: int | None = None
+    ) -> dict[str, Any]:
+        """
+        Arguments of 'generate' for this profile.
+
+        Args:
+            device (str): Device of the model, 'cuda', 'mps' or 'cpu'
+            max_new_tokens (int | None): Cap of the backend, the smaller of
+                this and the cap of the profile is used
+
+        Returns:
+            dict[str, Any]: Keyword arguments for 'generate'
+        """
+
+        num_beams: int = self.num_beams
+        if device == "cpu" and self.cpu_greedy:
+            num_beams = 1
+
+        rval: dict[str, Any] = {
+            "max_new_tokens": min(
+                self.max_new_tokens, max_new_tokens or self.max_new_tokens
+            ),
+            "num_beams": num_beams,
+            "do_sample": False,
+        }
+        if num_beams > 1:
+            rval["length_penalty"] = self.length_penalty
+            rval["early_stopping"] = self.early_stopping
+        if self.no_repeat_ngram_size:
+            rval["no_repeat_ngram_size"] = self.no_repeat_ngram_size
+        if self.repetition_penalty != 1.0:
+            rval["repetition_penalty"] = self.repetition_penalty
+        if self.cancel is not None:
+            # Not max_time, the MaxTimeCriteria of generate would also count
+            # the time the generation waits while the run is paused
+            rval["stopping_criteria"] = cancel_criteria(self.cancel, self.deadline)
+        elif self.deadline is not None:
+            # The MaxTimeCriteria of generate, checked after every token
+            rval["max_time"] = max(self.deadline - time.monotonic(), 0.01)
+        return rval
+
+
+############################################################################
+# cancel_criteria
+############################################################################
+__cancel_criteria: type | None = None
+
+
+def cancel_criteria(token: CancelToken, deadline: float | None = None) -> Any:
+    """
+    Args:
+        token (CancelToken): Token of the run
+        deadline (float | None): CancelToken.get_active_time() at which the
+            generation ends, None for no deadline
+
+    Returns:
+        Any: A StoppingCriteriaList for 'generate' that waits while the run
+        is paused and ends the generation once it is cancelled or once the
+        deadline is reached
+    """
+
+    global __cancel_criteria
+
+    # transformers is only imported where a model generates
+    from transformers import StoppingCriteria, StoppingCriteriaList
+    import torch
+
+    if __cancel_criteria is None:
+
+        class CancelCriteria(StoppingCriteria):
+            def __init__(self, token: CancelToken, deadline: float | None) -> None:
+                self.token = token
+                self.deadline = deadline
+
+            def __call__(
+                self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs
+            ) -> torch.BoolTensor:
+                try:
+                    self.token.check()
+                    done: bool = (
+                        self.deadline is not None
+                        and self.token.get_active_time() >= self.deadline
+                    )
+                except Cancelled:
+                    done = True
+                return torch.full(
+                    (input_ids.shape[0],),
+                    done,
+                    dtype=torch.bool,
+                    device=input_ids.device,
+                )
+
+        __cancel_criteria = CancelCriteria
+    return StoppingCriteriaList([__cancel_criteria(token, deadline)])
+
+
+# One profile per level of detail, in the order of the AI combo box of the
+# main window: Brief, Standard, Full.
+GENERATION_PROFILES: tuple[GenerationProfile, ...] = (
+    GenerationProfile(
+        "Brief",
+        num_beams=1,
+        max_new_tokens=24,
+        no_repeat_ngram_size=3,
+    ),
+    GenerationProfile(
+        "Standard",
+        num_beams=3,
+        max_new_tokens=128,
+        no_repeat_ngram_size=3,
+        early_stopping=True,
+    ),
+    GenerationProfile(
+        "Full",
+        num_beams=3,
+        max_new_tokens=1024,
+    ),
+)
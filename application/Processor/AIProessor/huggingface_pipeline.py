@@ -1,9 +1,13 @@
 from transformers import pipeline
 from PIL import ImageFile
+from typing import Any
 
 import logging
 from logging import Logger
-from .image_to_text_abstract import ImageToTextBase
+from .image_to_text_abstract import ImageTask, ImageToTextBase
+from .generation_profile import GENERATION_PROFILES, GenerationProfile
+from .image_pyramid import ImagePyramid, PixelBatch, PreprocessSpec
+from . import model_snapshot
 
 
 class HuggingFacePipeline(ImageToTextBase):
@@ -23,34 +27,111 @@ class HuggingFacePipeline(ImageToTextBase):
         "blip-image-captioning-base": "Salesforce/blip-image-captioning-base",
     }
 
-    __pipelines: dict[str, pipeline] = {}
-    __logger: Logger = logging.getLogger(__file__)
+    __logger: Logger = logging.getLogger(__name__)
     __task = "image-to-text"
+    # The captioning models write one short sentence
+    __max_new_tokens = 40
 
     def __init__(self, device: str) -> None:
+        # Per instance, dictionaries on the class kept the pipelines alive
+        # after the backend was released.
+        self.__pipelines: dict[str, pipeline] = {}
+        self.__specs: dict[str, PreprocessSpec] = {}
+        self.__batches: dict[str, PixelBatch] = {}
         for key, value in self.__model_names.items():
+            path, kwargs = model_snapshot.resolve(value)
             self.__pipelines[key] = pipeline(
-                task=self.__task, model=value, device=device
+                task=self.__task, model=path, device=device, model_kwargs=kwargs
             )
+            self.__specs[key] = PreprocessSpec.from_image_processor(
+                self.__pipelines[key].image_processor
+            )
+            self.__batches[key] = PixelBatch(self.__specs[key])
+
+    @classmethod
+    def prepare_snapshot(cls, dtype: str) -> list[str]:
+        rval: list[str] = []
+        for value in cls.__model_names.values():
+            pipe = pipeline(task=cls.__task, model=value, torch_dtype=dtype)
+            rval.append(
+                model_snapshot.save_snapshot(
+                    value, dtype, pipe.model, [pipe.tokenizer, pipe.image_processor]
+                )
+            )
+        return rval
+
+    def get_models(self) -> list[Any]:
+        return [pipe.model for pipe in self.__pipelines.values()]
+
+    def get_preprocess_specs(self) -> list[PreprocessSpec]:
+        return list(self.__specs.values())
+
+    def preprocess(self, pyramid: ImagePyramid) -> dict[str, Any]:
+        """
+        Build the inputs of every pipeline from the shared pyramid, in place
+        of the image processor of each pipeline.
+        """
+
+        return {
+            key: {
+                "pixel_values": pyramid.pixel_values(self.__specs[key]).to(
+                    self.__pipelines[key].model.dtype
+                )
+            }
+            for key in self.__model_names
+        }
+
+    def preprocess_batch(self, pyramids: list[ImagePyramid]) -> list[dict[str, Any]]:
+        """
+        Normalize the batch once per pipeline.  The inputs of each image are
+        views of the batch buffer, valid until the next call.
+        """
+
+        rval: list[dict[str, Any]] = [{} for _ in pyramids]
+        for key in self.__model_names:
+            pixel_values = self.__batches[key].fill(pyramids)
+            pixel_values = pixel_values.to(self.__pipelines[key].model.dtype)
+            for index, inputs in enumerate(rval):
+                inputs[key] = {"pixel_values": pixel_values[index : index + 1]}
+        return rval
 
-    def process(self, image: ImageFile, level: int) -> list[str]:
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: dict[str, Any] | None = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> list[str]:
         rval: list[str | list] = []
+        profile = profile or GENERATION_PROFILES[level]
 
         try:
+            if not inputs:
+                inputs = self.preprocess(
+                    ImagePyramid(image, self.get_preprocess_specs())
+                )
             for key in self.__model_names:
                 pipe: pipeline = self.__pipelines[key]
 
-                captioner = pipe(image)
+                # Same steps as pipe(image), split so that the preprocessing
+                # can be done by the prefetch threads.
+                forward_params: dict[str, Any] = {
+                    **pipe._forward_params,
+                    **profile.generate_kwargs(pipe.device.type, self.__max_new_tokens),
+                }
+                model_outputs = pipe.forward(inputs[key], **forward_params)
+                captioner = pipe.postprocess(model_outputs, **pipe._postprocess_params)
                 text = str(captioner[0]["generated_text"]).strip()
-                self.__logger.info(f"Generated text for [{key}] => [{text}]")
+                self.__logger.debug("Generated text for [%s] => [%s]", key, text)
                 rval.append(text)
             return rval
         except ValueError as error:
-            self.__logger.warning(f"Input image error {error}")
+            self.__logger.warning("Input image error %s", error)
             return rval
         except Exception as e:
             self.__logger.warning(
-                f"Exception in generating image-to-text filename [{e}]."
+                "Exception in generating image-to-text filename [%s].", e
             )
 
     def get_name(self):
@@ -0,0 +1,111 @@
+import logging, math, os
+from logging import Logger
+from typing import NamedTuple
+from PIL import Image, ImageFile
+
+__logger: Logger = logging.getLogger(__name__)
+
+
+class ImageRejected(Exception):
+    """
+    The image is not described, the message is the reason.
+    """
+
+
+class ImageBudget(NamedTuple):
+    """
+    Limits on one image so that a huge panorama or a broken file cannot
+    stall a run.  The pixels are read from the header, before the image is
+    decoded.  The defaults can be changed with the environment variables
+
+    IMAGE_PROCESSOR_MAX_PIXELS     - images with more pixels are skipped
+    IMAGE_PROCESSOR_DECODE_PIXELS  - larger images are decoded reduced
+    IMAGE_PROCESSOR_IMAGE_DEADLINE - seconds of the AI backends per image,
+                                     0 for no deadline
+    """
+
+    max_pixels: int = 150_000_000
+    # About the pixels decoded, far more than the 768 pixels the largest
+    # model input needs
+    decode_pixels: int = 16_000_000
+    deadline: float = 180.0
+
+    @classmethod
+    def from_environment(cls) -> "ImageBudget":
+        default: ImageBudget = cls()
+        return cls(
+            max_pixels=int(
+                os.environ.get("IMAGE_PROCESSOR_MAX_PIXELS") or default.max_pixels
+            ),
+            decode_pixels=int(
+                os.environ.get("IMAGE_PROCESSOR_DECODE_PIXELS")
+                or default.decode_pixels
+            ),
+            deadline=float(
+                os.environ.get("IMAGE_PROCESSOR_IMAGE_DEADLINE") or default.deadline
+            ),
+        )
+
+
+############################################################################
+# load_rgb
+############################################################################
+def load_rgb(filepath: str, budget: ImageBudget) -> ImageFile:
+    """
+    Decode the image as RGB within the budget.  Images over decode_pixels
+    are reduced: a JPEG is decoded directly at 1/2, 1/4 or 1/8 of its size
+    by its DCT scaling, other formats are decoded and then reduced with a
+    box filter.
+
+    Raises:
+        ImageRejected: The image is over max_pixels
+
+    Returns:
+        ImageFile: The decoded RGB image
+    """
+
+    try:
+        image: ImageFile = Image.open(filepath)
+    except Image.DecompressionBombError as e:
+        # Over twice the limit of PIL, which is raised to max_pixels
+        raise ImageRejected(str(e)) from e
+
+    with image:
+        width, height = image.size
+        pixels: int = width * height
+        if pixels > budget.max_pixels:
+            raise ImageRejected(
+                f"{width}x{height} is {pixels / 1e6:.0f} MP, over the budget of "
+                f"{budget.max_pixels / 1e6:.0f} MP"
+            )
+        if pixels <= budget.decode_pixels:
+            return image.convert("RGB")
+
+        scale: float = math.sqrt(budget.decode_pixels / pixels)
+        image.draft(
+            image.mode, (max(1, int(width * scale)), max(1, int(height * scale)))
+        )
+        image.load()
+        factor: int = int(
+            math.sqrt(image.width * image.height / budget.decode_pixels)
+        )
+        reduced: ImageFile = image.reduce(factor) if factor >= 2 else image
+        __logger.debug(
+            "Decoded [%s] of [%sx%s] at [%sx%s]",
+            filepath,
+            width,
+            height,
+            reduced.width,
+            reduced.height,
+        )
+        return reduced.convert("RGB")
+
+
+def allow_max_pixels(budget: ImageBudget) -> None:
+    """
+    PIL refuses to open images over twice its own limit.  Raise the limit
+    to the budget so that the budget decides, from the header.
+    """
+
+    if Image.MAX_IMAGE_PIXELS and Image.MAX_IMAGE_PIXELS < budget.max_pixels:
+        Image.MAX_IMAGE_PIXELS = budget.max_pixels
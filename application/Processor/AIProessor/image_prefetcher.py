@@ -0,0 +1,199 @@
+import logging, threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from logging import Logger
+from typing import Any, Callable, Iterable
+from PIL import Image
+
+
+class ImagePrefetcher:
+    """
+    # Image Prefetcher
+
+    Reads, decodes and preprocesses the next images on a small thread pool
+    while the models run on the current one, similar to a DataLoader.  The
+    files are prepared in the order given to start, and take is expected
+    to be called in the same order.  Files that are never taken are
+    dropped when a later file is taken.  A file that is not among the files
+    prepared ahead is not prefetched and is loaded by the caller, the
+    files prepared ahead are kept for the next calls.
+
+    The number of images prepared ahead is bounded by a memory budget.  The
+    size of every image is estimated from its header before it is decoded
+    and the feeder waits while the prepared images would exceed the budget.
+    At least one image is always allowed so that a single huge image does
+    not stall the queue.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        loader: Callable[[str], Any],
+        workers: int = 2,
+        memory_budget: int = 512 * 1024 * 1024,
+        max_ahead: int = 8,
+        extra_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            loader (Callable[[str], Any]): Reads and prepares one image
+            workers (int): Number of decode threads
+            memory_budget (int): Bytes allowed for the prepared images
+            max_ahead (int): Maximum number of images prepared ahead
+            extra_bytes (int): Estimated size of the model inputs per image
+        """
+
+        self.__loader = loader
+        self.__workers = workers
+        self.__memory_budget = memory_budget
+        self.__max_ahead = max_ahead
+        self.__extra_bytes = extra_bytes
+
+        self.__condition: threading.Condition = threading.Condition()
+        self.__futures: deque[tuple[str, Future, int]] = deque()
+        self.__bytes_in_use: int = 0
+        self.__running: bool = False
+        self.__feeding: bool = False
+        # The feeder waits for room, no other file is prepared until one is
+        # taken
+        self.__blocked: bool = False
+        self.__executor: ThreadPoolExecutor = None
+        self.__feeder: threading.Thread = None
+
+    ############################################################################
+    # start
+    ############################################################################
+    def start(self, filepaths: Iterable[str]) -> None:
+        """
+        Start preparing the given files, in order, on the background threads.
+        """
+
+        self.stop()
+        self.__running = True
+        self.__feeding = True
+        self.__executor = ThreadPoolExecutor(
+            max_workers=self.__workers, thread_name_prefix="image-prefetch"
+        )
+        self.__feeder = threading.Thread(
+            target=self.__feed, args=(iter(filepaths),), daemon=True
+        )
+        self.__feeder.start()
+
+    ############################################################################
+    # take
+    ############################################################################
+    def take(self, filepath: str) -> Any | None:
+        """
+        Get the prepared image for the file, waiting for it if it is still
+        being decoded.
+
+        Returns:
+            Any | None: Result of the loader, None when the file was not
+            prefetched or could not be loaded
+        """
+
+        with self.__condition:
+            while True:
+                position: int | None = next(
+                    (
+                        index
+                        for index, (queued, _, _) in enumerate(self.__futures)
+                        if queued == filepath
+                    ),
+                    None,
+                )
+                if position is not None:
+                    break
+                if not self.__feeding or self.__blocked:
+                    # Not prefetched, the files prepared ahead are kept
+                    return None
+                self.__condition.wait()
+
+            for _ in range(position):
+                # This file was never taken, drop it.
+                _, stale, size = self.__futures.popleft()
+                stale.cancel()
+                self.__bytes_in_use -= size
+            _, future, size = self.__futures.popleft()
+            self.__condition.notify_all()
+
+        try:
+            return future.result()
+        except Exception as e:
+            self.__logger.warning("Could not prefetch file [%s]. [%s]", filepath, e)
+            return None
+        finally:
+            self.__release(size)
+
+    def get_queue_depth(self) -> int:
+        """
+        Returns:
+            int: Images queued or prepared ahead of the current one
+        """
+        return len(self.__futures)
+
+    ############################################################################
+    # stop
+    ############################################################################
+    def stop(self) -> None:
+        with self.__condition:
+            self.__running = False
+            for _, future, _ in self.__futures:
+                future.cancel()
+            self.__futures.clear()
+            self.__bytes_in_use = 0
+            self.__blocked = False
+            self.__condition.notify_all()
+        if self.__feeder:
+            self.__feeder.join()
+            self.__feeder = None
+        if self.__executor:
+            self.__executor.shutdown(wait=True, cancel_futures=True)
+            self.__executor = None
+
+    def __feed(self, filepaths: Iterable[str]) -> None:
+        try:
+            for filepath in filepaths:
+                size: int = self.__estimate(filepath)
+                with self.__condition:
+                    # Only seen by take while waiting, wait_for does not
+                    # release the lock when there is room
+                    self.__blocked = True
+                    self.__condition.notify_all()
+                    self.__condition.wait_for(
+                        lambda: not self.__running
+                        or not self.__futures
+                        or (
+                            len(self.__futures) < self.__max_ahead
+                            and self.__bytes_in_use + size <= self.__memory_budget
+                        )
+                    )
+                    self.__blocked = False
+                    if not self.__running:
+                        return
+                    self.__bytes_in_use += size
+                    future: Future = self.__executor.submit(self.__loader, filepath)
+                    self.__futures.append((filepath, future, size))
+                    self.__condition.notify_all()
+        finally:
+            with self.__condition:
+                self.__feeding = False
+                self.__condition.notify_all()
+
+    def __release(self, size: int) -> None:
+        with self.__condition:
+            self.__bytes_in_use -= size
+            self.__condition.notify_all()
+
+    def __estimate(self, filepath: str) -> int:
+        """
+        Estimate the memory of the decoded image from its header only.
+        """
+
+        try:
+            with Image.open(filepath) as image:
+                width, height = image.size
+            return width * height * 4 + self.__extra_bytes
+        except Exception:
+            return self.__extra_bytes
@@ -0,0 +1,282 @@
+import logging
+import numpy as np
+import torch
+from logging import Logger
+from typing import Any, NamedTuple
+from PIL import Image, ImageFile
+
+
+class PreprocessSpec(NamedTuple):
+    """
+    What a model expects from the image processor, read once from its
+    configuration.  Two backends with the same spec share the same tensor.
+    """
+
+    # Target (width, height) for a fixed size resize, or None
+    size: tuple[int, int] | None
+    # Length of the shortest edge for an aspect preserving resize, or None
+    shortest_edge: int | None
+    # (width, height) of the center crop, or None
+    crop_size: tuple[int, int] | None
+    resample: int
+    rescale_factor: float
+    image_mean: tuple[float, float, float]
+    image_std: tuple[float, float, float]
+
+    @classmethod
+    def from_image_processor(cls, image_processor: Any) -> "PreprocessSpec":
+        """
+        Build the spec from a transformers image processor, such as the
+        ViT, BLIP or CLIP image processors.
+        """
+
+        size: dict[str, int] = image_processor.size
+        if not isinstance(size, dict):
+            size = {"height": size, "width": size}
+        crop_size: tuple[int, int] | None = None
+        if getattr(image_processor, "do_center_crop", False):
+            crop: dict[str, int] = image_processor.crop_size
+            crop_size = (crop["width"], crop["height"])
+
+        do_normalize: bool = getattr(image_processor, "do_normalize", True)
+        do_rescale: bool = getattr(image_processor, "do_rescale", True)
+        return cls(
+            size=(size["width"], size["height"]) if "height" in size else None,
+            shortest_edge=size.get("shortest_edge"),
+            crop_size=crop_size,
+            resample=int(
+                getattr(image_processor, "resample", Image.Resampling.BICUBIC)
+            ),
+            rescale_factor=image_processor.rescale_factor if do_rescale else 1.0,
+            image_mean=(
+                tuple(image_processor.image_mean) if do_normalize else (0.0, 0.0, 0.0)
+            ),
+            image_std=(
+                tuple(image_processor.image_std) if do_normalize else (1.0, 1.0, 1.0)
+            ),
+        )
+
+
+class ImagePyramid:
+    """
+    # Image Pyramid
+
+    Multi-resolution version of one image shared by every captioning
+    backend.  The full resolution image is reduced once, with a box filter
+    by an integer factor, to a base that is still at least twice the
+    largest level any backend needs.  Every level (for example 224, 336,
+    384 or 768) is then resized from that base instead of from the full
+    resolution image, and each level is normalized with a single vectorized
+    multiply-add.  Results are cached per spec so that backends with the
+    same spec share the tensor.
+
+    The output matches the transformers image processors within a small
+    tolerance: the initial reduction is the same trick PIL uses for its
+    'reducing_gap' option.  A pixel of a reduced image is off by 2 levels
+    out of 255 at most, see Benchmark/check_preprocess.py.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, image: ImageFile, specs: list[PreprocessSpec]) -> None:
+        """
+        Args:
+            image (ImageFile): Decoded RGB image
+            specs (list[PreprocessSpec]): Specs of all of the backends, used
+                to size the shared base
+        """
+
+        self.__image: ImageFile = image
+        self.__levels: dict[tuple[int, int, int], Image.Image] = {}
+        self.__tensors: dict[PreprocessSpec, torch.Tensor] = {}
+        self.__base: Image.Image = self.__reduce(image, specs)
+
+    def get_image(self) -> ImageFile:
+        return self.__image
+
+    ############################################################################
+    # pixel_values
+    ############################################################################
+    def pixel_values(self, spec: PreprocessSpec) -> torch.Tensor:
+        """
+        Returns:
+            torch.Tensor: Normalized float32 tensor of shape (1, 3, H, W)
+        """
+
+        tensor: torch.Tensor | None = self.__tensors.get(spec)
+        if tensor is None:
+            tensor = torch.from_numpy(self.pixel_array(spec)).unsqueeze(0)
+            self.__tensors[spec] = tensor
+        return tensor
+
+    def pixel_array(
+        self, spec: PreprocessSpec, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """
+        Resize, crop and normalize the image for the spec.
+
+        Args:
+            spec (PreprocessSpec): What the model expects
+            out (np.ndarray | None): Optional (3, H, W) float32 buffer to
+                write into
+
+        Returns:
+            np.ndarray: Normalized float32 array of shape (3, H, W)
+        """
+
+        return normalize(self.level(spec), spec, out)
+
+    ############################################################################
+    # level
+    ############################################################################
+    def level(self, spec: PreprocessSpec) -> Image.Image:
+        """
+        Resized and cropped image for the spec, before normalization.
+        """
+
+        width, height = target_size(self.__image.size, spec)
+        key: tuple[int, int, int] = (width, height, spec.resample)
+        level: Image.Image | None = self.__levels.get(key)
+        if level is None:
+            level = self.__base.resize((width, height), spec.resample)
+            self.__levels[key] = level
+        return center_crop(level, spec.crop_size)
+
+    def __reduce(
+        self, image: ImageFile, specs: list[PreprocessSpec]
+    ) -> Image.Image:
+        if not specs:
+            return image
+        width, height = image.size
+        factor: int = width
+        for spec in specs:
+            target_width, target_height = target_size(image.size, spec)
+            factor = min(
+                factor, width // (2 * target_width), height // (2 * target_height)
+            )
+        if factor < 2:
+            return image
+        self.__logger.debug("Reducing image [%s] by [%s]", image.size, factor)
+        return image.reduce(factor)
+
+
+class PixelBatch:
+    """
+    Preallocated buffers for the pixel values of a batch of images with the
+    same spec.  The levels are copied into a uint8 staging buffer and the
+    whole batch is normalized with one multiply-add into a float32 buffer,
+    instead of one float conversion and one stack per image.  The buffers
+    only grow, so the same memory is reused from one batch to the next.
+
+    The returned tensor is a view of the buffer and is overwritten by the
+    next call to fill.  One PixelBatch must not be shared between threads.
+    """
+
+    def __init__(self, spec: PreprocessSpec) -> None:
+        self.__spec = spec
+        self.__staging: np.ndarray = None
+        self.__values: np.ndarray = None
+
+    ############################################################################
+    # fill
+    ############################################################################
+    def fill(self, pyramids: list[ImagePyramid]) -> torch.Tensor:
+        """
+        Args:
+            pyramids (list[ImagePyramid]): One pyramid per image
+
+        Returns:
+            torch.Tensor: Normalized float32 tensor of shape (N, 3, H, W)
+        """
+
+        levels: list[Image.Image] = [pyramid.level(self.__spec) for pyramid in pyramids]
+        width, height = levels[0].size
+        self.__allocate(len(levels), height, width)
+
+        staging: np.ndarray = self.__staging[: len(levels)]
+        for index, level in enumerate(levels):
+            if level.size != (width, height):
+                # Only the shortest_edge resize without a crop gives a size
+                # that depends on the aspect ratio of the image.
+                raise ValueError(
+                    f"Image size [{level.size}] differs from [{(width, height)}] "
+                    "within the batch"
+                )
+            staging[index] = np.asarray(level, dtype=np.uint8)
+
+        values: np.ndarray = self.__values[: len(levels)]
+        normalize_array(staging, self.__spec, values.transpose(0, 2, 3, 1))
+        return torch.from_numpy(values)
+
+    def __allocate(self, count: int, height: int, width: int) -> None:
+        if (
+            self.__staging is None
+            or self.__staging.shape[0] < count
+            or self.__staging.shape[1:3] != (height, width)
+        ):
+            count = max(count, 0 if self.__staging is None else self.__staging.shape[0])
+            self.__staging = np.empty((count, height, width, 3), dtype=np.uint8)
+            self.__values = np.empty((count, 3, height, width), dtype=np.float32)
+
+
+def target_size(image_size: tuple[int, int], spec: PreprocessSpec) -> tuple[int, int]:
+    """
+    Size of the resized image for the spec, before the crop.  Follows the
+    rounding of the transformers 'shortest_edge' resize.
+    """
+
+    if spec.size:
+        return spec.size
+    width, height = image_size
+    short, long = (width, height) if width <= height else (height, width)
+    new_long: int = int(spec.shortest_edge * long / short)
+    if width <= height:
+        return spec.shortest_edge, new_long
+    return new_long, spec.shortest_edge
+
+
+def center_crop(
+    image: Image.Image, crop_size: tuple[int, int] | None
+) -> Image.Image:
+    if not crop_size or image.size == crop_size:
+        return image
+    width, height = image.size
+    crop_width, crop_height = crop_size
+    left: int = (width - crop_width) // 2
+    top: int = (height - crop_height) // 2
+    return image.crop((left, top, left + crop_width, top + crop_height))
+
+
+def normalize(
+    image: Image.Image, spec: PreprocessSpec, out: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    Normalize one image and transpose it to channels first.
+
+    Returns:
+        np.ndarray: float32 array of shape (3, H, W)
+    """
+
+    pixels: np.ndarray = np.asarray(image, dtype=np.uint8)
+    if out is None:
+        out = np.empty((3, pixels.shape[0], pixels.shape[1]), dtype=np.float32)
+    normalize_array(pixels, spec, out.transpose(1, 2, 0))
+    return out
+
+
+def normalize_array(pixels: np.ndarray, spec: PreprocessSpec, out: np.ndarray) -> None:
+    """
+    Rescale and normalize in one multiply-add, (pixel * scale - mean) / std
+    is computed as pixel * a + b over the last (channel) axis.
+
+    Args:
+        pixels (np.ndarray): uint8 array of shape (..., 3)
+        spec (PreprocessSpec): What the model expects
+        out (np.ndarray): float32 array, or view, of the same shape
+    """
+
+    std: np.ndarray = np.asarray(spec.image_std, dtype=np.float32)
+    scale: np.ndarray = np.float32(spec.rescale_factor) / std
+    offset: np.ndarray = -np.asarray(spec.image_mean, dtype=np.float32) / std
+    np.multiply(pixels, scale, out=out)
+    np.add(out, offset, out=out)
@@ -1,51 +1,558 @@
 from PIL import Image, ImageFile
 
-import torch, logging
+import torch, logging, os, time
 from logging import Logger
+from typing import Any, Callable, Iterable
+
+from Helper.cancel_token import CancelToken, Cancelled
+import Helper.memory_profile as memory_profile
+import Helper.metrics_endpoint as metrics_endpoint
+import Helper.tracing as tracing
 
 from .huggingface_pipeline import HuggingFacePipeline
 from .clip_processor import ClipProcessor
 from .automodel_llm import AutomodelLLM
-from .image_to_text_abstract import ImageToTextBase
+from .image_to_text_abstract import ImageDescription, ImageTask, ImageToTextBase
+from . import auto_tuner
+from .auto_tuner import AutoTuner, TuningConfig
+from .generation_profile import GENERATION_PROFILES, GenerationProfile
+from .image_prefetcher import ImagePrefetcher
+from .inference_pool import BackendTiming, InferencePool
+from .image_pyramid import ImagePyramid, PreprocessSpec
+from .image_guard import ImageBudget, ImageRejected, allow_max_pixels, load_rgb
 
 
 class ImageToText:
-    __textToImageProcessors: list[ImageToTextBase] = []
+    __logger: Logger = logging.getLogger(__name__)
+    __prefetcher: ImagePrefetcher = None
+    __pool: InferencePool = None
+    __device: str = "cpu"
+
+    # Backends used when none are given
+    BACKENDS: tuple[type[ImageToTextBase], ...] = (
+        HuggingFacePipeline,
+        ClipProcessor,
+        AutomodelLLM,
+    )
 
-    __logger: Logger = logging.getLogger(__file__)
+    def __init__(
+        self,
+        progress: Callable[[str, int], None] | None = None,
+        backends: Iterable[type[ImageToTextBase]] | None = None,
+        budget: ImageBudget | None = None,
+    ) -> None:
+        """
+        Args:
+            progress (Callable[[str, int], None] | None): Receives a message
+                and a percentage as each backend is loaded
+            backends (Iterable[type[ImageToTextBase]] | None): Classes of the
+                backends to load, each created with the device.  Defaults to
+                BACKENDS, the benchmarks give stand-ins without weights to
+                download.
+            budget (ImageBudget | None): Pixel and time limits of one image,
+                defaults to the environment, see ImageBudget
+        """
 
-    def __init__(self) -> None:
         device = "cpu"
         if torch.cuda.is_available():
             device = "cuda"
         # For Apple Silicon
         elif torch.backends.mps.is_available():
             device = "mps"
-        self.__logger.info(f"Using device: [{device}]")
+        self.__logger.info("Using device: [%s]", device)
+        self.__device = device
+        self.__budget: ImageBudget = budget or ImageBudget.from_environment()
+        allow_max_pixels(self.__budget)
+        # Files skipped by the guard since the last pop_skipped, with why
+        self.__skipped: dict[str, str] = {}
+        self.__cancel: CancelToken | None = None
+
+        # Per instance, a list on the class kept the backends of every
+        # ImageToText ever created alive and described each image with all
+        # of them.
+        self.__textToImageProcessors: list[ImageToTextBase] = []
+        backends = tuple(self.BACKENDS if backends is None else backends)
+        for index, backend in enumerate(backends):
+            if progress:
+                progress(
+                    f"Loading AI model {backend.__name__} "
+                    f"({index + 1}/{len(backends)})",
+                    int(index * 100 / len(backends)),
+                )
+            with memory_profile.stage(f"load {backend.__name__}"):
+                self.__textToImageProcessors.append(backend(device))
+
+        self.__profiles: list[GenerationProfile] = list(GENERATION_PROFILES)
+        # [hits, misses] of the prepared results of each prefetch stage,
+        # indexed by the miss flag
+        self.__cache_stats: dict[str, list[int]] = {
+            "inference_pool": [0, 0],
+            "prefetch": [0, 0],
+        }
+        self.__tuning: dict[str, TuningConfig] = {}
+        self.__apply_tuning(
+            auto_tuner.load_tuning(
+                device, auto_tuner.get_model_key(self.__textToImageProcessors)
+            )
+        )
+
+        # Every backend is fed from one pyramid sized for all of them.
+        self.__specs: list[PreprocessSpec] = []
+        for processor in self.__textToImageProcessors:
+            for spec in processor.get_preprocess_specs():
+                if spec not in self.__specs:
+                    self.__specs.append(spec)
+
+    ############################################################################
+    # generation profiles
+    ############################################################################
+    def get_profile(self, level: int) -> GenerationProfile:
+        return self.__profiles[level]
+
+    def set_profile(self, level: int, profile: GenerationProfile) -> None:
+        """
+        Replace the generation profile used for a level of detail, e.g.
+        set_profile(0, get_profile(0)._replace(max_new_tokens=16))
+        """
 
-        self.__textToImageProcessors.append(HuggingFacePipeline(device))
-        self.__textToImageProcessors.append(ClipProcessor(device))
-        self.__textToImageProcessors.append(AutomodelLLM(device))
+        self.__logger.info("Generation profile for level [%s] is [%s]", level, profile)
+        self.__profiles[level] = profile
+
+    ############################################################################
+    # auto_tune
+    ############################################################################
+    def auto_tune(self, filepaths: list[str], min_images: int = 8) -> str:
+        """
+        Calibrate every backend on the sample images, store the best
+        settings for this machine and apply them.
+
+        Returns:
+            str: Path of the tuning file
+        """
+
+        images: list[ImageFile] = []
+        for filepath in filepaths:
+            with Image.open(filepath) as image:
+                images.append(image.convert("RGB"))
+
+        tuner: AutoTuner = AutoTuner(
+            images,
+            min_images=min_images,
+            pool=self.__device == "cpu" and InferencePool.is_supported(),
+        )
+        configs: dict[str, TuningConfig] = {
+            processor.get_name(): tuner.tune(processor)
+            for processor in self.__textToImageProcessors
+        }
+        filename: str = auto_tuner.save_tuning(
+            self.__device,
+            auto_tuner.get_model_key(self.__textToImageProcessors),
+            configs,
+        )
+        self.__apply_tuning(configs)
+        return filename
+
+    def get_tuning(self) -> dict[str, TuningConfig]:
+        return self.__tuning
+
+    def __apply_tuning(self, configs: dict[str, TuningConfig]) -> None:
+        if not configs:
+            self.__logger.info(
+                "No tuning for this machine, run auto_tune.py to create one"
+            )
+            return
+        self.__logger.info("Using tuning [%s]", configs)
+        self.__tuning = configs
+        auto_tuner.apply_inter_op_threads(
+            max(config.inter_op_threads for config in configs.values())
+        )
 
-    def process(self, filepath: str, level:str) -> list[str]:
-        self.__logger.info(f"{__name__} - prompt [{filepath}]")
-        rval: list[any] = []
+    ############################################################################
+    # start_prefetch
+    ############################################################################
+    def start_prefetch(
+        self,
+        filepaths: Iterable[str],
+        level: int = 0,
+        tasks: frozenset[ImageTask] = frozenset(),
+    ) -> None:
+        """
+        Start describing the given files ahead of process.  The files must
+        be given in the order in which process is called.
+
+        On a CPU with more than one inference worker, see
+        __get_inference_workers, the files are described by an
+        InferencePool.  Otherwise they are only decoded and preprocessed
+        ahead by the ImagePrefetcher and the models run in process.
+        """
+
+        workers: int = self.__get_inference_workers()
+        if workers > 1:
+            if not self.__pool or self.__pool.get_workers() != workers:
+                self.__share_memory()
+                self.__pool = InferencePool(
+                    self.__describe_file, workers, set_cancel=self.__set_worker_cancel
+                )
+                self.__pool.set_cancel_token(self.__cancel)
+            self.__pool.start(filepaths, level, tasks)
+            return
+
+        if not self.__prefetcher:
+            self.__prefetcher = ImagePrefetcher(self.__load)
+        self.__prefetcher.start(filepaths)
+
+    def stop_prefetch(self) -> None:
+        if self.__pool:
+            self.__pool.stop()
+        if self.__prefetcher:
+            self.__prefetcher.stop()
+
+    def get_cache_stats(self) -> dict[str, tuple[int, int]]:
+        """
+        Returns:
+            dict[str, tuple[int, int]]: (hits, misses) of the inference pool
+            and of the prefetcher since the models were loaded
+        """
+        return {name: tuple(counts) for name, counts in self.__cache_stats.items()}
+
+    def get_queue_depths(self) -> dict[str, int]:
+        rval: dict[str, int] = {}
+        if self.__pool:
+            rval["inference_pool"] = self.__pool.get_queue_depth()
+        if self.__prefetcher:
+            rval["prefetch"] = self.__prefetcher.get_queue_depth()
+        return rval
+
+    def __get_inference_workers(self) -> int:
+        """
+        Number of inference processes, from the environment variable
+        IMAGE_PROCESSOR_INFERENCE_WORKERS or else from the tuning of this
+        machine.  Always 1 on a GPU or where the pool is not supported.
+        """
+
+        if self.__device != "cpu" or not InferencePool.is_supported():
+            return 1
+        workers: str | None = os.environ.get("IMAGE_PROCESSOR_INFERENCE_WORKERS")
+        if workers:
+            return max(1, int(workers))
+        return max((config.workers for config in self.__tuning.values()), default=1)
+
+    def __share_memory(self) -> None:
+        """
+        Move the weights to shared memory so that the forked inference
+        workers map them instead of copying them.
+        """
+
+        for processor in self.__textToImageProcessors:
+            for model in processor.get_models():
+                model.share_memory()
+        self.__logger.info("Moved the model weights to shared memory")
+
+    @tracing.traced("image_to_text")
+    def process(
+        self,
+        filepath: str,
+        level: int,
+        key: str | None = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+    ) -> ImageDescription:
+        """
+        Args:
+            filepath (str): Current path of the image
+            level (int): Level of detail, index of Brief, Standard, Full
+            key (str | None): Path under which the image was given to
+                start_prefetch, if it has been moved since
+            tasks (frozenset[ImageTask]): Extra tasks on top of the caption
+
+        Returns:
+            ImageDescription: Captions of every backend, with the OCR text
+            and object labels when requested
+        """
+
+        self.__logger.debug("%s - prompt [%s]", __name__, filepath)
         try:
-            image: ImageFile = Image.open(filepath)
-            for processor in self.__textToImageProcessors:
+            description: ImageDescription | None = None
+            if self.__pool:
+                with tracing.span("InferencePool.take", "image_to_text"):
+                    description = self.__pool.take(key or filepath)
+                self.__cache_stats["inference_pool"][description is None] += 1
+
+            if description is None:
+                prepared: tuple[ImageFile, dict[str, Any]] | None = None
+                if self.__prefetcher:
+                    prepared = self.__prefetcher.take(key or filepath)
+                    self.__cache_stats["prefetch"][not prepared] += 1
+                if not prepared:
+                    prepared = self.__load(filepath)
+                image, inputs = prepared
                 try:
-                    rval.append(processor.process(image, level))
-                except Exception as e:
-                    self.__logger.warning(
-                        f"Error processing [{processor.get_name()}]. [{e}]"
-                    )
-            self.__logger.info(f"ImageToText rval is [{rval}]")
-            return list(self.__flatten(rval))
+                    description = self.__describe(image, level, inputs, tasks)
+                finally:
+                    # The decoded image is not needed once described
+                    image.close()
+        except ImageRejected as e:
+            description = ImageDescription([], skipped=str(e))
+        except Cancelled:
+            raise
         except Exception as e:
             self.__logger.warning(
-                f"Exception in generating image-to-text filename [{filepath}] [{e}]."
+                "Exception in generating image-to-text filename [%s] [%s].", filepath, e
+            )
+            return ImageDescription([])
+
+        if description.skipped:
+            self.__logger.warning("Skipped [%s]. [%s]", filepath, description.skipped)
+            self.__skipped[filepath] = description.skipped
+        return description
+
+    def set_cancel_token(self, cancel: CancelToken | None) -> None:
+        """
+        Checked between the backends and after every generated token, see
+        generation_profile.cancel_criteria.
+        """
+
+        self.__cancel = cancel
+        if self.__pool:
+            self.__pool.set_cancel_token(cancel)
+
+    def __set_worker_cancel(self, cancel: CancelToken) -> None:
+        """
+        In an inference worker, the token the pool forwards the one of the
+        run to.
+        """
+        self.__cancel = cancel
+
+    def pop_skipped(self) -> dict[str, str]:
+        """
+        Returns:
+            dict[str, str]: The files skipped, entirely or by some backends,
+            since the last call, with the reason
+        """
+
+        rval, self.__skipped = self.__skipped, {}
+        return rval
+
+    ############################################################################
+    # process_batch
+    ############################################################################
+    @tracing.traced("image_to_text")
+    def process_batch(
+        self,
+        filepaths: list[str],
+        level: int,
+        tasks: frozenset[ImageTask] = frozenset(),
+    ) -> list[ImageDescription]:
+        """
+        Describe several images, preprocessing them as one batch per backend
+        instead of one image at a time.  The images are not prefetched.
+
+        Returns:
+            list[ImageDescription]: The description of each image, in the
+            order given
+        """
+
+        images: list[ImageFile] = []
+        rejected: dict[int, str] = {}
+        pyramids: list[ImagePyramid] = []
+        for index, filepath in enumerate(filepaths):
+            try:
+                images.append(load_rgb(filepath, self.__budget))
+            except ImageRejected as e:
+                self.__logger.warning("Skipped [%s]. [%s]", filepath, e)
+                self.__skipped[filepath] = rejected[index] = str(e)
+                images.append(None)
+                continue
+            except Exception as e:
+                self.__logger.warning("Could not read file [%s]. [%s]", filepath, e)
+                images.append(None)
+                continue
+            pyramids.append(ImagePyramid(images[-1], self.__specs))
+
+        # Inputs of each backend, one per readable image.
+        batch_inputs: dict[str, list[Any]] = {}
+        for processor in self.__textToImageProcessors:
+            try:
+                batch_inputs[processor.get_name()] = processor.preprocess_batch(
+                    pyramids
+                )
+            except Exception as e:
+                self.__logger.warning(
+                    "Error preprocessing batch [%s]. [%s]", processor.get_name(), e
+                )
+
+        rval: list[ImageDescription] = []
+        position: int = 0
+        for index, image in enumerate(images):
+            if image is None:
+                rval.append(ImageDescription([], skipped=rejected.get(index, "")))
+                continue
+            inputs: dict[str, Any] = {
+                name: values[position] for name, values in batch_inputs.items()
+            }
+            position += 1
+            rval.append(self.__describe(image, level, inputs, tasks))
+            image.close()
+            if rval[-1].skipped:
+                self.__skipped[filepaths[index]] = rval[-1].skipped
+        return rval
+
+    def __describe(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: dict[str, Any],
+        tasks: frozenset[ImageTask],
+        timings: list[BackendTiming] | None = None,
+    ) -> ImageDescription:
+        """
+        Run every backend on the image, each with its prepared inputs when
+        there are any, and merge their results.
+
+        Args:
+            timings (list[BackendTiming] | None): Gets the time of every
+                backend instead of the metrics, in an inference worker
+        """
+
+        captions: list[any] = []
+        ocr: list[str] = []
+        objects: dict[str, None] = {}
+        skipped: list[str] = []
+        # The backends share one deadline per image, the generation of the
+        # running backend is stopped by it and the next ones are skipped.  The
+        # time the run is paused does not count, see GenerationProfile.now.
+        profile: GenerationProfile = self.__profiles[level]
+        if self.__cancel:
+            profile = profile._replace(cancel=self.__cancel)
+        if self.__budget.deadline:
+            profile = profile._replace(deadline=profile.now() + self.__budget.deadline)
+        for processor in self.__textToImageProcessors:
+            if self.__cancel:
+                self.__cancel.check()
+            if profile.deadline is not None and profile.now() >= profile.deadline:
+                skipped.append(processor.get_name())
+                continue
+            # The inference workers have their own share of the threads
+            tuning: TuningConfig | None = self.__tuning.get(processor.get_name())
+            if (
+                tuning
+                and not self.__pool
+                and torch.get_num_threads() != tuning.intra_op_threads
+            ):
+                torch.set_num_threads(tuning.intra_op_threads)
+            start: int = time.perf_counter_ns()
+            try:
+                with tracing.span(processor.get_name(), "backend", level=level):
+                    with memory_profile.stage(processor.get_name()):
+                        result: list[str] | ImageDescription = processor.process(
+                            image,
+                            level,
+                            inputs.get(processor.get_name()),
+                            tasks,
+                            profile,
+                        )
+            except Exception as e:
+                self.__logger.warning(
+                    "Error processing [%s]. [%s]", processor.get_name(), e
+                )
+                continue
+            finally:
+                timing: BackendTiming = BackendTiming(
+                    processor.get_name(), start, time.perf_counter_ns() - start
+                )
+                if timings is None:
+                    metrics_endpoint.observe(
+                        "inference_seconds",
+                        timing.duration / 1e9,
+                        backend=timing.name,
+                    )
+                else:
+                    timings.append(timing)
+            if result is None:
+                continue
+            if isinstance(result, ImageDescription):
+                captions.append(result.captions)
+                if result.ocr:
+                    ocr.append(result.ocr)
+                objects.update(dict.fromkeys(result.objects))
+            else:
+                captions.append(result)
+
+        # A cancelled generation returns a truncated text, it is not kept
+        if self.__cancel:
+            self.__cancel.check()
+        rval: ImageDescription = ImageDescription(
+            list(self.__flatten(captions)),
+            " ".join(ocr),
+            tuple(objects),
+            (
+                f"Deadline of [{self.__budget.deadline:g}]s reached, skipped "
+                f"[{', '.join(skipped)}]"
+                if skipped
+                else ""
+            ),
+        )
+        self.__logger.debug("ImageToText rval is [%s]", rval)
+        return rval
+
+    def __describe_file(
+        self, filepath: str, level: int, tasks: frozenset[ImageTask]
+    ) -> tuple[ImageDescription, tuple[BackendTiming, ...]]:
+        """
+        Describe one file, called in the inference workers.
+
+        Returns:
+            tuple[ImageDescription, tuple[BackendTiming, ...]]: The timings
+            of the backends are exported by the pool, see InferencePool.take
+        """
+
+        try:
+            image, inputs = self.__load(filepath)
+        except ImageRejected as e:
+            return ImageDescription([], skipped=str(e)), ()
+        timings: list[BackendTiming] = []
+        try:
+            description: ImageDescription = self.__describe(
+                image, level, inputs, tasks, timings
             )
-            return []
+        finally:
+            image.close()
+        return description, tuple(timings)
+
+    @tracing.traced("image_to_text")
+    def __load(self, filepath: str) -> tuple[ImageFile, dict[str, Any]]:
+        """
+        Read, decode and convert the image to RGB, then run the preprocessing
+        of every backend from one shared pyramid.  Runs on the prefetch
+        threads.
+        """
+
+        rgb_image: ImageFile = load_rgb(filepath, self.__budget)
+        pyramid: ImagePyramid = ImagePyramid(rgb_image, self.__specs)
+        inputs: dict[str, Any] = {}
+        for processor in self.__textToImageProcessors:
+            try:
+                inputs[processor.get_name()] = self.__pin(processor.preprocess(pyramid))
+            except Exception as e:
+                self.__logger.warning(
+                    "Error preprocessing [%s] for [%s]. [%s]",
+                    processor.get_name(),
+                    filepath,
+                    e,
+                )
+        return rgb_image, inputs
+
+    def __pin(self, inputs: Any) -> Any:
+        """
+        Page-lock the tensors so that the copy to the GPU is faster.
+        """
+
+        if self.__device != "cuda" or inputs is None:
+            return inputs
+        if isinstance(inputs, torch.Tensor):
+            return inputs.pin_memory()
+        if isinstance(inputs, dict) or hasattr(inputs, "items"):
+            return {key: self.__pin(value) for key, value in inputs.items()}
+        return inputs
 
     def __flatten(self, data: list[any]):
         for item in data:
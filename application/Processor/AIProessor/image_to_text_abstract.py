@@ -1,13 +1,114 @@
 from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Any, NamedTuple
 from PIL import ImageFile
+from .generation_profile import GenerationProfile
+from .image_pyramid import ImagePyramid, PreprocessSpec
+
+
+class ImageTask(Enum):
+    """
+    Tasks requested in addition to the caption.  Backends that do not
+    support a task ignore it.
+    """
+
+    OCR = "ocr"
+    OBJECTS = "objects"
+
+    @classmethod
+    def from_options(cls, ocr: bool, objects: bool) -> frozenset["ImageTask"]:
+        tasks: set[ImageTask] = set()
+        if ocr:
+            tasks.add(cls.OCR)
+        if objects:
+            tasks.add(cls.OBJECTS)
+        return frozenset(tasks)
+
+
+class ImageDescription(NamedTuple):
+    """
+    Structured result of a backend, or of all of the backends merged.
+    """
+
+    captions: list[str]
+    ocr: str = ""
+    objects: tuple[str, ...] = ()
+    # Why the image, or some of the backends, were skipped, see image_guard
+    skipped: str = ""
 
 
 class ImageToTextBase(ABC):
 
     @abstractmethod
-    def process(self, image: ImageFile, level: int) -> list[str]:
+    def process(
+        self,
+        image: ImageFile,
+        level: int,
+        inputs: Any = None,
+        tasks: frozenset[ImageTask] = frozenset(),
+        profile: GenerationProfile | None = None,
+    ) -> list[str] | ImageDescription:
+        """
+        Generate the text for the image.
+
+        Args:
+            image (ImageFile): Decoded RGB image
+            level (int): Level of detail, index of Brief, Standard, Full
+            inputs (Any): Result of preprocess for this image when it was
+                prepared ahead of time, otherwise None
+            tasks (frozenset[ImageTask]): Extra tasks on top of the caption
+            profile (GenerationProfile | None): Generation effort for the
+                level, None uses the default profile of the level
+
+        Returns:
+            list[str] | ImageDescription: The captions, or a structured
+            result when the backend supports extra tasks
+        """
         pass
 
     @abstractmethod
     def get_name(self) -> str:
         pass
+
+    @classmethod
+    def prepare_snapshot(cls, dtype: str) -> list[str]:
+        """
+        Download the models of this backend and save them as local snapshots
+        in the given dtype, see model_snapshot.  The default has no models.
+
+        Returns:
+            list[str]: The snapshot directories
+        """
+        return []
+
+    def get_models(self) -> list[Any]:
+        """
+        The torch modules of this backend, e.g. to move them to shared
+        memory before the inference workers are forked.
+        """
+        return []
+
+    def get_preprocess_specs(self) -> list[PreprocessSpec]:
+        """
+        What the models of this backend expect from the image processor.
+        Used to size the pyramid shared by every backend.
+        """
+        return []
+
+    def preprocess(self, pyramid: ImagePyramid) -> Any:
+        """
+        Prepare the model inputs for the image from the shared pyramid.
+        Called by the prefetch threads ahead of process so that the model
+        never waits on the image processor.  The default does nothing and
+        returns None.
+        """
+        return None
+
+    def preprocess_batch(self, pyramids: list[ImagePyramid]) -> list[Any]:
+        """
+        Prepare the model inputs for several images at once, one result per
+        image in the same order.  Backends override this to normalize the
+        whole batch in one operation.  The default calls preprocess for each
+        image.
+        """
+        return [self.preprocess(pyramid) for pyramid in pyramids]
@@ -0,0 +1,499 @@
+import logging, multiprocessing, os, sys, threading, time
+import torch
+from collections import deque
+from logging import Logger
+from typing import Any, Callable, Iterable, NamedTuple
+
+import Helper.log_config as log_config
+import Helper.metrics_endpoint as metrics_endpoint
+import Helper.tracing as tracing
+from Helper.cancel_token import CancelToken, Cancelled
+from .image_to_text_abstract import ImageDescription, ImageTask
+
+
+class BackendTiming(NamedTuple):
+    """
+    Time of one AI backend on one file, in the nanoseconds of
+    time.perf_counter_ns().
+    """
+
+    name: str
+    start: int
+    duration: int
+
+
+class InferenceResult(NamedTuple):
+    index: int
+    pid: int
+    description: ImageDescription | None
+    error: str | None
+    elapsed: float
+    # The metrics and the spans of a worker are not exported, they are
+    # recorded by take
+    timings: tuple[BackendTiming, ...] = ()
+
+
+# Set in the parent before the fork, inherited by every worker process.
+_describe: Callable[
+    [str, int, frozenset[ImageTask]],
+    tuple[ImageDescription, tuple[BackendTiming, ...]],
+] = None
+_set_cancel: Callable[[CancelToken], None] | None = None
+
+
+def _worker_main(
+    task_queue: multiprocessing.Queue,
+    result_queue: multiprocessing.Queue,
+    log_queue: multiprocessing.Queue,
+    log_level: int,
+    threads: int,
+    level: int,
+    tasks: frozenset[ImageTask],
+    cancel: CancelToken,
+    slots: Any,
+    slot: int,
+) -> None:
+    log_config.setup_process_logging(log_queue, log_level)
+    # Only kept in this process, the timings go back with the results
+    tracing.disable()
+    if _set_cancel:
+        _set_cancel(cancel)
+    torch.set_num_threads(threads)
+    pid: int = os.getpid()
+    while True:
+        task: tuple[int, str] | None = task_queue.get()
+        if task is None:
+            return
+        index, filepath = task
+        # Shared memory and not a message, it is there even when the worker
+        # is killed right after, e.g. for its memory
+        slots[slot] = index
+        start_time: float = time.perf_counter()
+        timings: tuple[BackendTiming, ...] = ()
+        try:
+            description, timings = _describe(filepath, level, tasks)
+            error: str | None = None
+        except Exception as e:
+            description, error = None, str(e)
+        result_queue.put(
+            InferenceResult(
+                index,
+                pid,
+                description,
+                error,
+                time.perf_counter() - start_time,
+                timings,
+            )
+        )
+
+
+def get_process_memory(pid: int) -> dict[str, int]:
+    """
+    Resident (RSS) and proportional (PSS) memory of a process in bytes.  The
+    PSS splits the shared pages, such as the model weights, between the
+    processes that map them, so the sum of the PSS is the real total.
+
+    Returns:
+        dict[str, int]: 'rss' and 'pss', empty when /proc is not available
+    """
+
+    rval: dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as file:
+            for line in file:
+                name, _, value = line.partition(":")
+                if name in ("Rss", "Pss"):
+                    rval[name.lower()] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return rval
+
+
+class InferencePool:
+    """
+    # Inference Pool
+
+    Run the captioning models in several worker processes on the CPU.  A
+    single process cannot keep all of the cores busy because the backends
+    run one after the other for each image.
+
+    The models are loaded once in this process and moved to shared memory
+    with share_memory.  The workers are then forked, so they map the same
+    weights instead of loading one copy each.  The safetensors files are
+    already memory mapped by from_pretrained, so the weights are read once.
+    This needs the 'fork' start method, which is only used on Linux.  On
+    other platforms is_supported returns False and the caller runs the
+    models in process.
+
+    The files are sent to the workers through a work queue, a bounded
+    number ahead of the file being taken, and the results are handed back
+    in the order of the files like the ImagePrefetcher.  Taking a file that
+    was not sent keeps the files sent ahead.  A worker that dies fails the
+    file it was describing and is replaced.
+
+    The token of the run given to set_cancel_token is forwarded to a token
+    shared with the workers, so a stop or a pause reaches the generation in
+    the workers at its next token like in process.  The files described
+    ahead are kept while paused.  A worker still decoding or preprocessing
+    a file only stops or pauses once it generates, and after a stop the
+    workers left are terminated by stop.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        describe: Callable[
+            [str, int, frozenset[ImageTask]],
+            tuple[ImageDescription, tuple[BackendTiming, ...]],
+        ],
+        workers: int,
+        threads: int | None = None,
+        max_ahead: int | None = None,
+        set_cancel: Callable[[CancelToken], None] | None = None,
+    ) -> None:
+        """
+        Args:
+            describe (Callable): Describes one file with the timings of the
+                backends, called in the workers
+            workers (int): Number of worker processes
+            threads (int | None): torch threads per worker, defaults to the
+                cores divided by the workers
+            max_ahead (int | None): Files queued ahead of the file being
+                taken, defaults to twice the workers
+            set_cancel (Callable | None): Gives describe the token shared with
+                the workers, called in the workers
+        """
+
+        self.__describe = describe
+        self.__set_cancel = set_cancel
+        self.__workers = workers
+        self.__threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.__max_ahead = max_ahead or workers * 2
+
+        self.__condition: threading.Condition = threading.Condition()
+        self.__pending: deque[tuple[int, str]] = deque()
+        self.__results: dict[int, InferenceResult] = {}
+        self.__processes: list[multiprocessing.Process] = []
+        self.__task_queue: multiprocessing.Queue = None
+        self.__result_queue: multiprocessing.Queue = None
+        self.__feeder: threading.Thread = None
+        self.__collector: threading.Thread = None
+        self.__running: bool = False
+        self.__feeding: bool = False
+        self.__start_time: float = 0.0
+        self.__completed: dict[int, int] = {}
+        self.__busy: dict[int, float] = {}
+        self.__context: Any = None
+        # Index of the last file taken by the worker at each position
+        self.__slots: Any = None
+        self.__worker_args: tuple = ()
+        self.__level: int = 0
+        # Token of the run and the token of the workers it is forwarded to
+        self.__cancel: CancelToken | None = None
+        self.__worker_cancel: CancelToken | None = None
+
+    @staticmethod
+    def is_supported() -> bool:
+        return sys.platform.startswith("linux")
+
+    def get_workers(self) -> int:
+        return self.__workers
+
+    def set_cancel_token(self, cancel: CancelToken | None) -> None:
+        """
+        Checked while take waits and forwarded to the workers.
+        """
+
+        if self.__cancel:
+            self.__cancel.remove_listener(self.__forward)
+        self.__cancel = cancel
+        if cancel:
+            cancel.add_listener(self.__forward)
+            self.__forward(cancel)
+
+    ############################################################################
+    # start
+    ############################################################################
+    def start(
+        self,
+        filepaths: Iterable[str],
+        level: int,
+        tasks: frozenset[ImageTask] = frozenset(),
+    ) -> None:
+        """
+        Fork the workers and start sending them the given files, in order.
+        """
+
+        global _describe, _set_cancel
+
+        self.stop()
+        _describe = self.__describe
+        _set_cancel = self.__set_cancel
+        self.__level = level
+        self.__context = multiprocessing.get_context("fork")
+        # A new token, the one of the last run may be cancelled
+        self.__worker_cancel = CancelToken(self.__context)
+        if self.__cancel:
+            self.__forward(self.__cancel)
+        self.__task_queue = self.__context.Queue()
+        self.__result_queue = self.__context.Queue()
+        self.__results.clear()
+        self.__completed.clear()
+        self.__busy.clear()
+        self.__slots = self.__context.Array("q", [-1] * self.__workers, lock=False)
+
+        self.__worker_args = (
+            self.__task_queue,
+            self.__result_queue,
+            log_config.get_process_log_queue("fork"),
+            logging.getLogger().getEffectiveLevel(),
+            self.__threads,
+            level,
+            tasks,
+            self.__worker_cancel,
+            self.__slots,
+        )
+        for slot in range(self.__workers):
+            self.__processes.append(self.__spawn(slot))
+        self.__logger.info(
+            "Inference pool with [%s] processes of [%s] threads",
+            self.__workers,
+            self.__threads,
+        )
+
+        self.__running = True
+        self.__feeding = True
+        self.__start_time = time.perf_counter()
+        self.__collector = threading.Thread(target=self.__collect, daemon=True)
+        self.__collector.start()
+        self.__feeder = threading.Thread(
+            target=self.__feed, args=(iter(filepaths),), daemon=True
+        )
+        self.__feeder.start()
+
+    ############################################################################
+    # take
+    ############################################################################
+    def take(self, filepath: str) -> ImageDescription | None:
+        """
+        Get the description of the file, waiting for the workers if needed.
+
+        Raises:
+            Cancelled: The run was cancelled while waiting, see
+                set_cancel_token
+
+        Returns:
+            ImageDescription | None: None when the file was not sent to the
+            workers or could not be described
+        """
+
+        with self.__condition:
+            while True:
+                position: int | None = next(
+                    (
+                        position
+                        for position, (_, queued) in enumerate(self.__pending)
+                        if queued == filepath
+                    ),
+                    None,
+                )
+                if position is not None:
+                    break
+                if not self.__feeding or len(self.__pending) >= self.__max_ahead:
+                    # Not sent to the workers, the files sent ahead are kept
+                    return None
+                if self.__cancel and self.__cancel.is_cancelled():
+                    raise Cancelled()
+                self.__condition.wait(timeout=1.0)
+            for _ in range(position):
+                # This file was never taken, drop it.
+                stale, _ = self.__pending.popleft()
+                self.__results.pop(stale, None)
+            self.__condition.notify_all()
+
+            index, _ = self.__pending[0]
+            while True:
+                # Also when the result is there, the workers end the files
+                # they describe with an error once cancelled
+                if self.__cancel and self.__cancel.is_cancelled():
+                    raise Cancelled()
+                if index in self.__results or not self.__running:
+                    break
+                self.__check_workers()
+                self.__condition.wait(timeout=1.0)
+            self.__pending.popleft()
+            result: InferenceResult | None = self.__results.pop(index, None)
+            self.__condition.notify_all()
+
+        if result is None:
+            return None
+        self.__record(result)
+        if result.error:
+            self.__logger.warning(
+                "Worker [%s] could not describe [%s]. [%s]",
+                result.pid,
+                filepath,
+                result.error,
+            )
+            return None
+        return result.description
+
+    def get_queue_depth(self) -> int:
+        """
+        Returns:
+            int: Files sent to the workers and not taken yet
+        """
+        return len(self.__pending)
+
+    ############################################################################
+    # stop
+    ############################################################################
+    def stop(self) -> None:
+        """
+        Report the throughput and memory of the workers and shut them down.
+        """
+
+        if not self.__processes:
+            return
+        self.__report()
+
+        with self.__condition:
+            self.__running = False
+            self.__pending.clear()
+            self.__condition.notify_all()
+        if self.__feeder:
+            self.__feeder.join()
+            self.__feeder = None
+
+        for _ in self.__processes:
+            self.__task_queue.put(None)
+        for process in self.__processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.__processes = []
+        # Wake the collector up so that it exits
+        self.__result_queue.put(None)
+        self.__collector.join()
+        self.__collector = None
+
+    def __record(self, result: InferenceResult) -> None:
+        """
+        Export the timings of the backends in a worker like the ones in
+        process, see ImageToText.__describe.
+        """
+
+        for timing in result.timings:
+            metrics_endpoint.observe(
+                "inference_seconds", timing.duration / 1e9, backend=timing.name
+            )
+            tracing.add_span(
+                timing.name,
+                "backend",
+                timing.start,
+                timing.duration,
+                result.pid,
+                f"Inference worker [{result.pid}]",
+                level=self.__level,
+            )
+
+    def __forward(self, cancel: CancelToken) -> None:
+        worker_cancel: CancelToken | None = self.__worker_cancel
+        if not worker_cancel:
+            return
+        if cancel.is_cancelled():
+            worker_cancel.cancel()
+        elif cancel.is_paused():
+            worker_cancel.pause()
+        else:
+            worker_cancel.resume()
+
+    def __spawn(self, slot: int) -> multiprocessing.Process:
+        process: multiprocessing.Process = self.__context.Process(
+            target=_worker_main, args=self.__worker_args + (slot,), daemon=True
+        )
+        process.start()
+        return process
+
+    def __check_workers(self) -> None:
+        """
+        Fail the files of the workers that died and start new workers in
+        their place.  Called with the condition held.
+        """
+
+        for slot, process in enumerate(self.__processes):
+            if process.is_alive():
+                continue
+            self.__logger.warning(
+                "Inference worker [%s] died with exit code [%s], starting another",
+                process.pid,
+                process.exitcode,
+            )
+            index: int = self.__slots[slot]
+            self.__slots[slot] = -1
+            if index >= 0 and index not in self.__results:
+                # The result never comes, the file is described in process
+                self.__results[index] = InferenceResult(
+                    index,
+                    process.pid,
+                    None,
+                    f"The inference worker died with exit code [{process.exitcode}]",
+                    0.0,
+                )
+            self.__processes[slot] = self.__spawn(slot)
+
+    def __feed(self, filepaths: Iterable[str]) -> None:
+        try:
+            for index, filepath in enumerate(filepaths):
+                with self.__condition:
+                    self.__condition.wait_for(
+                        lambda: not self.__running
+                        or len(self.__pending) < self.__max_ahead
+                    )
+                    if not self.__running:
+                        return
+                    self.__pending.append((index, filepath))
+                    self.__condition.notify_all()
+                self.__task_queue.put((index, filepath))
+        finally:
+            with self.__condition:
+                self.__feeding = False
+                self.__condition.notify_all()
+
+    def __collect(self) -> None:
+        while True:
+            result: InferenceResult | None = self.__result_queue.get()
+            if result is None:
+                return
+            with self.__condition:
+                self.__completed[result.pid] = self.__completed.get(result.pid, 0) + 1
+                self.__busy[result.pid] = (
+                    self.__busy.get(result.pid, 0.0) + result.elapsed
+                )
+                if any(index == result.index for index, _ in self.__pending):
+                    self.__results[result.index] = result
+                self.__condition.notify_all()
+
+    def __report(self) -> None:
+        elapsed: float = time.perf_counter() - self.__start_time
+        completed: int = sum(self.__completed.values())
+        self.__logger.info(
+            "Inference pool described [%s] files in [%.1f]s, [%.2f] files/s",
+            completed,
+            elapsed,
+            completed / elapsed if elapsed else 0.0,
+        )
+        total_pss: int = 0
+        for process in self.__processes:
+            memory: dict[str, int] = get_process_memory(process.pid)
+            total_pss += memory.get("pss", 0)
+            self.__logger.info(
+                "Worker [%s] files [%s] busy [%.1f]s rss [%.0f] MB pss [%.0f] MB",
+                process.pid,
+                self.__completed.get(process.pid, 0),
+                self.__busy.get(process.pid, 0.0),
+                memory.get("rss", 0) / 1024**2,
+                memory.get("pss", 0) / 1024**2,
+            )
+        self.__logger.info("Workers total pss [%.0f] MB", total_pss / 1024**2)
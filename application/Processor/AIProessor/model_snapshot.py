@@ -0,0 +1,164 @@
+import datetime, json, logging, os, shutil
+import transformers
+from transformers.dynamic_module_utils import get_relative_imports
+from logging import Logger
+from typing import Any
+
+import Helper.app_paths as app_paths
+
+MODELS_ENV: str = "IMAGE_PROCESSOR_MODELS"
+MANIFEST_FILE: str = "snapshot.json"
+# Files written by from_pretrained that name the remote code of the model
+__AUTO_MAP_FILES: tuple[str, ...] = (
+    "config.json",
+    "preprocessor_config.json",
+    "processor_config.json",
+    "tokenizer_config.json",
+)
+__logger: Logger = logging.getLogger(__name__)
+
+
+def get_snapshot_root() -> str:
+    """
+    Returns:
+        str: Directory of the prepared models, '<config dir>/models' unless
+        the environment variable IMAGE_PROCESSOR_MODELS is set
+    """
+
+    return os.environ.get(MODELS_ENV) or app_paths.get_config_file("models")
+
+
+def get_snapshot_dir(model_name: str) -> str:
+    return os.path.join(get_snapshot_root(), model_name.replace("/", "--"))
+
+
+def get_default_dtype(device: str) -> str:
+    """
+    Half precision is only faster with a GPU, on the CPU it is emulated.
+    """
+
+    return "float32" if device == "cpu" else "float16"
+
+
+############################################################################
+# resolve
+############################################################################
+def resolve(model_name: str) -> tuple[str, dict[str, Any]]:
+    """
+    Where to load a model from.  A prepared snapshot is loaded offline, in
+    the dtype it was saved in, with the safetensors memory mapped rather than
+    read and converted.  Without a snapshot the model is loaded from the
+    Hugging Face hub as before.
+
+    Args:
+        model_name (str): Name of the model on the hub, e.g. 'org/model'
+
+    Returns:
+        tuple[str, dict[str, Any]]: The name or directory to give to
+        from_pretrained, and the extra from_pretrained arguments
+    """
+
+    snapshot_dir: str = get_snapshot_dir(model_name)
+    if not os.path.isfile(os.path.join(snapshot_dir, MANIFEST_FILE)):
+        __logger.info("No snapshot of [%s], loading from the hub", model_name)
+        return model_name, {}
+    __logger.info("Loading [%s] from the snapshot [%s]", model_name, snapshot_dir)
+    return snapshot_dir, {
+        "local_files_only": True,
+        "torch_dtype": "auto",
+        "low_cpu_mem_usage": True,
+    }
+
+
+############################################################################
+# save_snapshot
+############################################################################
+def save_snapshot(
+    model_name: str, dtype: str, model: Any, processors: list[Any]
+) -> str:
+    """
+    Write the model as safetensors, already in the dtype used at run time,
+    with its processors and its remote code, into the snapshot directory.
+    The snapshot is written next to the old one and swapped in once
+    complete, so a failed run never leaves half a snapshot.
+
+    Args:
+        model_name (str): Name of the model on the hub
+        dtype (str): Name of the torch dtype the model was loaded in
+        model (Any): The loaded model
+        processors (list[Any]): Tokenizers and image processors of the
+            model, None entries are skipped
+
+    Returns:
+        str: The snapshot directory
+    """
+
+    snapshot_dir: str = get_snapshot_dir(model_name)
+    temporary: str = snapshot_dir + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    model.save_pretrained(temporary, safe_serialization=True)
+    for processor in processors:
+        if processor is not None:
+            processor.save_pretrained(temporary)
+    vendored: list[str] = __vendor_remote_code(model_name, temporary)
+
+    with open(os.path.join(temporary, MANIFEST_FILE), "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "model": model_name,
+                "dtype": dtype,
+                "transformers": transformers.__version__,
+                "remote_code": vendored,
+                "prepared": datetime.datetime.now().isoformat(timespec="seconds"),
+            },
+            file,
+            indent=2,
+        )
+
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    os.replace(temporary, snapshot_dir)
+    __logger.info("Saved [%s] as [%s] to [%s]", model_name, dtype, snapshot_dir)
+    return snapshot_dir
+
+
+def __vendor_remote_code(model_name: str, snapshot_dir: str) -> list[str]:
+    """
+    from_pretrained copies the remote code of the classes it loaded, but not
+    always the modules they import or the ones only named in the auto_map
+    of the configuration.  Download every module the snapshot refers to that
+    is still missing, so that trust_remote_code works without the network.
+
+    Returns:
+        list[str]: The python files of the snapshot
+    """
+
+    modules: set[str] = set()
+    for filename in __AUTO_MAP_FILES:
+        path: str = os.path.join(snapshot_dir, filename)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "r", encoding="utf-8") as file:
+            auto_map: dict[str, Any] = json.load(file).get("auto_map", {})
+        for references in auto_map.values():
+            if isinstance(references, str):
+                references = [references]
+            for reference in references:
+                # 'module.Class' or 'org/model--module.Class'
+                if reference:
+                    modules.add(reference.split("--")[-1].rsplit(".", 1)[0])
+
+    # The remote code also imports its sibling modules, e.g. the modeling
+    # module imports the configuration module
+    checked: set[str] = set()
+    while modules - checked:
+        module: str = min(modules - checked)
+        checked.add(module)
+        path = os.path.join(snapshot_dir, f"{module}.py")
+        if not os.path.isfile(path):
+            from huggingface_hub import hf_hub_download
+
+            shutil.copyfile(hf_hub_download(model_name, f"{module}.py"), path)
+        modules.update(get_relative_imports(path))
+    return sorted(name for name in os.listdir(snapshot_dir) if name.endswith(".py"))
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   archive_storage.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   A zip or a tar archive as the source of a run, e.g. a Google
+             Takeout export, without extracting it first.  The files of the
+             archive are paths below the archive, such as
+             takeout.zip/Takeout/Google Photos/IMG_1234.jpg.  The EXIF is read
+             from the bytes of the member, the dates of the Takeout JSON
+             files are indexed while the archive is listed, and the copy into
+             the year folders is written from the member itself.
+"""
+
+import itertools, logging, os, shutil, tarfile, tempfile, threading, time, zipfile
+from logging import Logger
+from typing import IO, Callable, Iterable, Iterator, NamedTuple
+from .storage import FileStat, LatencyAwareStorage
+from .takeout_sidecars import TakeoutSidecars
+
+# Members of a tar archive up to this size are kept in memory until they are
+# copied, larger ones in a temporary file
+SPOOL_BYTES: int = 16 * 1024 * 1024
+COPY_BYTES: int = 1024 * 1024
+
+
+class ArchiveMember(NamedTuple):
+    name: str
+    # Index of the member in the archive, the order of a tar stream
+    position: int
+    stat: FileStat
+
+
+class ArchiveStorage(LatencyAwareStorage):
+    """
+    # Archive Storage
+
+    A LatencyAwareStorage where the paths below the archive are its members,
+    the other paths, e.g. the destination, are local files.  The archive is
+    read only: a move is a copy, and the date is set on the copy.
+
+    A zip archive is read at random, several members at a time.  A
+    compressed tar archive can only be read from its start, so its members
+    are read in the order of the archive, which is the order of the walk.
+    The members given to prefetch are kept, in memory or in a temporary
+    file, from the time the stream passes them until they are copied.  A
+    member before the stream reads the archive again from its start.
+
+    The listing, with the Takeout dates, is kept by this storage, so the
+    processes of the MetadataPool cannot share the work.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, archive: str, depth: int = 16, latency: float = 0.0) -> None:
+        """
+        Args:
+            archive (str): Path of the zip or the tar archive
+            depth (int): Members read at a time of a zip archive
+            latency (float): Seconds added to every round trip
+        """
+
+        super().__init__(depth, latency)
+        self.__archive: str = archive
+        self.__prefix: str = os.path.join(archive, "")
+        self.__is_zip: bool = zipfile.is_zipfile(archive)
+        self.__zip: zipfile.ZipFile | None = (
+            zipfile.ZipFile(archive) if self.__is_zip else None
+        )
+        self.__scanned: bool = False
+        # Path of each file of the archive -> its member
+        self.__members: dict[str, ArchiveMember] = {}
+        self.__sidecars: TakeoutSidecars = TakeoutSidecars()
+
+        # Stream of a tar archive, the members it passed that are wanted
+        self.__tar_lock: threading.RLock = threading.RLock()
+        self.__tar: tarfile.TarFile | None = None
+        self.__position: int = 0
+        self.__wanted: set[str] = set()
+        self.__spools: dict[str, IO[bytes]] = {}
+
+        # Member -> local file for the AI models, and the copies made
+        self.__local_lock: threading.Lock = threading.Lock()
+        self.__local: dict[str, str] = {}
+        self.__copied: dict[str, str] = {}
+        self.__temporary_dir: str | None = None
+        self.__extractions: Iterator[int] = itertools.count()
+
+    def __is_member(self, path: str) -> bool:
+        return path.startswith(self.__prefix)
+
+    def __get_member(self, path: str) -> ArchiveMember:
+        self.__scan()
+        member: ArchiveMember | None = self.__members.get(path)
+        if member is None:
+            raise FileNotFoundError(f"No file [{path}] in the archive")
+        return member
+
+    ############################################################################
+    # listing
+    ############################################################################
+    def is_directory(self, path: str) -> bool:
+        if path == self.__archive:
+            return True
+        if not self.__is_member(path):
+            return super().is_directory(path)
+        self.__scan()
+        directory: str = os.path.join(path, "")
+        return any(member.startswith(directory) for member in self.__members)
+
+    def walk(
+        self,
+        root: str,
+        recurse: bool = True,
+        select: Callable[[str], bool] | None = None,
+    ) -> Iterator[tuple[str, str]]:
+        """
+        Walk the archive in the order of its members, the order in which a
+        tar archive is read.
+        """
+
+        if root != self.__archive:
+            yield from super().walk(root, recurse, select)
+            return
+        self.__scan()
+        for path in self.__members:
+            directory, filename = os.path.split(path)
+            if (recurse or directory == root) and (select is None or select(filename)):
+                yield directory, filename
+
+    def __scan(self) -> None:
+        """
+        List the archive and index its Takeout JSON files, once.
+        """
+
+        if self.__scanned:
+            return
+        self.__scanned = True
+        start: float = time.perf_counter()
+        for position, name, size, mtime, read in self.__iter_members():
+            path: str = self.__to_path(name)
+            directory, filename = os.path.split(path)
+            if TakeoutSidecars.is_sidecar(filename):
+                self.__sidecars.add(directory, filename, read())
+                continue
+            self.__members[path] = ArchiveMember(
+                name, position, FileStat(size, mtime, mtime)
+            )
+        self.__logger.info(
+            "Archive [%s] has [%s] files and [%s] Takeout dates, listed in [%.3f]s",
+            self.__archive,
+            len(self.__members),
+            len(self.__sidecars),
+            time.perf_counter() - start,
+        )
+
+    def __iter_members(
+        self,
+    ) -> Iterator[tuple[int, str, int, float, Callable[[], bytes]]]:
+        """
+        Yields:
+            tuple[int, str, int, float, Callable[[], bytes]]: Position, name,
+            size, modified time and reader of each file of the archive.  The
+            reader of a tar member only works until the next one.
+        """
+
+        self._round_trip()
+        if self.__is_zip:
+            for position, info in enumerate(self.__zip.infolist()):
+                if info.is_dir():
+                    continue
+                yield (
+                    position,
+                    info.filename,
+                    info.file_size,
+                    time.mktime(info.date_time + (0, 0, -1)),
+                    lambda info=info: self.__zip.read(info),
+                )
+            return
+
+        with tarfile.open(self.__archive, "r|*") as tar:
+            position: int = 0
+            while (info := tar.next()) is not None:
+                # The stream keeps every header otherwise
+                tar.members = []
+                if info.isfile():
+                    yield (
+                        position,
+                        info.name,
+                        info.size,
+                        float(info.mtime),
+                        lambda: tar.extractfile(info).read(),
+                    )
+                position += 1
+
+    def __to_path(self, name: str) -> str:
+        return os.path.join(self.__archive, *name.strip("/").split("/"))
+
+    ############################################################################
+    # reading
+    ############################################################################
+    def prefetch(self, paths: Iterable[str]) -> None:
+        paths = list(paths)
+        if not self.__is_zip:
+            with self.__tar_lock:
+                self.__wanted = set(paths)
+        super().prefetch(paths)
+
+    def get_sidecar_time(self, path: str) -> float | None:
+        if not self.__is_member(path):
+            return None
+        self.__scan()
+        return self.__sidecars.get_time(path)
+
+    def supports_processes(self) -> bool:
+        return False
+
+    def _stat(self, path: str) -> FileStat:
+        if not self.__is_member(path):
+            return super()._stat(path)
+        # The stats of the members come with the listing
+        return self.__get_member(path).stat
+
+    def _read(self, path: str, offset: int, size: int | None) -> bytes:
+        if not self.__is_member(path):
+            return super()._read(path, offset, size)
+        name: str = self.__get_member(path).name
+        self._round_trip()
+        if self.__is_zip:
+            with self.__zip.open(name) as member:
+                member.seek(offset)
+                return member.read(size if size else -1)
+        with self.__tar_lock:
+            spool: IO[bytes] = self.__spool(path)
+            spool.seek(offset)
+            return spool.read(size if size else -1)
+
+    def read_exif(self, path: str) -> bytes | str | None:
+        exif: bytes | str | None = super().read_exif(path)
+        if not isinstance(exif, str) or not self.__is_member(exif):
+            return exif
+        # piexif cannot open a member, the segments go past the header
+        try:
+            return self._read(path, 0, None)
+        except OSError:
+            # Reported by the processing of the file
+            return None
+
+    def _read_other_exif(self, path: str, header: bytes) -> bytes | str | None:
+        if not self.__is_member(path):
+            return super()._read_other_exif(path, header)
+        if header[:2] in (b"II", b"MM") or (
+            header[:4] == b"RIFF" and header[8:12] == b"WEBP"
+        ):
+            # TIFF and WebP keep their EXIF anywhere in the file
+            return header + self._read(path, len(header), None)
+        # piexif only reads JPEG, TIFF and WebP
+        return None
+
+    def __spool(self, path: str) -> IO[bytes]:
+        """
+        The content of a member of the tar archive, the stream is read up
+        to it.  Called with the tar lock.
+        """
+
+        spool: IO[bytes] | None = self.__spools.get(path)
+        if spool is not None:
+            return spool
+
+        position: int = self.__get_member(path).position
+        if self.__tar is None or position < self.__position:
+            if self.__tar is not None:
+                self.__logger.info(
+                    "Reading [%s] again from its start for [%s]", self.__archive, path
+                )
+                self.__tar.close()
+            self.__tar = tarfile.open(self.__archive, "r|*")
+            self.__position = 0
+
+        while (info := self.__tar.next()) is not None:
+            self.__tar.members = []
+            self.__position += 1
+            if not info.isfile():
+                continue
+            current: str = self.__to_path(info.name)
+            if current != path and current not in self.__wanted:
+                continue
+            spool = tempfile.SpooledTemporaryFile(SPOOL_BYTES)
+            shutil.copyfileobj(self.__tar.extractfile(info), spool, COPY_BYTES)
+            self.__spools[current] = spool
+            if current == path:
+                return spool
+        raise FileNotFoundError(f"No file [{path}] in the archive")
+
+    def __drop_spool(self, path: str) -> None:
+        with self.__tar_lock:
+            spool: IO[bytes] | None = self.__spools.pop(path, None)
+        if spool is not None:
+            spool.close()
+
+    def get_local_path(self, path: str) -> str:
+        """
+        The copy of the member when it was already made, otherwise the
+        member is extracted to a temporary file.
+        """
+
+        if not self.__is_member(path):
+            return path
+        with self.__local_lock:
+            local: str | None = self.__local.get(path) or self.__copied.get(path)
+            if local is None:
+                if not self.__temporary_dir:
+                    self.__temporary_dir = tempfile.mkdtemp(prefix="image-processor-")
+                local = os.path.join(
+                    self.__temporary_dir,
+                    f"{next(self.__extractions)}_{os.path.basename(path)}",
+                )
+                self.__extract(path, local)
+            self.__local[path] = local
+            return local
+
+    def write_back(self, path: str) -> None:
+        if self.__is_member(path):
+            raise OSError(f"The archive of [{path}] is read only")
+        super().write_back(path)
+
+    def release_local(self, path: str) -> None:
+        if not self.__is_member(path):
+            return
+        with self.__local_lock:
+            local: str | None = self.__local.pop(path, None)
+        if local and self.__temporary_dir and local.startswith(self.__temporary_dir):
+            try:
+                os.remove(local)
+            except OSError:
+                pass
+        self.__drop_spool(path)
+
+    ############################################################################
+    # writing
+    ############################################################################
+    def move(self, path: str, directory: str) -> None:
+        if not self.__is_member(path):
+            super().move(path, directory)
+            return
+        self.__logger.debug("The archive is read only, copying [%s]", path)
+        self.copy(path, directory)
+
+    def copy(self, path: str, directory: str) -> None:
+        if not self.__is_member(path):
+            super().copy(path, directory)
+            return
+        target: str = os.path.join(directory, os.path.basename(path))
+        self._round_trip()
+        self.__extract(path, target)
+        self.__copied[path] = target
+        # Only the copy is read from now on
+        self.__drop_spool(path)
+
+    def __extract(self, path: str, target: str) -> None:
+        """
+        Write the member to the target from the archive, with the modified
+        time of the member.
+        """
+
+        member: ArchiveMember = self.__get_member(path)
+        temporary: str = f"{target}.tmp"
+        try:
+            with open(temporary, "wb") as file:
+                if self.__is_zip:
+                    with self.__zip.open(member.name) as content:
+                        shutil.copyfileobj(content, file, COPY_BYTES)
+                else:
+                    with self.__tar_lock:
+                        spool: IO[bytes] = self.__spool(path)
+                        spool.seek(0)
+                        shutil.copyfileobj(spool, file, COPY_BYTES)
+            os.utime(temporary, (member.stat.mtime, member.stat.mtime))
+            os.replace(temporary, target)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    def _rename(self, path: str, new_path: str) -> None:
+        if self.__is_member(path):
+            raise OSError(f"The archive of [{path}] is read only")
+        super()._rename(path, new_path)
+
+    def _utime(self, path: str, timestamp: float) -> None:
+        if self.__is_member(path):
+            raise OSError(f"The archive of [{path}] is read only")
+        super()._utime(path, timestamp)
+
+    def apply(self, path: str, operation: Callable[[str], None]) -> None:
+        if self.__is_member(path):
+            self.__logger.debug("Not applying [%s] to member [%s]", operation, path)
+            return
+        super().apply(path, operation)
+
+    def close(self) -> None:
+        super().close()
+        with self.__tar_lock:
+            for spool in self.__spools.values():
+                spool.close()
+            self.__spools.clear()
+            self.__wanted = set()
+            if self.__tar is not None:
+                self.__tar.close()
+                self.__tar = None
+        if self.__zip is not None:
+            self.__zip.close()
+            self.__zip = None
+        with self.__local_lock:
+            temporary_dir: str | None = self.__temporary_dir
+            self.__temporary_dir = None
+            self.__local.clear()
+            self.__copied.clear()
+        if temporary_dir:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
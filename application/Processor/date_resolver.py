@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   date_resolver.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Resolve the date and time of an image from the EXIF strings and
+             from the name of the file.  All of the patterns are compiled
+             once and recognized with a single combined match, and the
+             values are converted without strptime.
+"""
+
+import datetime, re
+from typing import Iterable
+
+
+class DateResolver:
+    """
+    Parse the date formats found in image metadata and filenames.
+
+    * **EXIF** : 'YYYY:MM:DD HH:MM:SS'
+    * **ISO** : 'YYYY-MM-DD HH:MM:SS[.ffffff][+HH:MM]' or with a 'T'
+    * **filename** : 'YYYYMMDD_HHMMSS', 'YYYY-MM-DD_HH-MM-SS',
+      'YYYY-MM-DD_HH.MM.SS' (the prefix written by this application),
+      'YYYYMMDD' and 'YYYY-MM-DD' at the start of the name
+    """
+
+    # year, month and day share the same separator, hour, minute and
+    # second share the same separator.
+    # (?P=dsep)     - back reference so that '2023-0101' is not a date
+    # fraction      - only used for timestamps, ignored for filenames
+    # offset        - only used for timestamps, filenames often have burst
+    #                 counters like '_123045-0001' that look like offsets
+    __date_pattern: re.Pattern = re.compile(
+        r"""
+        (?P<year>\d{4})(?P<dsep>[:\-]?)(?P<month>\d{2})(?P=dsep)(?P<day>\d{2})
+        (?:
+            (?P<tsep>[\ T_])
+            (?P<hour>\d{2})(?P<csep>[:\-.]?)(?P<minute>\d{2})(?P=csep)(?P<second>\d{2})
+            (?:\.(?P<fraction>\d{1,6}))?
+            (?P<offset>Z|[+\-]\d{2}:?\d{2})?
+        )?
+        """,
+        re.VERBOSE,
+    )
+
+    # Same prefixes that were removed before a new date prefix is added.
+    # \s*[-_]?\s* - Matches any space, hyphen, or underscore after the date/time.
+    __prefix_pattern: re.Pattern = re.compile(
+        r"^("
+        + "|".join(
+            (
+                # Matches YYYY-MM-DD HH-MM-SS, YYYY_MM_DD-HH.MM, etc.
+                r"\d{4}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\.: ]?\d{1,2}[-_\.: ]?\d{1,2}",
+                # Matches YYYY-MM-DD, YYYY_MM_DD, YYYY.MM.DD
+                r"\d{4}[-_\.]\d{1,2}[-_\.]\d{1,2}",
+                # Matches YYYYMMDDHHMMSS
+                r"\d{14}",
+                # Matches YYYYMMDD
+                r"\d{8}",
+            )
+        )
+        + r")\s*[-_]?\s*"
+    )
+
+    __offset_cache: dict[str, datetime.tzinfo] = {"Z": datetime.timezone.utc}
+
+    ############################################################################
+    # parse
+    ############################################################################
+    def parse(
+        self,
+        timestamp: str | bytes,
+        subsec: str | bytes | None = None,
+        offset: str | bytes | None = None,
+    ) -> datetime.datetime | None:
+        """
+        Convert an EXIF or ISO timestamp into a datetime.
+
+        Args:
+            timestamp (str | bytes): Value such as DateTimeOriginal
+            subsec (str | bytes | None): SubSecTimeOriginal, fraction digits
+            offset (str | bytes | None): OffsetTimeOriginal, e.g. '+05:30'
+
+        Returns:
+            datetime.datetime | None: The datetime, aware when an offset is
+            known, or None if the value is not a valid date.
+        """
+
+        text: str = self.__to_text(timestamp)
+        if not text:
+            return None
+
+        # Fast path for the fixed width EXIF format 'YYYY:MM:DD HH:MM:SS'.
+        if len(text) == 19 and text[4] == ":" and text[7] == ":" and text[10] == " ":
+            try:
+                date: datetime.datetime = datetime.datetime(
+                    int(text[0:4]),
+                    int(text[5:7]),
+                    int(text[8:10]),
+                    int(text[11:13]),
+                    int(text[14:16]),
+                    int(text[17:19]),
+                )
+            except ValueError:
+                return None
+            return self.__apply_subsec_and_offset(date, subsec, offset)
+
+        match: re.Match | None = self.__date_pattern.fullmatch(text)
+        if not match:
+            return None
+        date = self.__from_match(match, True)
+        if date is None:
+            return None
+        return self.__apply_subsec_and_offset(date, subsec, offset)
+
+    ############################################################################
+    # from_filename
+    ############################################################################
+    def from_filename(self, filename: str) -> datetime.datetime | None:
+        """
+        Find the date at the start of a filename.
+
+        Returns:
+            datetime.datetime | None: Date from the filename or None
+        """
+
+        if not filename[:1].isdigit():
+            return None
+        match: re.Match | None = self.__date_pattern.match(filename)
+        if not match:
+            return None
+        return self.__from_match(match, False)
+
+    ############################################################################
+    # resolve_filenames
+    ############################################################################
+    def resolve_filenames(
+        self, filenames: Iterable[str]
+    ) -> list[datetime.datetime | None]:
+        """
+        Batch version of from_filename for a whole directory listing.
+
+        Returns:
+            list[datetime.datetime | None]: One entry per filename, in order
+        """
+
+        match_date = self.__date_pattern.match
+        from_match = self.__from_match
+        return [
+            (
+                from_match(match, False)
+                if filename[:1].isdigit() and (match := match_date(filename))
+                else None
+            )
+            for filename in filenames
+        ]
+
+    ############################################################################
+    # strip_prefix
+    ############################################################################
+    def strip_prefix(self, filename: str) -> str:
+        """
+        Removes a date and/or time prefix from a filename string.
+        """
+
+        if not filename[:1].isdigit():
+            return filename
+        return self.__prefix_pattern.sub("", filename, count=1)
+
+    def __from_match(
+        self, match: re.Match, is_timestamp: bool
+    ) -> datetime.datetime | None:
+        year, _, month, day, tsep, hour, _, minute, second, fraction, offset = (
+            match.groups()
+        )
+        try:
+            if tsep is None:
+                return datetime.datetime(int(year), int(month), int(day))
+            if not is_timestamp:
+                return datetime.datetime(
+                    int(year), int(month), int(day), int(hour), int(minute), int(second)
+                )
+            return datetime.datetime(
+                int(year),
+                int(month),
+                int(day),
+                int(hour),
+                int(minute),
+                int(second),
+                int(fraction.ljust(6, "0")) if fraction else 0,
+                self.__to_timezone(offset) if offset else None,
+            )
+        except ValueError:
+            return None
+
+    def __apply_subsec_and_offset(
+        self,
+        date: datetime.datetime,
+        subsec: str | bytes | None,
+        offset: str | bytes | None,
+    ) -> datetime.datetime:
+        subsec_text: str = self.__to_text(subsec)
+        if subsec_text.isdigit() and not date.microsecond:
+            date = date.replace(microsecond=int(subsec_text[:6].ljust(6, "0")))
+
+        offset_text: str = self.__to_text(offset)
+        if offset_text and date.tzinfo is None:
+            tzinfo: datetime.tzinfo | None = self.__to_timezone(offset_text)
+            if tzinfo:
+                date = date.replace(tzinfo=tzinfo)
+        return date
+
+    def __to_timezone(self, offset: str) -> datetime.tzinfo | None:
+        tzinfo: datetime.tzinfo | None = self.__offset_cache.get(offset)
+        if tzinfo is not None:
+            return tzinfo
+
+        digits: str = offset[1:].replace(":", "")
+        if offset[:1] not in "+-" or len(digits) != 4 or not digits.isdigit():
+            return None
+        hours, minutes = int(digits[:2]), int(digits[2:])
+        if hours > 23 or minutes > 59:
+            return None
+        delta: datetime.timedelta = datetime.timedelta(hours=hours, minutes=minutes)
+        tzinfo = datetime.timezone(-delta if offset[0] == "-" else delta)
+        self.__offset_cache[offset] = tzinfo
+        return tzinfo
+
+    def __to_text(self, value: str | bytes | None) -> str:
+        if not value:
+            return ""
+        if isinstance(value, bytes):
+            value = value.decode("ascii", errors="ignore")
+        # EXIF strings are often padded with NUL characters or spaces.
+        return value.strip(" \x00")
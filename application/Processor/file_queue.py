@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   file_queue.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Compact storage for the list of files a worker has to process.
+             A plain list of absolute paths repeats the same directory prefix
+             for every file, which costs gigabytes for multi-million-file
+             jobs.  Here the directories are interned once, the filenames
+             are packed into a single bytes arena and the per-file columns
+             are kept in typed arrays.
+"""
+
+import os, sys
+from array import array
+from enum import IntEnum
+from typing import Iterable, Iterator
+
+
+class FileState(IntEnum):
+    """
+    State of a single entry in the file queue.  Stored as one byte per file.
+    """
+
+    PENDING = 0
+    DONE = 1
+    FAILED = 2
+    SKIPPED = 3
+
+
+class FileQueue:
+    """
+    Ordered queue of files to process.
+
+    * **directories** : table of unique directory paths, each stored once.
+    * **names** : every filename, encoded with `os.fsencode`, concatenated
+      into one `bytearray`.  `offsets[i]` and `offsets[i + 1]` delimit the
+      name of entry `i`.
+    * **columns** : directory index and state of each entry, kept in
+      `array` columns (4 bytes and 1 byte per entry).
+
+    The queue supports iteration, random access by index (used to resume a
+    run) and state updates.
+    """
+
+    def __init__(self, paths: Iterable[str] | None = None) -> None:
+        self.__directories: list[str] = []
+        self.__directory_index: dict[str, int] = {}
+        self.__names: bytearray = bytearray()
+        self.__offsets: array = array("Q", [0])
+        self.__dir_ids: array = array("I")
+        self.__states: array = array("B")
+
+        if paths is not None:
+            self.extend(paths)
+
+    ############################################################################
+    # add
+    ############################################################################
+    def add(self, directory: str, filename: str) -> int:
+        """
+        Add a file given its directory and its name.  This avoids joining
+        and splitting the path when the caller already has both parts, such
+        as when walking the directory tree.
+
+        Args:
+            directory (str): Directory that contains the file
+            filename (str): Name of the file without the directory
+
+        Returns:
+            int: Index of the newly added entry
+        """
+
+        dir_id: int | None = self.__directory_index.get(directory)
+        if dir_id is None:
+            dir_id = len(self.__directories)
+            self.__directories.append(directory)
+            self.__directory_index[directory] = dir_id
+
+        self.__names += os.fsencode(filename)
+        self.__offsets.append(len(self.__names))
+        self.__dir_ids.append(dir_id)
+        self.__states.append(FileState.PENDING)
+        return len(self.__dir_ids) - 1
+
+    def append(self, filepath: str) -> int:
+        """
+        Add a file given its full path.
+        """
+
+        directory, filename = os.path.split(filepath)
+        return self.add(directory, filename)
+
+    def extend(self, paths: Iterable[str]) -> None:
+        for filepath in paths:
+            self.append(filepath)
+
+    ############################################################################
+    # Random access
+    ############################################################################
+    def __len__(self) -> int:
+        return len(self.__dir_ids)
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"File queue index [{index}] out of range")
+        return os.path.join(
+            self.__directories[self.__dir_ids[index]], self.get_filename(index)
+        )
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def get_filename(self, index: int) -> str:
+        return os.fsdecode(
+            bytes(self.__names[self.__offsets[index] : self.__offsets[index + 1]])
+        )
+
+    def get_directory(self, index: int) -> str:
+        return self.__directories[self.__dir_ids[index]]
+
+    def get_directory_id(self, index: int) -> int:
+        return self.__dir_ids[index]
+
+    def get_directory_count(self) -> int:
+        return len(self.__directories)
+
+    ############################################################################
+    # State
+    ############################################################################
+    def get_state(self, index: int) -> FileState:
+        return FileState(self.__states[index])
+
+    def set_state(self, index: int, state: FileState) -> None:
+        self.__states[index] = state
+
+    def count(self, state: FileState) -> int:
+        return self.__states.count(state)
+
+    def iter_pending(self, start: int = 0) -> Iterator[tuple[int, str]]:
+        """
+        Iterate over the entries that have not been processed yet, starting
+        at the given index.  This is used to resume an interrupted run.
+
+        Yields:
+            tuple[int, str]: Index and full path of each pending file
+        """
+
+        for index in range(start, len(self)):
+            if self.__states[index] == FileState.PENDING:
+                yield index, self[index]
+
+    def first_pending(self) -> int | None:
+        """
+        Returns:
+            int | None: Index of the first pending entry, None if all are done
+        """
+
+        try:
+            return self.__states.index(FileState.PENDING)
+        except ValueError:
+            return None
+
+    ############################################################################
+    # nbytes
+    ############################################################################
+    def nbytes(self) -> int:
+        """
+        Approximate number of bytes used by the queue, including the
+        directory table.
+
+        Returns:
+            int: Memory used in bytes
+        """
+
+        directory_bytes: int = sum(
+            sys.getsizeof(directory) for directory in self.__directories
+        )
+        return (
+            len(self.__names)
+            + self.__offsets.itemsize * len(self.__offsets)
+            + self.__dir_ids.itemsize * len(self.__dir_ids)
+            + self.__states.itemsize * len(self.__states)
+            + directory_bytes
+        )
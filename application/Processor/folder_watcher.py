@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   folder_watcher.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Watch a folder for new images, e.g. the folder a phone or a
+             camera uploads to.  A file is handed out once its size and its
+             modified time have not changed for a while, so that a photo
+             that is still being copied is not read half written.  Linux
+             reports the changes through inotify, the other systems and the
+             file systems without inotify are polled.
+"""
+
+import ctypes, ctypes.util, errno, logging, os, select, struct, sys, time
+from logging import Logger
+from typing import Callable, Iterable, NamedTuple
+
+# inotify_init1 flags
+IN_NONBLOCK: int = 0x800
+IN_CLOEXEC: int = 0x80000
+# Events of a watched directory
+IN_MODIFY: int = 0x2
+IN_CLOSE_WRITE: int = 0x8
+IN_MOVED_FROM: int = 0x40
+IN_MOVED_TO: int = 0x80
+IN_CREATE: int = 0x100
+IN_DELETE: int = 0x200
+IN_DELETE_SELF: int = 0x400
+IN_ONLYDIR: int = 0x1000000
+# Sent by the kernel
+IN_Q_OVERFLOW: int = 0x4000
+IN_IGNORED: int = 0x8000
+IN_ISDIR: int = 0x40000000
+
+WATCH_MASK: int = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+)
+# wd, mask, cookie, len, followed by len bytes of name
+EVENT_HEADER: struct.Struct = struct.Struct("iIII")
+READ_SIZE: int = 64 * 1024
+# A directory modified this close to its listing may change again within
+# the resolution of its modified time, it is listed again on the next scan.
+RACY_SECONDS: float = 2.0
+
+
+class Candidate(NamedTuple):
+    """
+    A new or changed file, handed out once it is settled.
+    """
+
+    size: int
+    mtime_ns: int
+    # time.monotonic() when the size or the modified time last changed
+    since: float
+
+
+class FolderWatcher:
+    """
+    # Folder Watcher
+
+    Keeps the size and the modified time of every file of the folder.  A
+    change event, or a poll, only makes the file a candidate.  wait()
+    returns the candidates whose size and modified time were the same for
+    'settle' seconds.
+
+    When the kernel queue overflows, events are lost.  Instead of listing
+    the whole tree, only the directories whose modified time changed since
+    their last listing are listed again.  Polling uses the same rescan.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        root: str,
+        recurse: bool = True,
+        select_file: Callable[[str], bool] | None = None,
+        settle: float = 2.0,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+    ) -> None:
+        """
+        Args:
+            root (str): Folder to watch
+            recurse (bool): Also watch the sub-folders
+            select_file (Callable[[str], bool] | None): Given the name of a
+                file, True when it is to be handed out, all files when None
+            settle (float): Seconds a file must stay the same
+            poll_interval (float): Seconds between two rescans without inotify
+            use_inotify (bool): False to always poll
+        """
+
+        self.__root = os.path.abspath(root)
+        self.__recurse = recurse
+        self.__select = select_file or (lambda _: True)
+        self.__settle = max(0.0, settle)
+        self.__poll_interval = max(0.1, poll_interval)
+        self.__use_inotify = use_inotify and sys.platform.startswith("linux")
+
+        # Path -> (size, mtime_ns) of the files already handed out or known
+        self.__files: dict[str, tuple[int, int]] = {}
+        # Directory -> mtime_ns at its last listing, 0 to list it again
+        self.__directories: dict[str, int] = {}
+        self.__candidates: dict[str, Candidate] = {}
+        # Files written by the run itself inside the watched folder
+        self.__ignored: set[str] = set()
+        self.__fd: int = -1
+        # Watch descriptor -> directory, and back
+        self.__watches: dict[int, str] = {}
+        self.__watch_ids: dict[str, int] = {}
+        self.__libc: ctypes.CDLL | None = None
+        self.__last_rescan: float = 0.0
+
+    def is_inotify(self) -> bool:
+        return self.__fd >= 0
+
+    ############################################################################
+    # start
+    ############################################################################
+    def start(self, existing: bool = False) -> None:
+        """
+        Args:
+            existing (bool): Hand out the files already in the folder, they
+                are only recorded otherwise
+
+        Raises:
+            ValueError: The folder does not exist
+        """
+
+        if not os.path.isdir(self.__root):
+            raise ValueError(f"The directory provided [{self.__root}] is not valid")
+        if self.__use_inotify:
+            self.__open_inotify()
+        # The watches are added before the listing, a file created in
+        # between is then seen twice instead of not at all.
+        self.__add_directory(self.__root)
+        self.__rescan(record=not existing)
+        self.__logger.info(
+            "Watching [%s] with [%s], [%d] files, [%d] directories",
+            self.__root,
+            "inotify" if self.is_inotify() else "polling",
+            len(self.__files),
+            len(self.__directories),
+        )
+
+    def __open_inotify(self) -> None:
+        try:
+            self.__libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd: int = self.__libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            self.__logger.warning("No inotify, the folder is polled. [%s]", e)
+            return
+        if fd < 0:
+            self.__logger.warning(
+                "No inotify, the folder is polled. [%s]",
+                os.strerror(ctypes.get_errno()),
+            )
+            return
+        self.__fd = fd
+
+    def close(self) -> None:
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+        self.__watches.clear()
+        self.__watch_ids.clear()
+
+    ############################################################################
+    # ignore
+    ############################################################################
+    def ignore(self, paths: Iterable[str]) -> None:
+        """
+        Never hand out these files, e.g. the images that the run renamed or
+        moved into the watched folder.  The file is recorded with its
+        current size and modified time.
+        """
+
+        for path in paths:
+            path = os.path.abspath(path)
+            self.__candidates.pop(path, None)
+            if not self.__is_inside(path):
+                continue
+            self.__ignored.add(path)
+            try:
+                stat: os.stat_result = os.stat(path)
+            except OSError:
+                continue
+            self.__files[path] = (stat.st_size, stat.st_mtime_ns)
+
+    ############################################################################
+    # wait
+    ############################################################################
+    def wait(self, timeout: float, limit: int | None = None) -> list[str]:
+        """
+        Wait for settled files.
+
+        Args:
+            timeout (float): Seconds to wait at most
+            limit (int | None): Files to return at most, None for all
+
+        Returns:
+            list[str]: Settled files, oldest change first, empty on timeout
+        """
+
+        deadline: float = time.monotonic() + timeout
+        while True:
+            now: float = time.monotonic()
+            if self.is_inotify():
+                self.__read_events(max(0.0, min(deadline, self.__next_check()) - now))
+            else:
+                if now - self.__last_rescan >= self.__poll_interval:
+                    self.__rescan()
+                time.sleep(max(0.0, min(deadline, self.__next_check()) - now))
+            settled: list[str] = self.__pop_settled(limit)
+            if settled or time.monotonic() >= deadline:
+                return settled
+
+    def __next_check(self) -> float:
+        """
+        Returns:
+            float: time.monotonic() of the next thing to do, a candidate to
+            settle or a rescan
+        """
+
+        checks: list[float] = [
+            candidate.since + self.__settle
+            for candidate in self.__candidates.values()
+        ]
+        if not self.is_inotify():
+            checks.append(self.__last_rescan + self.__poll_interval)
+        return min(checks, default=float("inf"))
+
+    def __pop_settled(self, limit: int | None) -> list[str]:
+        now: float = time.monotonic()
+        settled: list[str] = []
+        for path, candidate in sorted(
+            self.__candidates.items(), key=lambda item: item[1].since
+        ):
+            if limit is not None and len(settled) >= limit:
+                break
+            if now - candidate.since < self.__settle:
+                break
+            try:
+                stat: os.stat_result = os.stat(path)
+            except OSError:
+                # Removed or renamed before it settled
+                del self.__candidates[path]
+                continue
+            current: tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+            if current != (candidate.size, candidate.mtime_ns):
+                # Still being written, checked again after settle
+                self.__candidates[path] = Candidate(*current, now)
+                continue
+            del self.__candidates[path]
+            self.__files[path] = current
+            settled.append(path)
+        return settled
+
+    ############################################################################
+    # events
+    ############################################################################
+    def __read_events(self, timeout: float) -> None:
+        readable, _, _ = select.select([self.__fd], [], [], timeout)
+        if not readable:
+            return
+        while True:
+            try:
+                data: bytes = os.read(self.__fd, READ_SIZE)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            self.__handle_events(data)
+
+    def __handle_events(self, data: bytes) -> None:
+        offset: int = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name: str = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.__logger.warning(
+                    "inotify queue overflow, rescanning [%s]", self.__root
+                )
+                self.__rescan()
+                continue
+            directory: str | None = self.__watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # The directory was removed, or moved out of the folder
+                self.__remove_directory(directory)
+                continue
+            if not name:
+                continue
+            path: str = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.__recurse:
+                    # Its sub-directories may be there before its watch
+                    self.__add_directory(path)
+                    pending: list[str] = [path]
+                    while pending:
+                        pending.extend(self.__list(pending.pop(), record=False))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.__remove_directory(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self.__forget(path)
+            else:
+                self.__check(path)
+
+    ############################################################################
+    # directories
+    ############################################################################
+    def __add_directory(self, directory: str) -> None:
+        self.__directories.setdefault(directory, 0)
+        if self.__fd < 0 or directory in self.__watch_ids:
+            return
+        wd: int = self.__libc.inotify_add_watch(
+            self.__fd, os.fsencode(directory), WATCH_MASK
+        )
+        if wd < 0:
+            error: int = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                # Removed before it was watched
+                return
+            # e.g. ENOSPC, more directories than fs.inotify.max_user_watches
+            self.__logger.warning(
+                "Cannot watch [%s], the folder is polled. [%s]",
+                directory,
+                os.strerror(error),
+            )
+            self.close()
+            return
+        self.__watches[wd] = directory
+        self.__watch_ids[directory] = wd
+
+    def __remove_directory(self, directory: str) -> None:
+        prefix: str = os.path.join(directory, "")
+        for path in [
+            path
+            for path in self.__directories
+            if path == directory or path.startswith(prefix)
+        ]:
+            del self.__directories[path]
+            wd: int | None = self.__watch_ids.pop(path, None)
+            if wd is not None:
+                # The kernel drops the watch by itself, see IN_IGNORED
+                self.__watches.pop(wd, None)
+        for files in (self.__files, self.__candidates):
+            for path in [path for path in files if path.startswith(prefix)]:
+                del files[path]
+
+    def __rescan(self, record: bool = False) -> None:
+        """
+        List the directories that changed since their last listing, and the
+        new sub-directories they have.
+
+        Args:
+            record (bool): Record the files found without handing them out
+        """
+
+        self.__last_rescan = time.monotonic()
+        pending: list[str] = list(self.__directories)
+        while pending:
+            directory: str = pending.pop()
+            try:
+                mtime_ns: int = os.stat(directory).st_mtime_ns
+            except OSError:
+                self.__remove_directory(directory)
+                continue
+            if self.__directories.get(directory) == mtime_ns:
+                continue
+            pending.extend(self.__list(directory, record))
+
+    def __list(self, directory: str, record: bool) -> list[str]:
+        """
+        Returns:
+            list[str]: Sub-directories that were not known
+        """
+
+        try:
+            mtime_ns: int = os.stat(directory).st_mtime_ns
+            entries: list[os.DirEntry] = list(os.scandir(directory))
+        except OSError as e:
+            self.__logger.debug("Cannot list [%s]. [%s]", directory, e)
+            self.__remove_directory(directory)
+            return []
+        # A directory changed in the same tick as its listing is listed again
+        racy: bool = time.time_ns() - mtime_ns < RACY_SECONDS * 1e9
+        self.__directories[directory] = 0 if racy else mtime_ns
+
+        new_directories: list[str] = []
+        names: set[str] = set()
+        for entry in entries:
+            names.add(entry.path)
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.__recurse and entry.path not in self.__directories:
+                        self.__add_directory(entry.path)
+                        new_directories.append(entry.path)
+                elif entry.is_file():
+                    self.__check(entry.path, entry.stat(), record)
+            except OSError:
+                continue
+        # Files removed while no event was read
+        prefix: str = os.path.join(directory, "")
+        for files in (self.__files, self.__candidates):
+            for path in [
+                path
+                for path in files
+                if path.startswith(prefix)
+                and os.sep not in path[len(prefix) :]
+                and path not in names
+            ]:
+                del files[path]
+        return new_directories
+
+    ############################################################################
+    # files
+    ############################################################################
+    def __check(
+        self, path: str, stat: os.stat_result | None = None, record: bool = False
+    ) -> None:
+        """
+        Make the file a candidate when it is new or changed.
+        """
+
+        if path in self.__ignored or not self.__select(os.path.basename(path)):
+            return
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.__forget(path)
+                return
+        current: tuple[int, int] = (stat.st_size, stat.st_mtime_ns)
+        if record:
+            self.__files[path] = current
+            return
+        if self.__files.get(path) == current:
+            return
+        candidate: Candidate | None = self.__candidates.get(path)
+        if candidate is None or (candidate.size, candidate.mtime_ns) != current:
+            self.__candidates[path] = Candidate(*current, time.monotonic())
+
+    def __forget(self, path: str) -> None:
+        self.__files.pop(path, None)
+        self.__candidates.pop(path, None)
+        self.__ignored.discard(path)
+
+    def __is_inside(self, path: str) -> bool:
+        return path == self.__root or path.startswith(os.path.join(self.__root, ""))
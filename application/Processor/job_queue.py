@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   job_queue.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Queue of processing jobs, each a source directory with its own
+             destination, options and AI level.  The queue is kept in
+             'jobs.json' of the configuration directory, so the jobs that
+             were not run, or were interrupted, are still there on the next
+             start.  The window and run_jobs.py edit the same queue and the
+             JobRunner runs it.  Every change reads the file again and
+             writes it back under a file lock, so that the processes do not
+             overwrite the jobs of each other.
+"""
+
+import contextlib, datetime, json, logging, os, threading, uuid
+from enum import Enum
+from logging import Logger
+from typing import Any, Callable, Iterator, NamedTuple, TypeVar
+import Helper.app_paths as app_paths
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+JOBS_FILE: str = "jobs.json"
+LOCK_SUFFIX: str = ".lock"
+T = TypeVar("T")
+
+
+class JobState(Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class Job(NamedTuple):
+    """
+    One job of the queue.  'options' has the ProcessingOptions names as
+    keys, as given to the Worker.
+    """
+
+    id: str
+    source: str
+    destination: str
+    options: dict[str, bool]
+    ai_level: int = 0
+    state: JobState = JobState.PENDING
+    files_done: int = 0
+    files_total: int = 0
+    # Run summary of the last run, see run_metrics.format_snapshot
+    summary: tuple[str, ...] = ()
+    created: str = ""
+    finished: str = ""
+    # Process that runs the job, see JobQueue.claim
+    pid: int = 0
+
+    def get_worker_options(self) -> dict[str, bool | int]:
+        return {**self.options, "ai_level": self.ai_level}
+
+    def describe(self) -> str:
+        """
+        Returns:
+            str: One line for the lists of the window and of the CLI
+        """
+
+        progress: str = (
+            f" {self.files_done}/{self.files_total}" if self.files_total else ""
+        )
+        destination: str = f" -> {self.destination}" if self.destination else ""
+        return (
+            f"[{self.state.value}{progress}] {self.source}{destination} "
+            f"(AI level {self.ai_level}, {self.id})"
+        )
+
+
+class JobQueue:
+    """
+    # Job Queue
+
+    Ordered jobs, saved after every change.  Used by the window thread and
+    the runner thread, and by the other processes on the same file, e.g.
+    run_jobs.py next to the window.  Every method is thread safe, the jobs
+    are read again when the file changed.
+
+    A running job has the id of its process.  When that process is gone,
+    e.g. the application stopped during the run, the job is pending again.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, filename: str | None = None) -> None:
+        """
+        Args:
+            filename (str | None): File of the queue, defaults to jobs.json
+                in the configuration directory
+        """
+
+        self.__filename: str = filename or app_paths.get_config_file(JOBS_FILE)
+        self.__lock: threading.RLock = threading.RLock()
+        self.__jobs: list[Job] = []
+        # (inode, mtime_ns, size) of the file when it was read, os.replace
+        # gives the file a new inode on every change
+        self.__signature: tuple[int, int, int] | None = None
+        self.load()
+
+    ############################################################################
+    # edit
+    ############################################################################
+    def add(
+        self,
+        source: str,
+        destination: str,
+        options: dict[str, bool],
+        ai_level: int = 0,
+    ) -> Job:
+        job: Job = Job(
+            id=uuid.uuid4().hex[:8],
+            source=source,
+            destination=destination,
+            options=dict(options),
+            ai_level=ai_level,
+            created=datetime.datetime.now().isoformat(timespec="seconds"),
+        )
+        self.__edit(lambda jobs: jobs.append(job))
+        self.__logger.info("Added job [%s]", job.describe())
+        return job
+
+    def remove(self, job_id: str) -> bool:
+        def remove(jobs: list[Job]) -> bool:
+            count: int = len(jobs)
+            jobs[:] = [job for job in jobs if job.id != job_id]
+            return len(jobs) != count
+
+        return self.__edit(remove)
+
+    def update(self, job_id: str, **fields: Any) -> Job | None:
+        """
+        Replace fields of a job, e.g. update(id, state=JobState.DONE).
+
+        Returns:
+            Job | None: The updated job, None when it was removed
+        """
+
+        def update(jobs: list[Job]) -> Job | None:
+            for index, job in enumerate(jobs):
+                if job.id == job_id:
+                    jobs[index] = job._replace(**fields)
+                    return jobs[index]
+            return None
+
+        return self.__edit(update)
+
+    def claim(self, job_id: str) -> Job | None:
+        """
+        Mark a pending job as running in this process.
+
+        Returns:
+            Job | None: The running job, None when it was removed or another
+            process claimed it first
+        """
+
+        def claim(jobs: list[Job]) -> Job | None:
+            for index, job in enumerate(jobs):
+                if job.id == job_id and job.state == JobState.PENDING:
+                    jobs[index] = job._replace(
+                        state=JobState.RUNNING, pid=os.getpid()
+                    )
+                    return jobs[index]
+            return None
+
+        return self.__edit(claim)
+
+    def clear_finished(self) -> int:
+        """
+        Returns:
+            int: Number of jobs removed, the done and failed ones
+        """
+
+        def clear(jobs: list[Job]) -> int:
+            count: int = len(jobs)
+            jobs[:] = [
+                job for job in jobs if job.state not in (JobState.DONE, JobState.FAILED)
+            ]
+            return count - len(jobs)
+
+        return self.__edit(clear)
+
+    ############################################################################
+    # read
+    ############################################################################
+    def get_jobs(self) -> list[Job]:
+        with self.__lock:
+            self.__refresh()
+            return list(self.__jobs)
+
+    def get_job(self, job_id: str) -> Job | None:
+        with self.__lock:
+            self.__refresh()
+            return next((job for job in self.__jobs if job.id == job_id), None)
+
+    def get_pending(self) -> list[Job]:
+        with self.__lock:
+            self.__refresh()
+            return [job for job in self.__jobs if job.state == JobState.PENDING]
+
+    ############################################################################
+    # load / save
+    ############################################################################
+    def load(self) -> None:
+        """
+        Read the queue.
+        """
+
+        with self.__lock:
+            self.__signature = self.__get_signature()
+            self.__jobs = self.__read()
+
+    def __refresh(self) -> None:
+        # The file is replaced whole by os.replace, it is read without the
+        # file lock
+        if self.__get_signature() != self.__signature:
+            self.load()
+
+    def __edit(self, change: Callable[[list[Job]], T]) -> T:
+        """
+        Read the jobs again, change them and write them back, while no
+        other process edits the file.
+
+        Args:
+            change (Callable[[list[Job]], T]): Changes the list in place
+
+        Returns:
+            T: What change returned
+        """
+
+        with self.__lock, self.__file_lock():
+            jobs: list[Job] = self.__read()
+            result: T = change(jobs)
+            self.__write(jobs)
+            self.__jobs = jobs
+            self.__signature = self.__get_signature()
+            return result
+
+    @contextlib.contextmanager
+    def __file_lock(self) -> Iterator[None]:
+        with open(self.__filename + LOCK_SUFFIX, "a+b") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def __get_signature(self) -> tuple[int, int, int] | None:
+        try:
+            stat: os.stat_result = os.stat(self.__filename)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def __read(self) -> list[Job]:
+        """
+        Returns:
+            list[Job]: The jobs of the file, a running job whose process is
+            gone is pending again
+        """
+
+        try:
+            with open(self.__filename, "r", encoding="utf-8") as file:
+                entries: list[dict[str, Any]] = json.load(file).get("jobs", [])
+        except FileNotFoundError:
+            entries = []
+        except (OSError, ValueError) as e:
+            self.__logger.warning(
+                "Could not read the job queue [%s]. [%s]", self.__filename, e
+            )
+            entries = []
+
+        jobs: list[Job] = []
+        for entry in entries:
+            try:
+                state: JobState = JobState(entry.get("state", "pending"))
+                if state == JobState.RUNNING and not is_process_alive(
+                    entry.get("pid", 0)
+                ):
+                    state = JobState.PENDING
+                jobs.append(
+                    Job(
+                        **{
+                            **entry,
+                            "state": state,
+                            "summary": tuple(entry.get("summary", ())),
+                        }
+                    )
+                )
+            except (TypeError, ValueError) as e:
+                self.__logger.warning("Ignoring job [%s]. [%s]", entry, e)
+        return jobs
+
+    def __write(self, jobs: list[Job]) -> None:
+        entries: list[dict[str, Any]] = [
+            {
+                **job._asdict(),
+                "state": job.state.value,
+                "summary": list(job.summary),
+            }
+            for job in jobs
+        ]
+        temporary: str = self.__filename + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"jobs": entries}, file, indent=2)
+        os.replace(temporary, self.__filename)
+
+    def get_filename(self) -> str:
+        return self.__filename
+
+
+def is_process_alive(pid: int) -> bool:
+    """
+    Returns:
+        bool: True when a process with this id runs
+    """
+
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        import ctypes
+
+        # PROCESS_QUERY_LIMITED_INFORMATION, os.kill would end the process
+        handle: int = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Runs as another user
+        return True
+    return True
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   metadata_pool.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Metadata-only processing spread over a pool of processes.  When
+             the AI description is not requested, every file only needs the
+             date extraction, the move/copy into the year folder, the rename
+             and the utime update.  These are independent per file and are
+             limited by the GIL in piexif, so they are run in separate
+             processes, one directory chunk at a time.
+"""
+
+import logging, multiprocessing, os, time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import Logger
+from typing import Any, Generator, NamedTuple
+
+import Helper.log_config as log_config
+from MainWindow.processing_options import ProcessingOptions
+from .file_queue import FileQueue
+from .process_image import ProcessImage
+from .storage import Storage, get_storage
+
+
+class MetadataResult(NamedTuple):
+    """
+    Result of the metadata processing of one file.  Each step is a tuple of
+    (step name, status, resulting file path).
+    """
+
+    index: int
+    filename: str
+    filepath: str
+    # None when the file could not be processed
+    created_date: Any
+    date_source: str | None
+    steps: list[tuple[str, bool, str]]
+    elapsed: float
+    # Bytes of the file, for the throughput of the run
+    size: int = 0
+
+
+# State of each child process, set by _initialize_process.
+_process_image: ProcessImage = None
+_options: dict[str, Any] = None
+_move_dir: str = None
+_storage: Storage = None
+
+
+def _initialize_process(
+    log_queue: multiprocessing.Queue,
+    level: int,
+    options: dict[str, Any],
+    move_dir: str,
+    source_dir: str,
+) -> None:
+    global _process_image, _options, _move_dir, _storage
+
+    log_config.setup_process_logging(log_queue, level)
+    _storage = get_storage(
+        options.get(ProcessingOptions.NETWORK_STORAGE.name, False),
+        (source_dir, move_dir),
+    )
+    _process_image = ProcessImage()
+    _process_image.set_storage(_storage)
+    _options = options
+    _move_dir = move_dir
+
+
+def _process_chunk(chunk: list[tuple[int, str]]) -> list[MetadataResult]:
+    """
+    Process a list of files from the same directory in a child process.
+    The queued renames of a network storage are done with the chunk.
+    """
+
+    results: list[MetadataResult] = []
+    move: bool = _options[ProcessingOptions.MOVE_FILES.name]
+    copy: bool = _options[ProcessingOptions.COPY_FILES.name]
+
+    _storage.prefetch(filename for _, filename in chunk)
+    for index, filename in chunk:
+        start_time: float = time.perf_counter()
+        steps: list[tuple[str, bool, str]] = []
+        # Before the move, from the listing prefetched for the chunk
+        size: int = _storage.get_size(filename)
+        try:
+            _process_image.init(filename)
+            if move or copy:
+                flag, new_filename = _process_image.process_move_image_to_folder(
+                    move,
+                    copy,
+                    _move_dir,
+                    _options[ProcessingOptions.CREATE_MONTH_FOLDER.name],
+                )
+                steps.append(("Move/Copy File", flag, new_filename))
+            if _options[ProcessingOptions.CREATED_DATE.name]:
+                flag, new_filename = _process_image.process_created_date()
+                steps.append(("Created Date", flag, new_filename))
+            filepath: str = _process_image.get_filepath()
+            created_date: Any = _process_image.get_created_date()
+            date_source: str | None = _process_image.get_date_source()
+        except Exception as e:
+            logging.getLogger(__name__).warning(
+                "Could not process metadata for file [%s]. [%s]", filename, e
+            )
+            steps.append(("Metadata", False, str(e)))
+            filepath = filename
+            # The shared ProcessImage may still have the previous file
+            created_date, date_source = None, None
+
+        results.append(
+            MetadataResult(
+                index,
+                filename,
+                filepath,
+                created_date,
+                date_source,
+                steps,
+                time.perf_counter() - start_time,
+                size,
+            )
+        )
+    _storage.flush()
+    return results
+
+
+class MetadataPool:
+    """
+    Run the metadata-only processing of a FileQueue over a process pool.
+
+    The queue is cut into chunks that never span two directories, so each
+    process works within one directory at a time.  A bounded number of
+    chunks is in flight and the results are yielded in queue order.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        options: dict[str, Any],
+        move_dir: str,
+        workers: int | None = None,
+        chunk_size: int = 64,
+        source_dir: str = "",
+    ) -> None:
+        self.__options = options
+        self.__move_dir = move_dir
+        # With the destination, selects the storage of the processes
+        self.__source_dir = source_dir
+        self.__workers = workers or os.cpu_count() or 1
+        self.__chunk_size = chunk_size
+        self.__executor: ProcessPoolExecutor = None
+
+    def get_workers(self) -> int:
+        return self.__workers
+
+    ############################################################################
+    # run
+    ############################################################################
+    def run(self, file_queue: FileQueue) -> Generator[MetadataResult, None, None]:
+        """
+        Process the pending files of the queue.
+
+        Yields:
+            MetadataResult: One result per file, in queue order
+        """
+
+        self.__logger.info(
+            "Metadata pool with [%s] processes and chunks of [%s] files",
+            self.__workers,
+            self.__chunk_size,
+        )
+        self.__executor = ProcessPoolExecutor(
+            max_workers=self.__workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_process,
+            initargs=(
+                log_config.get_process_log_queue("spawn"),
+                logging.getLogger().getEffectiveLevel(),
+                self.__options,
+                self.__move_dir,
+                self.__source_dir,
+            ),
+        )
+
+        # Enough chunks in flight to keep every process busy while the
+        # results of the oldest chunk are handed back.
+        in_flight: deque[Future] = deque()
+        max_in_flight: int = self.__workers * 4
+        try:
+            for chunk in self.__chunks(file_queue):
+                in_flight.append(self.__executor.submit(_process_chunk, chunk))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+            while in_flight:
+                yield from in_flight.popleft().result()
+        finally:
+            self.stop()
+
+    ############################################################################
+    # stop
+    ############################################################################
+    def stop(self) -> None:
+        """
+        Cancel the chunks that have not started and shut the processes down.
+        """
+
+        if self.__executor:
+            self.__executor.shutdown(wait=True, cancel_futures=True)
+            self.__executor = None
+
+    def __chunks(
+        self, file_queue: FileQueue
+    ) -> Generator[list[tuple[int, str]], None, None]:
+        chunk: list[tuple[int, str]] = []
+        directory_id: int = -1
+        for index, filename in file_queue.iter_pending():
+            if chunk and (
+                len(chunk) >= self.__chunk_size
+                or file_queue.get_directory_id(index) != directory_id
+            ):
+                yield chunk
+                chunk = []
+            directory_id = file_queue.get_directory_id(index)
+            chunk.append((index, filename))
+        if chunk:
+            yield chunk
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   object_storage.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Sources and destinations in an S3 compatible bucket, given as
+             s3://bucket/prefix, without mounting the bucket.  The listings
+             are paginated and the prefixes are listed concurrently, the
+             dates come from a range read of the EXIF header, and a whole
+             object is only downloaded when the AI models need its pixels.
+             Uploads and copies are multipart and parallel over a pool of
+             connections.  Requires boto3 (pip install boto3), the
+             credentials are the ones of the AWS tools, e.g. the
+             AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY variables.
+
+             IMAGE_PROCESSOR_S3_ENDPOINT  - endpoint of a server other than
+                                            AWS, e.g. http://127.0.0.1:9000
+                                            for MinIO
+"""
+
+import itertools, logging, os, shutil, tempfile, threading
+from concurrent.futures import Future
+from logging import Logger
+from typing import Any, Callable, Iterator
+from .storage import OBJECT_SCHEME, FileStat, LatencyAwareStorage, is_object_path
+
+ENDPOINT_ENV: str = "IMAGE_PROCESSOR_S3_ENDPOINT"
+# Objects over this size are uploaded and copied in parts of this size
+PART_BYTES: int = 8 * 1024 * 1024
+# User metadata with the modified time, the name used by rclone
+MTIME_METADATA: str = "mtime"
+# Headers of an object that a copy with new metadata would reset, e.g. the
+# Content-Type to binary/octet-stream
+COPIED_HEADERS: tuple[str, ...] = (
+    "ContentType",
+    "CacheControl",
+    "ContentDisposition",
+    "ContentEncoding",
+    "ContentLanguage",
+)
+
+
+class ObjectStorage(LatencyAwareStorage):
+    """
+    # Object Storage
+
+    A LatencyAwareStorage where the s3:// paths are objects, the other paths
+    are local files, so that a bucket can be the source, the destination or
+    both.  A bucket has no directories: makedirs does nothing and the
+    modified time set by utime is kept in the 'mtime' metadata.  A rename
+    is a copy and a delete on the server, a rename followed by a utime is
+    done in one copy.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self, depth: int = 16, latency: float = 0.0, endpoint: str | None = None
+    ) -> None:
+        """
+        Args:
+            depth (int): Requests in flight, and connections of the pool
+            latency (float): Seconds added to every round trip
+            endpoint (str | None): Endpoint of the server, defaults to the
+                environment variable IMAGE_PROCESSOR_S3_ENDPOINT, then AWS
+        """
+
+        super().__init__(depth, latency)
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError as e:
+            raise ImportError(
+                "boto3 is required for s3:// paths, pip install boto3"
+            ) from e
+
+        # A client is thread safe, the transfers also take their threads
+        # from its pool of connections
+        self.__client: Any = boto3.session.Session().client(
+            "s3",
+            endpoint_url=endpoint or os.environ.get(ENDPOINT_ENV) or None,
+            config=Config(
+                max_pool_connections=depth * 2,
+                retries={"max_attempts": 5, "mode": "adaptive"},
+            ),
+        )
+        self.__transfer: Any = TransferConfig(
+            multipart_threshold=PART_BYTES,
+            multipart_chunksize=PART_BYTES,
+            max_concurrency=depth,
+        )
+        self.__lock: threading.Lock = threading.Lock()
+        # s3 path -> download of its local file
+        self.__local: dict[str, Future] = {}
+        # s3 path -> path the object was moved to, for the prefetch of the AI
+        # that asks for the file under the path it had in the listing.  Only
+        # while a download is linked to the path, see release_local.
+        self.__moved_to: dict[str, str] = {}
+        self.__temporary_dir: str | None = None
+        self.__downloads: Iterator[int] = itertools.count()
+        # s3 path -> modified time not set yet, see _rename
+        self.__times: dict[str, float] = {}
+
+    def __split(self, path: str) -> tuple[str, str]:
+        """
+        Returns:
+            tuple[str, str]: Bucket and key of the s3:// path
+        """
+        # os.path.join of Windows adds backslashes
+        bucket, _, key = path[len(OBJECT_SCHEME) :].replace("\\", "/").partition("/")
+        return bucket, key
+
+    ############################################################################
+    # listing
+    ############################################################################
+    def is_directory(self, path: str) -> bool:
+        if not is_object_path(path):
+            return super().is_directory(path)
+        bucket, key = self.__split(path)
+        self._round_trip()
+        if not key.strip("/"):
+            try:
+                self.__client.head_bucket(Bucket=bucket)
+                return True
+            except Exception:
+                return False
+        response: dict[str, Any] = self.__client.list_objects_v2(
+            Bucket=bucket, Prefix=key.rstrip("/") + "/", MaxKeys=1
+        )
+        return response.get("KeyCount", 0) > 0
+
+    def _list(
+        self, directory: str, select: Callable[[str], bool] | None
+    ) -> tuple[list[str], list[str]]:
+        if not is_object_path(directory):
+            return super()._list(directory, select)
+
+        bucket, key = self.__split(directory)
+        prefix: str = key.rstrip("/") + "/" if key.strip("/") else ""
+        files: list[str] = []
+        sub_directories: list[str] = []
+        try:
+            for page in self.__client.get_paginator("list_objects_v2").paginate(
+                Bucket=bucket, Prefix=prefix, Delimiter="/"
+            ):
+                self._round_trip()
+                for common_prefix in page.get("CommonPrefixes", ()):
+                    sub_directories.append(
+                        f"{OBJECT_SCHEME}{bucket}/{common_prefix['Prefix'].rstrip('/')}"
+                    )
+                for entry in page.get("Contents", ()):
+                    name: str = entry["Key"][len(prefix) :]
+                    if not name or (select and not select(name)):
+                        continue
+                    files.append(name)
+                    modified: float = entry["LastModified"].timestamp()
+                    self._remember(
+                        f"{OBJECT_SCHEME}{bucket}/{entry['Key']}",
+                        FileStat(entry["Size"], modified, modified),
+                    )
+        except Exception as e:
+            # Like os.walk, a directory that cannot be read is skipped
+            self.__logger.warning("Could not list [%s]. [%s]", directory, e)
+        return files, sub_directories
+
+    ############################################################################
+    # reading
+    ############################################################################
+    def _stat(self, path: str) -> FileStat:
+        if not is_object_path(path):
+            return super()._stat(path)
+        bucket, key = self.__split(path)
+        self._round_trip()
+        try:
+            response: dict[str, Any] = self.__client.head_object(
+                Bucket=bucket, Key=key
+            )
+        except Exception as e:
+            raise FileNotFoundError(f"Could not stat [{path}]. [{e}]") from e
+        modified: float = response["LastModified"].timestamp()
+        mtime: str | None = response.get("Metadata", {}).get(MTIME_METADATA)
+        return FileStat(
+            response["ContentLength"], modified, float(mtime) if mtime else modified
+        )
+
+    def _read(self, path: str, offset: int, size: int | None) -> bytes:
+        if not is_object_path(path):
+            return super()._read(path, offset, size)
+        bucket, key = self.__split(path)
+        self._round_trip()
+        end: str = str(offset + size - 1) if size else ""
+        try:
+            response: dict[str, Any] = self.__client.get_object(
+                Bucket=bucket, Key=key, Range=f"bytes={offset}-{end}"
+            )
+        except self.__client.exceptions.NoSuchKey as e:
+            raise FileNotFoundError(path) from e
+        except Exception as e:
+            # InvalidRange, the offset is past the end of the object
+            if "InvalidRange" in str(e):
+                return b""
+            raise OSError(f"Could not read [{path}]. [{e}]") from e
+        with response["Body"] as body:
+            return body.read()
+
+    def read_exif(self, path: str) -> bytes | str | None:
+        exif: bytes | str | None = super().read_exif(path)
+        if not isinstance(exif, str) or not is_object_path(exif):
+            return exif
+        # piexif cannot open an object, the segments go past the header
+        try:
+            return self._read(path, 0, None)
+        except OSError:
+            # Reported by the processing of the file
+            return None
+
+    def _read_other_exif(self, path: str, header: bytes) -> bytes | str | None:
+        if not is_object_path(path):
+            return super()._read_other_exif(path, header)
+        if header[:2] in (b"II", b"MM") or (
+            header[:4] == b"RIFF" and header[8:12] == b"WEBP"
+        ):
+            # TIFF and WebP keep their EXIF anywhere in the file
+            return header + self._read(path, len(header), None)
+        # piexif only reads JPEG, TIFF and WebP
+        return None
+
+    def get_local_path(self, path: str) -> str:
+        """
+        Download the object once to a temporary file, the AI prefetch
+        threads and the processing may ask for it at the same time.
+        """
+
+        if not is_object_path(path):
+            return path
+        with self.__lock:
+            download: Future | None = self.__local.get(path)
+            owner: bool = download is None
+            if owner:
+                current: str = path
+                while current in self.__moved_to:
+                    current = self.__moved_to[current]
+                # The same download for the path it was moved to
+                download = self.__local[path] = self.__local[current] = Future()
+                if not self.__temporary_dir:
+                    self.__temporary_dir = tempfile.mkdtemp(prefix="image-processor-")
+                filename: str = os.path.join(
+                    self.__temporary_dir,
+                    f"{next(self.__downloads)}_{os.path.basename(current)}",
+                )
+        if owner:
+            if not is_object_path(current):
+                # Moved out of the bucket
+                download.set_result(current)
+                return current
+            bucket, key = self.__split(current)
+            try:
+                self._round_trip()
+                self.__client.download_file(
+                    bucket, key, filename, Config=self.__transfer
+                )
+                download.set_result(filename)
+            except Exception as e:
+                download.set_exception(
+                    FileNotFoundError(f"Could not download [{path}]. [{e}]")
+                )
+        return download.result()
+
+    def write_back(self, path: str) -> None:
+        if not is_object_path(path):
+            super().write_back(path)
+            return
+        with self.__lock:
+            download: Future | None = self.__local.get(path)
+        if download is None:
+            return
+        bucket, key = self.__split(path)
+        self._round_trip()
+        self.__client.upload_file(
+            download.result(), bucket, key, Config=self.__transfer
+        )
+        self._forget(path)
+
+    def release_local(self, path: str) -> None:
+        with self.__lock:
+            download: Future | None = self.__local.pop(path, None)
+            self.__moved_to.pop(path, None)
+            # The moves to this path, no download is linked to them anymore
+            for moved in [
+                moved for moved, target in self.__moved_to.items() if target == path
+            ]:
+                del self.__moved_to[moved]
+        if (
+            download is not None
+            and download.exception() is None
+            and self.__temporary_dir
+            and download.result().startswith(self.__temporary_dir)
+        ):
+            try:
+                os.remove(download.result())
+            except OSError:
+                # Released under another path of the object
+                pass
+
+    ############################################################################
+    # writing
+    ############################################################################
+    def makedirs(self, path: str) -> None:
+        if not is_object_path(path):
+            super().makedirs(path)
+
+    def move(self, path: str, directory: str) -> None:
+        self.__transfer_to(path, directory, move=True)
+
+    def copy(self, path: str, directory: str) -> None:
+        self.__transfer_to(path, directory, move=False)
+
+    def __transfer_to(self, path: str, directory: str, move: bool) -> None:
+        source_object: bool = is_object_path(path)
+        if not source_object and not is_object_path(directory):
+            if move:
+                super().move(path, directory)
+            else:
+                super().copy(path, directory)
+            return
+
+        target: str = f"{directory.rstrip('/')}/{os.path.basename(path)}"
+        self._round_trip()
+        if not source_object:
+            bucket, key = self.__split(target)
+            self.__client.upload_file(path, bucket, key, Config=self.__transfer)
+            if move:
+                os.remove(path)
+                self._forget(path)
+        elif not is_object_path(target):
+            target = os.path.join(directory, os.path.basename(path))
+            self.__client.download_file(
+                *self.__split(path), target, Config=self.__transfer
+            )
+            if move:
+                self.__delete(path)
+        else:
+            self.__copy(path, target)
+            if move:
+                self.__delete(path)
+        if move:
+            self.__moved(path, target)
+
+    def _rename(self, path: str, new_path: str) -> None:
+        if not is_object_path(path):
+            super()._rename(path, new_path)
+            return
+        self._round_trip()
+        try:
+            self.__copy(path, new_path, self.__times.pop(new_path, None))
+            self.__delete(path)
+        except Exception as e:
+            raise OSError(f"Could not rename [{path}]. [{e}]") from e
+        self.__moved(path, new_path)
+
+    def utime(self, path: str, timestamp: float) -> None:
+        if is_object_path(path) and not self._is_time_set(path, timestamp):
+            # Taken by a queued rename to this path, see _rename
+            self.__times[path] = timestamp
+        super().utime(path, timestamp)
+
+    def _utime(self, path: str, timestamp: float) -> None:
+        if not is_object_path(path):
+            super()._utime(path, timestamp)
+            return
+        if self.__times.pop(path, None) is None:
+            # Set by the rename
+            return
+        self._round_trip()
+        try:
+            self.__copy(path, path, timestamp)
+        except Exception as e:
+            raise OSError(f"Could not set the time of [{path}]. [{e}]") from e
+
+    def apply(self, path: str, operation: Callable[[str], None]) -> None:
+        if is_object_path(path):
+            # The operations of a local file, e.g. the Windows creation date
+            self.__logger.debug("Not applying [%s] to object [%s]", operation, path)
+            return
+        super().apply(path, operation)
+
+    def __copy(self, path: str, new_path: str, mtime: float | None = None) -> None:
+        """
+        Copy on the server, in parts for large objects.  With a modified
+        time the metadata is replaced, the headers and the other metadata of
+        the source are kept.
+        """
+
+        bucket, key = self.__split(path)
+        new_bucket, new_key = self.__split(new_path)
+        extra: dict[str, Any] | None = None
+        if mtime is not None:
+            head: dict[str, Any] = self.__client.head_object(Bucket=bucket, Key=key)
+            extra = {name: head[name] for name in COPIED_HEADERS if head.get(name)}
+            extra["Metadata"] = {
+                **head.get("Metadata", {}),
+                MTIME_METADATA: f"{mtime:.3f}",
+            }
+            extra["MetadataDirective"] = "REPLACE"
+        self.__client.copy(
+            {"Bucket": bucket, "Key": key},
+            new_bucket,
+            new_key,
+            ExtraArgs=extra,
+            Config=self.__transfer,
+        )
+
+    def __delete(self, path: str) -> None:
+        bucket, key = self.__split(path)
+        self.__client.delete_object(Bucket=bucket, Key=key)
+        self._forget(path)
+
+    def __moved(self, path: str, new_path: str) -> None:
+        # The local file follows the object, e.g. for the AI description.
+        # Without a download, e.g. without the AI, there is nothing to follow.
+        with self.__lock:
+            download: Future | None = self.__local.get(path)
+            if download is not None:
+                self.__moved_to[path] = new_path
+                self.__local[new_path] = download
+
+    def flush(self) -> None:
+        super().flush()
+        # Every queued operation ran, a time left is the one of a rename or
+        # an operation that failed before it
+        self.__times.clear()
+
+    def close(self) -> None:
+        super().close()
+        with self.__lock:
+            temporary_dir: str | None = self.__temporary_dir
+            self.__temporary_dir = None
+            self.__local.clear()
+            self.__moved_to.clear()
+        if temporary_dir:
+            shutil.rmtree(temporary_dir, ignore_errors=True)
@@ -10,6 +10,8 @@
 import logging, os
 from logging import Logger
 from typing import Generator
+from .file_queue import FileQueue
+from .storage import Storage
 
 
 class ProcessDirectory:
@@ -21,6 +23,14 @@ class ProcessDirectory:
 
     __logger: Logger = logging.getLogger(__name__)
 
+    def __init__(self, storage: Storage | None = None) -> None:
+        """
+        Args:
+            storage (Storage | None): Lists the directories, the local file
+                system by default
+        """
+        self.__storage = storage or Storage()
+
     ############################################################################
     # pre_process_directory
     ############################################################################
@@ -32,8 +42,52 @@ class ProcessDirectory:
         """
 
         self.__logger.debug(f"Root dir [{root_dir}] recurse [{recurse}]")
+        self.__validate_directory(root_dir)
+
+        for root, filename in self.__walk(root_dir, recurse):
+            file_path: str = os.path.join(root, filename)
+            self.__logger.debug(f"Processing file {file_path}")
+            yield file_path
 
-        if not os.path.isdir(root_dir):
+    ############################################################################
+    # build_file_queue
+    ############################################################################
+    def build_file_queue(self, root_dir: str, recurse: bool = True) -> FileQueue:
+        """
+        Given the root directory, collect all of the image files into a
+        compact FileQueue instead of a list of full paths.  The directory
+        and filename from the walk are stored directly, so the full path is
+        never built during the scan.
+        """
+
+        self.__logger.debug(f"Root dir [{root_dir}] recurse [{recurse}]")
+        self.__validate_directory(root_dir)
+
+        file_queue: FileQueue = FileQueue()
+        for root, filename in self.__walk(root_dir, recurse):
+            file_queue.add(root, filename)
+        self.__logger.info(
+            f"File queue for [{root_dir}] has [{len(file_queue)}] files in "
+            f"[{file_queue.get_directory_count()}] directories using "
+            f"[{file_queue.nbytes()}] bytes"
+        )
+        return file_queue
+
+    ############################################################################
+    # __walk
+    ############################################################################
+    def __walk(
+        self, root_dir: str, recurse: bool
+    ) -> Generator[tuple[str, str], None, None]:
+        """
+        Walk the directory and yield the directory and the name of every
+        valid image file.
+        """
+
+        yield from self.__storage.walk(root_dir, recurse, self._is_valid_image)
+
+    def __validate_directory(self, root_dir: str) -> None:
+        if not self.__storage.is_directory(root_dir):
             self.__logger.error(
                 f"The directory provided [{root_dir}] is not a valid directory"
             )
@@ -41,18 +95,6 @@ class ProcessDirectory:
                 f"The directory provided [{root_dir}] is not a valid directory"
             )
 
-        for root, _, files in os.walk(root_dir):
-            for filename in files:
-                if self._is_valid_image(filename):
-                    file_path: str = os.path.join(root, filename)
-                    self.__logger.debug(f"Processing file {file_path}")
-                    yield file_path
-            if not recurse:
-                self.__logger.debug(
-                    f"Only processing first level directory since recursive is {recurse}"
-                )
-                return
-
     ############################################################################
     # _is_valid_image
     ############################################################################
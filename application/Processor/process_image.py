@@ -8,12 +8,20 @@
 """
 
 
-import logging, shutil, datetime, os, re, piexif, sys
+import logging, datetime, os, sys
 from logging import Logger
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 
-from .AIProessor.image_to_text import ImageToText
-from piexif import helper as pi_helper
+from .date_resolver import DateResolver
+from .storage import Storage
+from Helper.cancel_token import CancelToken, Cancelled
+import Helper.lazy_import as lazy_import
+import Helper.log_config as log_config
+import Helper.metrics_endpoint as metrics_endpoint
+import Helper.tracing as tracing
+
+# piexif is only loaded when the first file is processed.
+piexif = lazy_import.lazy_module("piexif")
 
 # Check if the operating system is Windows
 if sys.platform == "win32":
@@ -41,9 +49,24 @@ class ProcessImage:
     __directory: str = None
     __filename: str = None
     __created_date: datetime.datetime = None
+    __date_source: str = None
     __exif_dict: dict[str, Any] = None
     __platform: str = None
     __file_prefix_format: str = "%Y-%m-%d_%H.%M.%S"
+    __date_resolver: DateResolver = DateResolver()
+    # File system calls, see set_storage
+    __storage: Storage = Storage()
+    # Checked at the start of every stage, see set_cancel_token
+    __cancel: CancelToken = None
+    # (date, sub-second, offset) EXIF tags in the order they are checked:
+    # DateTimeOriginal, SubSecTimeOriginal, OffsetTimeOriginal and
+    # DateTimeDigitized, SubSecTimeDigitized, OffsetTimeDigitized.  The
+    # numbers are used so that piexif is not loaded at import time, and
+    # because older piexif releases do not name the offset tags.
+    __exif_date_tags: tuple[tuple[int, int, int], ...] = (
+        (0x9003, 0x9291, 0x9011),
+        (0x9004, 0x9292, 0x9012),
+    )
     __image_to_text = None
 
     ############################################################################
@@ -58,15 +81,151 @@ class ProcessImage:
     def get_original_filepath(self) -> str:
         return self.__original_filepath
 
-    def post_process(self) -> None:
-        self.__image_to_text = ImageToText()
+    def get_created_date(self) -> datetime.datetime:
+        return self.__created_date
+
+    def get_date_source(self) -> str:
+        """
+        Returns:
+            str: Where the created date came from, 'exif', 'sidecar',
+            'filename' or 'file'
+        """
+        return self.__date_source
+
+    def post_process(
+        self,
+        progress: Callable[[str, int], None] | None = None,
+        backends: Iterable[type] | None = None,
+    ) -> None:
+        """
+        Load the AI models.  Takes a long time, so it is called from a
+        background thread.
 
+        Args:
+            progress (Callable[[str, int], None] | None): Receives a message
+                and a percentage while the models are loaded
+            backends (Iterable[type] | None): ImageToTextBase classes to load
+                instead of the default AI models
+        """
+
+        if progress:
+            progress("Importing the AI libraries", 0)
+        # Imported here so that torch and transformers are only loaded when
+        # the AI models are needed.  The metadata-only processes never pay
+        # for them.
+        from .AIProessor.image_to_text import ImageToText
+
+        self.__image_to_text = ImageToText(progress, backends)
+        self.__image_to_text.set_cancel_token(self.__cancel)
+
+    def has_models(self) -> bool:
+        return self.__image_to_text is not None
+
+    def start_prefetch(
+        self,
+        filepaths: Iterable[str],
+        level: int = 0,
+        ocr: bool = False,
+        objects: bool = False,
+    ) -> None:
+        """
+        Let the AI models work on the upcoming files while the current file
+        is processed.  Nothing is done before post_process.
+
+        Args:
+            filepaths (Iterable[str]): Files in the order they are processed
+            level (int): Level of detail of the description
+            ocr (bool): Also read the text in the images
+            objects (bool): Also label the objects in the images
+        """
+
+        from .AIProessor.image_to_text_abstract import ImageTask
+
+        if self.__image_to_text:
+            self.__image_to_text.start_prefetch(
+                self.__get_local_paths(filepaths),
+                level,
+                ImageTask.from_options(ocr, objects),
+            )
+
+    def __get_local_paths(self, filepaths: Iterable[str]) -> Iterator[str]:
+        """
+        The files for the models, an object of a bucket is downloaded by the
+        prefetch threads as they reach it.
+        """
+
+        for filepath in filepaths:
+            try:
+                yield self.__storage.get_local_path(filepath)
+            except OSError as e:
+                self.__logger.warning("Could not prefetch [%s]. [%s]", filepath, e)
+                yield filepath
+
+    def stop_prefetch(self) -> None:
+        if self.__image_to_text:
+            self.__image_to_text.stop_prefetch()
+
+    def get_cache_stats(self) -> dict[str, tuple[int, int]]:
+        """
+        Returns:
+            dict[str, tuple[int, int]]: (hits, misses) of the AI prefetch
+        """
+        if self.__image_to_text:
+            return self.__image_to_text.get_cache_stats()
+        return {}
+
+    def get_queue_depths(self) -> dict[str, int]:
+        if self.__image_to_text:
+            return self.__image_to_text.get_queue_depths()
+        return {}
+
+    def set_cancel_token(self, cancel: CancelToken | None) -> None:
+        """
+        Make every stage a cancellation point of the run: a stage waits
+        there while the run is paused and raises Cancelled once it is
+        cancelled.  The AI models also check it between backends and after
+        every generated token.
+        """
+
+        self.__cancel = cancel
+        if self.__image_to_text:
+            self.__image_to_text.set_cancel_token(cancel)
+
+    def set_storage(self, storage: Storage) -> None:
+        """
+        Make the file system calls through the storage of the run, e.g. a
+        LatencyAwareStorage for a network share.
+        """
+        self.__storage = storage
+
+    def __check_cancel(self) -> None:
+        if self.__cancel:
+            self.__cancel.check()
+
+    def pop_skipped(self) -> dict[str, str]:
+        """
+        Returns:
+            dict[str, str]: Files the AI skipped since the last call, over
+            the pixel budget or the deadline of an image, with the reason
+        """
+        if self.__image_to_text:
+            return self.__image_to_text.pop_skipped()
+        return {}
+
+    @tracing.traced("process_image")
     def init(self, filepath: str) -> None:
+        self.__check_cancel()
+        log_config.trace_file(filepath)
         self.__filepath = filepath
         self.__original_filepath = filepath
         self.__directory, self.__filename = os.path.split(self.__filepath)
         try:
-            self.__exif_dict = piexif.load(self.__filepath)
+            with tracing.span("exif.load", "process_image"):
+                # The file, the EXIF read from its header, or None without EXIF
+                exif: bytes | str | None = self.__storage.read_exif(self.__filepath)
+                if exif is None:
+                    raise ValueError("No EXIF")
+                self.__exif_dict = piexif.load(exif)
         except:
             self.__exif_dict = {
                 "0th": {},
@@ -76,25 +235,36 @@ class ProcessImage:
                 "thumbnail": None,
             }
 
-        self.__created_date = (
-            self._get_date_from_exif()
-            or self._get_date_from_filename()
-            or self._get_date_from_file_created_date()
-        )
+        self.__date_source = "exif"
+        self.__created_date = self._get_date_from_exif()
+        if not self.__created_date:
+            self.__date_source = "sidecar"
+            self.__created_date = self._get_date_from_sidecar()
+        if not self.__created_date:
+            self.__date_source = "filename"
+            self.__created_date = self._get_date_from_filename()
+        if not self.__created_date:
+            self.__date_source = "file"
+            self.__created_date = self._get_date_from_file_created_date()
         self._get_gps_information()
 
-        self.__logger.info(
-            f"Created date for file [{self.__filepath}] => [{self.__created_date}]"
+        self.__logger.debug(
+            "Created date for file [%s] => [%s] from [%s]",
+            self.__filepath,
+            self.__created_date,
+            self.__date_source,
         )
 
     # ===========================================================================
     # process_created_date :: public interface
     # ===========================================================================
+    @tracing.traced("process_image")
     def process_created_date(self) -> tuple[bool, str]:
         """
         Update the create date of the file with the 'date taken' exif date.
         """
 
+        self.__check_cancel()
         try:
             self._rename_file_with_timestamp()
             self._update_create_date_of_file()
@@ -102,26 +272,54 @@ class ProcessImage:
             return True, self.__filepath
         except Exception as e:
             self.__logger.warning(
-                f"Could not process created date for file [{self.__filepath}].  {e}"
+                "Could not process created date for file [%s].  %s", self.__filepath, e
             )
             return False, self.__filepath
 
     # ===========================================================================
     # classify_image_to_text :: public interface
     # ===========================================================================
-    def process_classify_image_to_text(self, level: str) -> tuple[bool, str]:
+    @tracing.traced("process_image")
+    def process_classify_image_to_text(
+        self, level: str, ocr: bool = False, objects: bool = False
+    ) -> tuple[bool, str]:
         """
         Create a description for this image using AI.
 
+        Args:
+            level (str): Level of detail of the description
+            ocr (bool): Also add the text found in the image
+            objects (bool): Also add the labels of the objects in the image
+
         Returns:
             tuple[bool, str]: Status and updated file name e.g., [False, filename]
         """
 
+        from .AIProessor.image_to_text_abstract import ImageDescription, ImageTask
+
+        self.__check_cancel()
         try:
-            # Generate the AI description of the image
-            description: list[str] = self.__image_to_text.process(
-                self.__filepath, level
+            # Generate the AI description of the image, from a local copy of
+            # an object.  The prefetch has it under its original path.
+            local_path: str = self.__storage.get_local_path(self.__filepath)
+            try:
+                prefetch_path: str = self.__storage.get_local_path(
+                    self.__original_filepath
+                )
+            except OSError:
+                # Moved before the prefetch reached it, the prefetch gave
+                # the path itself, see __get_local_paths
+                prefetch_path = self.__original_filepath
+            result: ImageDescription = self.__image_to_text.process(
+                local_path, level, prefetch_path, ImageTask.from_options(ocr, objects)
             )
+            if result.skipped and not result.captions:
+                return False, f"Skipped. {result.skipped}"
+            description: list[str] = list(result.captions)
+            if result.ocr:
+                description.append(f"Text: {result.ocr}")
+            if result.objects:
+                description.append(f"Objects: {', '.join(result.objects)}")
 
             # Get any existing comments
             comment: str = self._get_user_comment_from_exif()
@@ -129,63 +327,93 @@ class ProcessImage:
             # the same comment.
             if comment:
                 filtered_comment = [item for item in description if item not in comment]
-                self.__logger.info(f"Filtered list is [{filtered_comment}]")
+                self.__logger.debug("Filtered list is [%s]", filtered_comment)
                 # filtered_comment.append(comment)
                 description = filtered_comment
 
             description_str: str = ". ".join(description) + "."
-            self.__logger.info(
-                f"Comments for file {[self.__filepath]} is [{description}] string is [{description_str}]"
+            self.__logger.debug(
+                "Comments for file [%s] is [%s] string is [%s]",
+                self.__filepath,
+                description,
+                description_str,
             )
             status: bool = self._write_exif_comment(description_str)
             return status, description_str
+        except Cancelled:
+            raise
         except Exception as e:
             self.__logger.warning(
-                f"Could not process classify image to text for file [{self.__filepath}]. [{e}]"
+                "Could not process classify image to text for file [%s]. [%s]",
+                self.__filepath,
+                e,
             )
             return False, f"Could not classify image [{self.__filepath}]"
+        finally:
+            self.__storage.release_local(self.__filepath)
+            self.__storage.release_local(self.__original_filepath)
 
     # ===========================================================================
     # process_move_image_to_folder :: public interface
     # ===========================================================================
+    @tracing.traced("process_image")
     def process_move_image_to_folder(
         self, move: bool, copy: bool, dest_dir: str, create_month_folder: bool = False
     ) -> tuple[bool, str]:
-        self.__logger.info(
-            f"Move [{move}] | copy [{copy}] file [{self.__filepath}] to [{dest_dir}] - creating month folder [{create_month_folder}]"
+        self.__check_cancel()
+        self.__logger.debug(
+            "Move [%s] | copy [%s] file [%s] to [%s] - creating month folder [%s]",
+            move,
+            copy,
+            self.__filepath,
+            dest_dir,
+            create_month_folder,
         )
 
         try:
             year: int = self.__created_date.year
-            self.__logger.info(f"Creating directory [{year}] within $[{dest_dir}]")
+            self.__logger.debug("Creating directory [%s] within [%s]", year, dest_dir)
             dest_dir_with_date = os.path.join(dest_dir, str(year))
             if create_month_folder:
                 dest_dir_with_date = os.path.join(
                     dest_dir_with_date, self.__created_date.strftime("%m-%B")
                 )
-            os.makedirs(dest_dir_with_date, exist_ok=True)
-            self.__logger.info(
-                f"Created directory with date time [{dest_dir_with_date}]"
+            self.__storage.makedirs(dest_dir_with_date)
+            self.__logger.debug(
+                "Created directory with date time [%s]", dest_dir_with_date
             )
             try:
+                nbytes: int = (
+                    self.__storage.get_size(self.__filepath)
+                    if metrics_endpoint.is_enabled()
+                    else 0
+                )
                 # -- Copy or Move the file --
                 if move:
-                    shutil.move(self.__filepath, dest_dir_with_date)
+                    self.__storage.move(self.__filepath, dest_dir_with_date)
                 else:
-                    shutil.copy2(self.__filepath, dest_dir_with_date)
+                    self.__storage.copy(self.__filepath, dest_dir_with_date)
                 self.__filepath = os.path.join(dest_dir_with_date, self.__filename)
                 self.__directory, self.__filename = os.path.split(self.__filepath)
-                self.__logger.info(f"New filepath is [{self.__filepath}]")
+                self.__logger.debug("New filepath is [%s]", self.__filepath)
+                if metrics_endpoint.is_enabled():
+                    metrics_endpoint.inc(
+                        "bytes_copied_total",
+                        nbytes,
+                        operation="move" if move else "copy",
+                    )
             except FileNotFoundError:
-                self.__logger.warning(f"File [{self.__filepath}] was not found")
+                self.__logger.warning("File [%s] was not found", self.__filepath)
             except Exception as e:
                 self.__logger.warning(
-                    f"Error moving or copying file [{self.__filepath}]. {e}"
+                    "Error moving or copying file [%s]. %s", self.__filepath, e
                 )
             return True, self.__filepath
         except Exception as e:
             self.__logger.warning(
-                f"Could not process move image to folder for file [{self.__filepath}] [{e}]"
+                "Could not process move image to folder for file [%s] [%s]",
+                self.__filepath,
+                e,
             )
             return False, self.__filepath
 
@@ -194,76 +422,79 @@ class ProcessImage:
     ############################################################################
     def _get_date_from_exif(self) -> datetime.datetime | None:
         """
-        Check if the exif for this image has the date.
+        Check if the exif for this image has the date.  The sub-second and
+        the offset tags are applied when the camera wrote them.
 
         Returns:
             datetime.datetime | None: The date from exif
         """
         try:
-            date: str = None
-            date_raw: bytes = self.__exif_dict["Exif"].get(
-                piexif.ExifIFD.DateTimeOriginal
-            ) or self.__exif_dict["Exif"].get(piexif.ExifIFD.DateTimeDigitized)
-            if not date_raw:
-                return None
-            date = date_raw.decode("utf-8")
-            converted: datetime.datetime = self._convert_time(date)
-            self.__logger.info(
-                f"EXIF date from file [{self.__filepath}] => [{date}] converted is [{converted}]"
-            )
-            return converted
+            exif: dict[int, Any] = self.__exif_dict["Exif"]
+            for date_tag, subsec_tag, offset_tag in self.__exif_date_tags:
+                date_raw: bytes = exif.get(date_tag)
+                if not date_raw:
+                    continue
+                converted: datetime.datetime | None = self.__date_resolver.parse(
+                    date_raw, exif.get(subsec_tag), exif.get(offset_tag)
+                )
+                self.__logger.debug(
+                    "EXIF date from file [%s] => [%s] converted is [%s]",
+                    self.__filepath,
+                    date_raw,
+                    converted,
+                )
+                return converted
+            return None
         except Exception as e:
-            self.__logger.info(
-                f"Could not find date from EXIF for file [{self.__filepath}] => [{e}]"
+            self.__logger.debug(
+                "Could not find date from EXIF for file [%s] => [%s]",
+                self.__filepath,
+                e,
             )
             return None
 
+    ############################################################################
+    # _get_date_from_sidecar
+    ############################################################################
+    def _get_date_from_sidecar(self) -> datetime.datetime | None:
+        """
+        The time the photo was taken from a file next to it, such as the JSON
+        of a Google Takeout export, see Storage.get_sidecar_time.
+
+        Returns:
+            datetime.datetime | None: Sidecar datetime
+        """
+
+        timestamp: float | None = self.__storage.get_sidecar_time(self.__filepath)
+        if timestamp is None:
+            return None
+        sidecar_date: datetime.datetime = datetime.datetime.fromtimestamp(timestamp)
+        self.__logger.debug(
+            "Sidecar datetime for file [%s] => [%s]", self.__filepath, sidecar_date
+        )
+        return sidecar_date
+
     ############################################################################
     # _get_date_from_filename
     ############################################################################
     def _get_date_from_filename(self) -> datetime.datetime | None:
         """
-        Check if the name of the file contains the date and time.
+        Check if the name of the file contains the date and time, such as
+        YYYYMMDD_HHMMSS, YYYY-MM-DD_HH-MM-SS, YYYYMMDD or YYYY-MM-DD.
 
         Returns:
             datetime.datetime | None: File datetime
         """
-        # ^      - asserts position at start of the string
-        # \d{4}  - matches exactly four digits (the year)
-        # \d{2}  - matches exactly two digits (the month)
-        # \d{2}  - matches exactly two digits (the day)
-        patterns: list[str] = (
-            r"^(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})",  # YYYYMMDD_HHMMSS
-            r"^(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})",  # YYYY-MM-DD_HH-MM-SS
-            r"^(\d{4})(\d{2})(\d{2})",  # YYYYMMDD
-            r"^(\d{4})-(\d{2})-(\d{2})",  # YYYY-MM-DD
-        )
 
-        for pattern in patterns:
-            match = re.match(pattern, self.__filename)
-            self.__logger.info(
-                f"Checking filename date matches [{pattern}] => [{self.__filepath}]"
-            )
-            if match:
-                if match.lastindex == 6:
-                    year, month, day, hour, min, sec = match.groups()
-                    file_date: datetime.datetime = datetime.datetime(
-                        int(year), int(month), int(day), int(hour), int(min), int(sec)
-                    )
-                    self.__logger.info(
-                        f"Filename Pattern datetime for file [{self.__filepath}] => [{file_date}]"
-                    )
-                    return file_date
-                elif match.lastindex == 3:
-                    year, month, day = match.groups()
-                    file_date: datetime.datetime = datetime.datetime(
-                        int(year), int(month), int(day)
-                    )
-                    self.__logger.info(
-                        f"Filename Pattern datetime for file [{self.__filepath}] => [{file_date}]"
-                    )
-                    return file_date
-        return None
+        file_date: datetime.datetime | None = self.__date_resolver.from_filename(
+            self.__filename
+        )
+        self.__logger.debug(
+            "Filename Pattern datetime for file [%s] => [%s]",
+            self.__filepath,
+            file_date,
+        )
+        return file_date
 
     ############################################################################
     # _get_date_from_file_created_date
@@ -276,21 +507,19 @@ class ProcessImage:
             datetime.datetime: Creation date
         """
 
-        if self.__platform == "Windows":
-            # On Windows, getctime() returns the creation time
-            creation_timestamp = os.path.getctime(self.__filepath)
-        else:
-            # On Unix-based systems (macOS, Linux), we need to use st_birthtime
-            stat_info: os.stat_result = os.stat(self.__filepath)
-            creation_timestamp = stat_info.st_ctime
-        self.__logger.info(
-            f"Creation timestamp for file [{self.__filepath}] is [{creation_timestamp}]"
+        # On Windows, st_ctime is the creation time.  On Unix-based systems
+        # (macOS, Linux) it is the last change of the metadata.
+        creation_timestamp: float = self.__storage.stat(self.__filepath).ctime
+        self.__logger.debug(
+            "Creation timestamp for file [%s] is [%s]",
+            self.__filepath,
+            creation_timestamp,
         )
         creation_time: datetime.datetime = datetime.datetime.fromtimestamp(
             creation_timestamp
         )
-        self.__logger.info(
-            f"Creation datetime for file [{self.__filepath} => [{creation_time}]"
+        self.__logger.debug(
+            "Creation datetime for file [%s] => [%s]", self.__filepath, creation_time
         )
         return creation_time
 
@@ -310,23 +539,12 @@ class ProcessImage:
         if isinstance(timestamp, datetime.datetime):
             return timestamp
 
-        for format in [
-            "%Y:%m:%d %H:%M:%S",
-            "%Y-%m-%d %H:%M:%S",
-            "%Y-%m-%d %H:%M:%S.%f",
-        ]:
-            try:
-                self.__logger.info(
-                    f"Attempting to format timestamp [{timestamp}] with format [{format}]"
-                )
-                return datetime.datetime.strptime(timestamp, format)
-            except Exception as e:
-                self.__logger.info(
-                    f"Could not convert timestamp [{timestamp}] with format [{format}].  Exception [{e}]"
-                )
+        converted: datetime.datetime | None = self.__date_resolver.parse(timestamp)
+        if converted:
+            return converted
         # If we are here, then we could not convert the given date format.
         self.__logger.warning(
-            f"The timestamp provided [{timestamp}] was not successfully converted."
+            "The timestamp provided [%s] was not successfully converted.", timestamp
         )
         raise Exception(
             f"Timestamp [{timestamp}] could not be converted given the formats."
@@ -348,12 +566,13 @@ class ProcessImage:
         new_filename = os.path.join(
             self.__directory, formatted_date + "_" + self.__filename
         )
-        self.__logger.info(f"Filename [{self.__filepath}] => [{new_filename}]")
+        self.__logger.debug("Filename [%s] => [%s]", self.__filepath, new_filename)
         return new_filename
 
     ############################################################################
     # _get_user_comment_from_exif
     ############################################################################
+    @tracing.traced("process_image")
     def _get_user_comment_from_exif(self) -> str | None:
         """
         Get the user comment EXIF tag from the file.
@@ -362,6 +581,8 @@ class ProcessImage:
             str | None: Return the user comment if it exists
         """
 
+        from piexif import helper as pi_helper
+
         try:
             user_comment_raw = self.__exif_dict["Exif"].get(piexif.ExifIFD.UserComment)
 
@@ -369,17 +590,18 @@ class ProcessImage:
                 # Use the piexif helper to correctly decode the comment
 
                 decoded_comment = pi_helper.UserComment.load(user_comment_raw)
-                self.__logger.debug(f"UserComment is [{decoded_comment}]")
+                self.__logger.debug("UserComment is [%s]", decoded_comment)
                 return decoded_comment
             else:
                 return None
         except Exception as e:
-            self.__logger.warning(f"Could not read comment: {e}")
+            self.__logger.warning("Could not read comment: %s", e)
             return None
 
     ############################################################################
     # _write_exif_comment
     ############################################################################
+    @tracing.traced("process_image")
     def _write_exif_comment(self, new_comment: str) -> bool:
         """
         Loads an image, writes a comment to its EXIF data, and saves it to a new file
@@ -391,6 +613,8 @@ class ProcessImage:
             output_path (str): The path to save the modified image.
         """
 
+        from piexif import helper as pi_helper
+
         try:
             encoded_comment = str(new_comment)
             self.__exif_dict["Exif"][piexif.ExifIFD.UserComment] = (
@@ -403,16 +627,18 @@ class ProcessImage:
             # Convert the EXIF dictionary back into bytes
             exif_bytes = piexif.dump(self.__exif_dict)
 
-            # Insert the new EXIF data into the new file, overwriting it.
-            piexif.insert(exif_bytes, self.__filepath)
-            self.__logger.info(f"Successfully wrote comment to '{self.__filepath}'")
+            # Insert the new EXIF data into the new file, overwriting it.  An
+            # object is changed in its local copy and uploaded.
+            piexif.insert(exif_bytes, self.__storage.get_local_path(self.__filepath))
+            self.__storage.write_back(self.__filepath)
+            self.__logger.debug("Successfully wrote comment to [%s]", self.__filepath)
             return True
 
         except FileNotFoundError:
-            self.__logger.warning(f"Error: The file '{self.__filepath}' was not found.")
+            self.__logger.warning("Error: The file [%s] was not found.", self.__filepath)
             return False
         except Exception as e:
-            self.__logger.warning(f"An error occurred: {e}")
+            self.__logger.warning("An error occurred: %s", e)
             return False
 
     def _get_gps_information(self) -> None:
@@ -428,8 +654,8 @@ class ProcessImage:
 
         # Check if the 'GPS' tag exists in the EXIF data
         if piexif.GPSIFD.GPSLatitude not in self.__exif_dict["GPS"]:
-            self.__logger.info(
-                f"GPS information was not found for file [{self.__filename}]"
+            self.__logger.debug(
+                "GPS information was not found for file [%s]", self.__filename
             )
             return None
         # Get the raw GPS data
@@ -442,13 +668,16 @@ class ProcessImage:
         self.__lat_decimal = self._dms_to_decimal(self.__lat_dms, self.__lat_ref)
         self.__lon_decimal = self._dms_to_decimal(self.__lon_dms, self.__lon_ref)
 
-        self.__logger.info(f"Latitude and longitude for file [{self.__filepath}]")
-        self.__logger.info(f"\t\t__lat_dms: [{self.__lat_dms}]")
-        self.__logger.info(f"\t\t__lat_ref: [{self.__lat_ref}]")
-        self.__logger.info(f"\t\t__lon_dms: [{self.__lon_dms}]")
-        self.__logger.info(f"\t\t__lon_ref: [{self.__lon_ref}]")
-        self.__logger.info(f"\t\t__lat_decimal: [{self.__lat_decimal}]")
-        self.__logger.info(f"\t\t__lon_decimal: [{self.__lon_decimal}]")
+        self.__logger.debug(
+            "Latitude and longitude for file [%s] lat [%s %s] lon [%s %s] => [%s, %s]",
+            self.__filepath,
+            self.__lat_dms,
+            self.__lat_ref,
+            self.__lon_dms,
+            self.__lon_ref,
+            self.__lat_decimal,
+            self.__lon_decimal,
+        )
 
     def _dms_to_decimal(self, dms, ref):
         degrees = dms[0][0] / dms[0][1]
@@ -465,6 +694,7 @@ class ProcessImage:
     ############################################################################
     # _rename_file_with_timestamp
     ############################################################################
+    @tracing.traced("process_image")
     def _rename_file_with_timestamp(self) -> None:
         """
         Get the date from exif tag and prefix the filename with this date.
@@ -476,20 +706,21 @@ class ProcessImage:
         self._remove_datetime_prefix_from_filename()
         formatted_date: str = self.__created_date.strftime(self.__file_prefix_format)
         new_filename: str = self._create_new_filename(formatted_date)
-        self.__logger.info(f"Renaming file [{self.__filepath}] -> [{new_filename}]")
-        os.rename(self.__filepath, new_filename)
+        self.__logger.debug("Renaming file [%s] -> [%s]", self.__filepath, new_filename)
+        self.__storage.rename(self.__filepath, new_filename)
         self.__filepath = new_filename
 
     ############################################################################
     # _update_create_date_of_file
     ############################################################################
+    @tracing.traced("process_image")
     def _update_create_date_of_file(self) -> None:
         """
         Update the access and modified times with the provided time.
         """
 
-        self.__logger.info(
-            f"Updating file {[self.__filepath]} with date [{self.__created_date}]"
+        self.__logger.debug(
+            "Updating file [%s] with date [%s]", self.__filepath, self.__created_date
         )
 
         # Convert the datetime object to a Unix timestamp (seconds since epoch)
@@ -497,71 +728,51 @@ class ProcessImage:
 
         # os.utime takes a tuple of (atime, mtime)
         # atime = access time, mtime = modification time
-        self.__logger.info(
-            f"Updating timestamp for file [{self.__filepath}] ({timestamp})"
+        self.__logger.debug(
+            "Updating timestamp for file [%s] (%s)", self.__filepath, timestamp
         )
-        os.utime(self.__filepath, (timestamp, timestamp))
+        self.__storage.utime(self.__filepath, timestamp)
 
     def _update_create_date_of_file_windows(self) -> None:
-        self.__logger.info("Windows updating creation date")
         if sys.platform == "win32":
+            self.__logger.debug("Windows updating creation date")
             # Convert the Python datetime into a pywintypes TIME object
             pywin_create_date = pywintypes.Time(self.__created_date)
 
-            # Get a "handle" to the file to perform operations on it
-            file_handle = win32file.CreateFile(
-                self.__filepath,
-                win32con.GENERIC_WRITE,
-                win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE,
-                None,
-                win32con.OPEN_EXISTING,
-                win32con.FILE_ATTRIBUTE_NORMAL,
-                None,
-            )
+            def set_creation_time(filepath: str) -> None:
+                # Get a "handle" to the file to perform operations on it
+                file_handle = win32file.CreateFile(
+                    filepath,
+                    win32con.GENERIC_WRITE,
+                    win32con.FILE_SHARE_READ | win32con.FILE_SHARE_WRITE,
+                    None,
+                    win32con.OPEN_EXISTING,
+                    win32con.FILE_ATTRIBUTE_NORMAL,
+                    None,
+                )
 
-            # Set the file's time (creation, access, modification)
-            # We pass the new time for the first argument (creation time)
-            # and None for the others to leave them unchanged.
-            win32file.SetFileTime(file_handle, pywin_create_date, None, None)
+                # Set the file's time (creation, access, modification)
+                # We pass the new time for the first argument (creation time)
+                # and None for the others to leave them unchanged.
+                win32file.SetFileTime(file_handle, pywin_create_date, None, None)
 
-            # Close the handle to release the file
-            file_handle.close()
-            self.__logger.info(
-                f"Windows creation time has been update for [{self.__filepath}]"
-            )
+                # Close the handle to release the file
+                file_handle.close()
+                self.__logger.debug(
+                    "Windows creation time has been update for [%s]", filepath
+                )
+
+            # Queued after the rename by a network storage
+            self.__storage.apply(self.__filepath, set_creation_time)
 
     def _remove_datetime_prefix_from_filename(self) -> None:
         """
-        Removes a date and/or time prefix from a filename string.
-
-        Args:
-            filename (str): The original filename.
+        Removes a date and/or time prefix from the filename, such as
+        YYYY-MM-DD HH-MM-SS, YYYY_MM_DD, YYYYMMDDHHMMSS or YYYYMMDD.
+        """
 
-        Returns:
-            str: The filename with the datetime prefix removed.
-        """
-        # A list of regex patterns to match various date/time formats at the start of a string.
-        # You can add more patterns to this list to suit your needs.
-        datetime_patterns = [
-            # Matches YYYY-MM-DD HH-MM-SS, YYYY_MM_DD-HH.MM, etc.
-            r"\d{4}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\. ]?\d{1,2}[-_\.: ]?\d{1,2}[-_\.: ]?\d{1,2}",
-            # Matches YYYY-MM-DD, YYYY_MM_DD, YYYY.MM.DD
-            r"\d{4}[-_\.]\d{1,2}[-_\.]\d{1,2}",
-            # Matches YYYYMMDDHHMMSS
-            r"\d{14}",
-            # Matches YYYYMMDD
-            r"\d{8}",
-        ]
-
-        # Combine all patterns into a single regex, joined by '|' (OR).
-        # ^                  - Anchors the search to the beginning of the string.
-        # (...)              - A capturing group for all our patterns.
-        # \s*[-_]?\s* - Matches any space, hyphen, or underscore after the date/time.
-        combined_pattern = re.compile(
-            r"^(" + "|".join(datetime_patterns) + r")\s*[-_]?\s*"
+        cleaned_filename: str = self.__date_resolver.strip_prefix(self.__filename)
+        self.__logger.debug(
+            "Cleaning file [%s] to [%s]", self.__filename, cleaned_filename
         )
-
-        # Use re.sub() to replace the matched pattern with an empty string.
-        cleaned_filename = combined_pattern.sub("", self.__filename)
-        self.__logger.info(f"Cleaning file [{self.__filename}] to [{cleaned_filename}]")
         self.__filename = cleaned_filename
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   run_metrics.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Rolling metrics of a processing run: files and bytes per second
+             over the last minute, the time left, the p50/p95 latency of
+             every stage over its recent files, the cache hit rates, the
+             errors and the depth of the prefetch queues.  The worker thread
+             records and the window reads a snapshot at its own pace, so
+             every method is thread safe.  Everything recorded is also fed
+             to the Prometheus endpoint, see Helper/metrics_endpoint.py, and
+             the stages are measured by the memory profile when it is on.
+"""
+
+import bisect, contextlib, threading, time
+from collections import deque
+from typing import Callable, Iterator, NamedTuple
+import Helper.memory_profile as memory_profile
+import Helper.metrics_endpoint as metrics_endpoint
+
+
+class StageLatency(NamedTuple):
+    count: int
+    p50: float
+    p95: float
+
+
+class MetricsSnapshot(NamedTuple):
+    """
+    The metrics at one point in time, the latencies are in seconds.
+    """
+
+    elapsed: float
+    files_done: int
+    total_files: int
+    bytes_done: int
+    files_per_second: float
+    bytes_per_second: float
+    eta_seconds: float | None
+    stages: dict[str, StageLatency]
+    cache_hit_rates: dict[str, float]
+    errors: dict[str, int]
+    queue_depths: dict[str, int]
+
+
+class RunMetrics:
+    """
+    # Run Metrics
+
+    The rates are computed over a sliding window of the last completed
+    files so that they follow the current speed of the run rather than its
+    average since the start.  The latency of each stage is kept for its
+    last 'samples' calls in a sorted list, so a percentile is a lookup.
+    """
+
+    def __init__(
+        self,
+        total_files: int,
+        window: float = 60.0,
+        samples: int = 512,
+        cache_stats: Callable[[], dict[str, tuple[int, int]]] | None = None,
+        queue_depths: Callable[[], dict[str, int]] | None = None,
+    ) -> None:
+        """
+        Args:
+            total_files (int): Number of files of the run
+            window (float): Seconds of the sliding window of the rates
+            samples (int): Latencies kept per stage
+            cache_stats (Callable | None): Returns (hits, misses) by cache,
+                read on every snapshot
+            queue_depths (Callable | None): Returns the depth of each queue,
+                read on every snapshot
+        """
+
+        self.__total_files = total_files
+        self.__window = window
+        self.__samples = samples
+        self.__cache_stats = cache_stats
+        self.__queue_depths = queue_depths
+
+        self.__lock: threading.Lock = threading.Lock()
+        self.__start: float = time.perf_counter()
+        self.__window_start: float = self.__start
+        self.__files_done: int = 0
+        self.__bytes_done: int = 0
+        # (time, bytes) of the files completed since window start
+        self.__recent: deque[tuple[float, int]] = deque()
+        # Latencies of each stage in call order and sorted
+        self.__latencies: dict[str, deque[float]] = {}
+        self.__sorted: dict[str, list[float]] = {}
+        self.__stage_counts: dict[str, int] = {}
+        self.__errors: dict[str, int] = {}
+        metrics_endpoint.set_gauge("run_files", total_files)
+
+    ############################################################################
+    # recording
+    ############################################################################
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        try:
+            with memory_profile.stage(name):
+                yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self.__lock:
+            latencies: deque[float] | None = self.__latencies.get(name)
+            if latencies is None:
+                latencies = self.__latencies[name] = deque()
+                self.__sorted[name] = []
+            ordered: list[float] = self.__sorted[name]
+            if len(latencies) == self.__samples:
+                ordered.pop(bisect.bisect_left(ordered, latencies.popleft()))
+            latencies.append(seconds)
+            bisect.insort(ordered, seconds)
+            self.__stage_counts[name] = self.__stage_counts.get(name, 0) + 1
+        metrics_endpoint.inc("files_total", stage=name)
+        metrics_endpoint.observe("stage_seconds", seconds, stage=name)
+
+    def add_files(self, count: int) -> None:
+        """
+        More files for the run, e.g. the new files of a watched folder.
+        """
+        with self.__lock:
+            self.__total_files += count
+            total_files: int = self.__total_files
+        metrics_endpoint.set_gauge("run_files", total_files)
+
+    def record_error(self, name: str) -> None:
+        with self.__lock:
+            self.__errors[name] = self.__errors.get(name, 0) + 1
+        metrics_endpoint.inc("errors_total", stage=name)
+
+    def file_done(self, nbytes: int) -> None:
+        now: float = time.perf_counter()
+        with self.__lock:
+            self.__files_done += 1
+            self.__bytes_done += nbytes
+            self.__recent.append((now, nbytes))
+            self.__expire(now)
+        metrics_endpoint.inc("files_done_total")
+        metrics_endpoint.inc("bytes_read_total", nbytes)
+        memory_profile.file_done()
+
+    def __expire(self, now: float) -> None:
+        # The files completed after window start are the ones in recent.  The
+        # last file is kept so that a slow run still has a rate.
+        while len(self.__recent) > 1 and now - self.__recent[0][0] > self.__window:
+            self.__window_start = self.__recent.popleft()[0]
+
+    ############################################################################
+    # snapshot
+    ############################################################################
+    def snapshot(self) -> MetricsSnapshot:
+        now: float = time.perf_counter()
+        with self.__lock:
+            self.__expire(now)
+            elapsed: float = now - self.__start
+            span: float = max(now - self.__window_start, 1e-6)
+            files_per_second: float = len(self.__recent) / span
+            bytes_per_second: float = sum(nbytes for _, nbytes in self.__recent) / span
+            remaining: int = max(self.__total_files - self.__files_done, 0)
+            eta: float | None = (
+                remaining / files_per_second if files_per_second else None
+            )
+            stages: dict[str, StageLatency] = {
+                name: StageLatency(
+                    self.__stage_counts[name],
+                    ordered[int(0.5 * (len(ordered) - 1))],
+                    ordered[int(0.95 * (len(ordered) - 1))],
+                )
+                for name, ordered in self.__sorted.items()
+            }
+            rval: MetricsSnapshot = MetricsSnapshot(
+                elapsed=elapsed,
+                files_done=self.__files_done,
+                total_files=self.__total_files,
+                bytes_done=self.__bytes_done,
+                files_per_second=files_per_second,
+                bytes_per_second=bytes_per_second,
+                eta_seconds=eta,
+                stages=stages,
+                cache_hit_rates={},
+                errors=dict(self.__errors),
+                queue_depths={},
+            )
+
+        # The probes take their own locks, they are called without this one
+        if self.__cache_stats:
+            for name, (hits, misses) in self.__cache_stats().items():
+                if hits + misses:
+                    rval.cache_hit_rates[name] = hits / (hits + misses)
+        if self.__queue_depths:
+            rval.queue_depths.update(self.__queue_depths())
+        return rval
+
+
+############################################################################
+# format_snapshot
+############################################################################
+def format_snapshot(snapshot: MetricsSnapshot) -> list[str]:
+    """
+    Returns:
+        list[str]: The metrics as a few lines of text, used by the window
+        and for the summary in the log
+    """
+
+    eta: str = (
+        format_duration(snapshot.eta_seconds)
+        if snapshot.eta_seconds is not None
+        else "-"
+    )
+    lines: list[str] = [
+        f"{snapshot.files_done}/{snapshot.total_files} files in "
+        f"{format_duration(snapshot.elapsed)}, "
+        f"{snapshot.files_per_second:.2f} files/s, "
+        f"{snapshot.bytes_per_second / 1024**2:.2f} MB/s, ETA {eta}"
+    ]
+    if snapshot.stages:
+        lines.append(
+            "Stages p50/p95: "
+            + ", ".join(
+                f"{name} {latency.p50 * 1000:.0f}/{latency.p95 * 1000:.0f} ms"
+                for name, latency in snapshot.stages.items()
+            )
+        )
+    details: list[str] = []
+    if snapshot.cache_hit_rates:
+        details.append(
+            "Cache hits "
+            + ", ".join(
+                f"{name} {rate:.0%}" for name, rate in snapshot.cache_hit_rates.items()
+            )
+        )
+    if snapshot.queue_depths:
+        details.append(
+            "Queues "
+            + ", ".join(
+                f"{name} {depth}" for name, depth in snapshot.queue_depths.items()
+            )
+        )
+    details.append(
+        "Errors "
+        + (
+            ", ".join(f"{name} {count}" for name, count in snapshot.errors.items())
+            if snapshot.errors
+            else "0"
+        )
+    )
+    lines.append(" | ".join(details))
+    return lines
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours:02d}h{minutes:02d}m"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
@@ -0,0 +1,613 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   storage.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   File system calls of ProcessDirectory and ProcessImage.  Storage
+             makes every call directly, as it is asked, which suits a local
+             disk.  LatencyAwareStorage is for directories on a NAS or an SMB
+             share, where every call is a network round trip: the listings,
+             the EXIF headers and the renames are done several at a time so
+             that the round trips overlap, and the calls that the listing
+             already answered are not made again.
+
+             IMAGE_PROCESSOR_STORAGE_DEPTH    - round trips in flight of the
+                                                network storage, default 16
+             IMAGE_PROCESSOR_STORAGE_LATENCY  - milliseconds added to every
+                                                round trip, to measure the
+                                                storages on a local disk
+"""
+
+import logging, os, shutil, threading, time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from logging import Logger
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+DEPTH_ENV: str = "IMAGE_PROCESSOR_STORAGE_DEPTH"
+LATENCY_ENV: str = "IMAGE_PROCESSOR_STORAGE_LATENCY"
+# Bytes read for the EXIF of a JPEG.  The APP1 segment is at most 64 KiB
+# and only follows the APP0 segment, a longer segment is read in a second
+# round trip.
+HEADER_BYTES: int = 80 * 1024
+OBJECT_SCHEME: str = "s3://"
+ARCHIVE_SUFFIXES: tuple[str, ...] = (
+    ".zip",
+    ".tar",
+    ".tar.gz",
+    ".tgz",
+    ".tar.bz2",
+    ".tbz2",
+    ".tar.xz",
+    ".txz",
+)
+
+
+class FileStat(NamedTuple):
+    size: int
+    ctime: float
+    mtime: float
+
+
+def is_object_path(path: str) -> bool:
+    """
+    Returns:
+        bool: The path is an object of a bucket, s3://bucket/key
+    """
+    return path.startswith(OBJECT_SCHEME)
+
+
+def is_archive(path: str) -> bool:
+    """
+    Returns:
+        bool: The path is a zip or a tar archive, e.g. a Google Takeout export
+    """
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+
+def get_storage(network: bool = False, paths: Iterable[str] = ()) -> "Storage":
+    """
+    Args:
+        network (bool): The directories are on a NAS or an SMB share
+        paths (Iterable[str]): Source and destination of the run, an
+            archive needs the ArchiveStorage and an s3:// path needs the
+            ObjectStorage
+
+    Returns:
+        Storage: The storage configured by the environment variables
+    """
+
+    latency: float = float(os.environ.get(LATENCY_ENV) or 0) / 1000
+    depth: int = int(os.environ.get(DEPTH_ENV) or 16)
+    paths = [path for path in paths if path]
+    archive: str | None = next((path for path in paths if is_archive(path)), None)
+    if archive:
+        # Imported here, the module imports this one
+        from .archive_storage import ArchiveStorage
+
+        return ArchiveStorage(archive, depth, latency)
+    if any(is_object_path(path) for path in paths):
+        # Imported here, boto3 is only needed for buckets
+        from .object_storage import ObjectStorage
+
+        return ObjectStorage(depth, latency)
+    if not network:
+        return Storage(latency)
+    return LatencyAwareStorage(depth, latency)
+
+
+class Storage:
+    """
+    # Storage
+
+    The local file system, each call is made when it is asked.  Every round
+    trip goes through the underscore methods, so that the latency given to
+    the constructor is added to each of them.  It is a shim to compare the
+    storages of a network share on a local disk.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        Args:
+            latency (float): Seconds added to every round trip
+        """
+        self._latency: float = latency
+
+    ############################################################################
+    # listing
+    ############################################################################
+    def is_directory(self, path: str) -> bool:
+        self._round_trip()
+        return os.path.isdir(path)
+
+    def walk(
+        self,
+        root: str,
+        recurse: bool = True,
+        select: Callable[[str], bool] | None = None,
+    ) -> Iterator[tuple[str, str]]:
+        """
+        Walk the directories in the order of os.walk, top down.
+
+        Args:
+            root (str): Directory to walk
+            recurse (bool): Also walk the sub-directories
+            select (Callable[[str], bool] | None): Keeps a file by its name
+
+        Yields:
+            tuple[str, str]: Directory and name of each selected file
+        """
+
+        directories: list[str] = [root]
+        while directories:
+            directory: str = directories.pop()
+            files, sub_directories = self._list(directory, select)
+            for filename in files:
+                yield directory, filename
+            if not recurse:
+                return
+            directories.extend(reversed(sub_directories))
+
+    def _list(
+        self, directory: str, select: Callable[[str], bool] | None
+    ) -> tuple[list[str], list[str]]:
+        """
+        Returns:
+            tuple[list[str], list[str]]: Names of the selected files and
+            paths of the sub-directories, the links are not followed
+        """
+
+        try:
+            entries: list[os.DirEntry] = self._scandir(directory)
+        except OSError as e:
+            # Like os.walk, a directory that cannot be read is skipped
+            self.__logger.warning("Could not list directory [%s]. [%s]", directory, e)
+            return [], []
+
+        files: list[str] = []
+        sub_directories: list[str] = []
+        for entry in entries:
+            try:
+                is_directory: bool = entry.is_dir()
+            except OSError:
+                is_directory = False
+            if is_directory:
+                if not entry.is_symlink():
+                    sub_directories.append(entry.path)
+            elif select is None or select(entry.name):
+                files.append(entry.name)
+                self._found(entry)
+        return files, sub_directories
+
+    def _found(self, entry: os.DirEntry) -> None:
+        """
+        Called with every selected file of a listing.
+        """
+
+    ############################################################################
+    # reading
+    ############################################################################
+    def stat(self, path: str) -> FileStat:
+        return self._stat(path)
+
+    def get_size(self, path: str) -> int:
+        try:
+            return self.stat(path).size
+        except OSError:
+            return 0
+
+    def read_exif(self, path: str) -> bytes | str | None:
+        """
+        Returns:
+            bytes | str | None: What piexif.load reads the EXIF from, here the
+            path so that piexif reads the file itself
+        """
+        # The reads of piexif count as one round trip
+        self._round_trip()
+        return path
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        """
+        The files are about to be processed in this order.
+        """
+
+    def get_sidecar_time(self, path: str) -> float | None:
+        """
+        Returns:
+            float | None: Time the photo was taken according to a file next
+            to it, such as the JSON of Google Takeout, None if unknown
+        """
+        return None
+
+    def supports_processes(self) -> bool:
+        """
+        Returns:
+            bool: The processes of the MetadataPool can each open the files
+            with a storage of their own
+        """
+        return True
+
+    def get_local_path(self, path: str) -> str:
+        """
+        Returns:
+            str: A local file with the content of the file, for the readers
+            that need the whole file such as the AI models
+        """
+        return path
+
+    def write_back(self, path: str) -> None:
+        """
+        The local file of get_local_path was changed, store it as the file.
+        """
+
+    def release_local(self, path: str) -> None:
+        """
+        The local file of get_local_path is not needed anymore.
+        """
+
+    ############################################################################
+    # writing
+    ############################################################################
+    def makedirs(self, path: str) -> None:
+        self._round_trip()
+        os.makedirs(path, exist_ok=True)
+
+    def move(self, path: str, directory: str) -> None:
+        self._round_trip()
+        shutil.move(path, directory)
+
+    def copy(self, path: str, directory: str) -> None:
+        self._round_trip()
+        shutil.copy2(path, directory)
+
+    def rename(self, path: str, new_path: str) -> None:
+        self._rename(path, new_path)
+
+    def utime(self, path: str, timestamp: float) -> None:
+        """
+        Set the access and the modified times of the file.
+        """
+        self._utime(path, timestamp)
+
+    def apply(self, path: str, operation: Callable[[str], None]) -> None:
+        """
+        Run an operation of the file, e.g. setting the Windows creation date.
+        """
+        self._round_trip()
+        operation(path)
+
+    def flush(self) -> None:
+        """
+        Wait for the changes that were queued.
+        """
+
+    def close(self) -> None:
+        self.flush()
+
+    ############################################################################
+    # round trips
+    ############################################################################
+    def _round_trip(self) -> None:
+        if self._latency:
+            time.sleep(self._latency)
+
+    def _scandir(self, directory: str) -> list[os.DirEntry]:
+        self._round_trip()
+        with os.scandir(directory) as entries:
+            return list(entries)
+
+    def _stat(self, path: str) -> FileStat:
+        self._round_trip()
+        stat: os.stat_result = os.stat(path)
+        return FileStat(stat.st_size, stat.st_ctime, stat.st_mtime)
+
+    def _read(self, path: str, offset: int, size: int) -> bytes:
+        self._round_trip()
+        with open(path, "rb") as file:
+            file.seek(offset)
+            return file.read(size)
+
+    def _rename(self, path: str, new_path: str) -> None:
+        self._round_trip()
+        os.rename(path, new_path)
+
+    def _utime(self, path: str, timestamp: float) -> None:
+        self._round_trip()
+        os.utime(path, (timestamp, timestamp))
+
+
+class LatencyAwareStorage(Storage):
+    """
+    # Latency Aware Storage
+
+    For directories where each call is a network round trip.  Up to 'depth'
+    round trips are in flight on a thread pool:
+
+     - the sub-directories are listed concurrently, the files still come in
+       the order of os.walk.  The stat of each file comes with its listing
+       (DirEntry) and is kept for the date and the size of the file.
+     - the EXIF of the next files given to prefetch is read ahead, only the
+       header bytes of a JPEG.
+     - makedirs is called once per directory.
+     - the renames, utimes and other operations of a file are queued and
+       applied in order, one file per task, once the run moves on to the
+       next directory or at flush.  A rename to the same name and a utime
+       to the modified time the file already has are skipped.
+
+    A queued operation that fails is logged, the file was already reported
+    as done.  The kept stats take about 100 bytes per file until close.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, depth: int = 16, latency: float = 0.0, batch: int = 64) -> None:
+        """
+        Args:
+            depth (int): Round trips in flight
+            latency (float): Seconds added to every round trip
+            batch (int): Files with queued operations applied at once, even
+                within a directory
+        """
+
+        super().__init__(latency)
+        self.__depth: int = max(1, depth)
+        self.__batch: int = max(1, batch)
+        self.__lock: threading.Lock = threading.Lock()
+        self.__executor: ThreadPoolExecutor = None
+        self.__stats: dict[str, FileStat] = {}
+        self.__directories: set[str] = set()
+        # (path, EXIF future) of the files read ahead, in processing order
+        self.__headers: deque[tuple[str, Future]] = deque()
+        self.__upcoming: Iterator[str] = iter(())
+        # Current path of a file -> (path it had in the listing, operations)
+        self.__queued: dict[str, tuple[str, list[Callable[[], None]]]] = {}
+        self.__queued_directory: str | None = None
+        self.__applying: list[Future] = []
+
+    def get_depth(self) -> int:
+        return self.__depth
+
+    def __get_executor(self) -> ThreadPoolExecutor:
+        with self.__lock:
+            if not self.__executor:
+                self.__executor = ThreadPoolExecutor(
+                    max_workers=self.__depth, thread_name_prefix="storage"
+                )
+            return self.__executor
+
+    ############################################################################
+    # listing
+    ############################################################################
+    def walk(
+        self,
+        root: str,
+        recurse: bool = True,
+        select: Callable[[str], bool] | None = None,
+    ) -> Iterator[tuple[str, str]]:
+        if not recurse:
+            yield from super().walk(root, recurse, select)
+            return
+
+        executor: ThreadPoolExecutor = self.__get_executor()
+        # Every sub-directory is listed as soon as its parent is, the stack
+        # keeps the order of os.walk.
+        directories: list[tuple[str, Future]] = [
+            (root, executor.submit(self._list, root, select))
+        ]
+        while directories:
+            directory, listing = directories.pop()
+            files, sub_directories = listing.result()
+            directories.extend(
+                (sub_directory, executor.submit(self._list, sub_directory, select))
+                for sub_directory in reversed(sub_directories)
+            )
+            for filename in files:
+                yield directory, filename
+
+    def _found(self, entry: os.DirEntry) -> None:
+        try:
+            # Part of the listing on Windows, cached by the SMB client
+            # elsewhere
+            stat: os.stat_result = entry.stat()
+        except OSError:
+            return
+        self._remember(entry.path, FileStat(stat.st_size, stat.st_ctime, stat.st_mtime))
+
+    def _remember(self, path: str, stat: FileStat) -> None:
+        """
+        Keep the stat of a file that came with its listing.
+        """
+        self.__stats[path] = stat
+
+    def _forget(self, path: str) -> None:
+        self.__stats.pop(path, None)
+
+    def write_back(self, path: str) -> None:
+        super().write_back(path)
+        # Rewritten in place, e.g. the EXIF comment, the listed modified time
+        # is not the one of the file anymore, see _is_time_set
+        self._forget(path)
+
+    ############################################################################
+    # reading
+    ############################################################################
+    def stat(self, path: str) -> FileStat:
+        stat: FileStat | None = self.__stats.get(path)
+        return stat if stat else super().stat(path)
+
+    def prefetch(self, paths: Iterable[str]) -> None:
+        with self.__lock:
+            self.__headers.clear()
+            self.__upcoming = iter(paths)
+        self.__read_ahead()
+
+    def read_exif(self, path: str) -> bytes | str | None:
+        """
+        Returns:
+            bytes | str | None: The EXIF segment of a JPEG, None when it has
+            none, the path for the other formats
+        """
+
+        with self.__lock:
+            index: int = next(
+                (i for i, (queued, _) in enumerate(self.__headers) if queued == path),
+                -1,
+            )
+            # The files before it are not processed anymore
+            for _ in range(index):
+                self.__headers.popleft()
+            header: Future | None = self.__headers.popleft()[1] if index >= 0 else None
+        if header is None:
+            return self._read_exif(path)
+        self.__read_ahead()
+        return header.result()
+
+    def __read_ahead(self) -> None:
+        executor: ThreadPoolExecutor = self.__get_executor()
+        with self.__lock:
+            while len(self.__headers) < self.__depth:
+                path: str | None = next(self.__upcoming, None)
+                if path is None:
+                    return
+                self.__headers.append((path, executor.submit(self._read_exif, path)))
+
+    def _read_exif(self, path: str) -> bytes | str | None:
+        """
+        Read the EXIF segment of a JPEG from its header.
+        """
+
+        try:
+            data: bytes = self._read(path, 0, HEADER_BYTES)
+        except OSError:
+            # Reported by the processing of the file
+            return path
+        if data[:2] != b"\xff\xd8":
+            return self._read_other_exif(path, data)
+
+        head: int = 2
+        while head + 4 <= len(data):
+            marker: bytes = data[head : head + 2]
+            if marker[0] != 0xFF or marker == b"\xff\xda":
+                # Start of the image data, there is no EXIF
+                return None
+            end: int = head + 2 + int.from_bytes(data[head + 2 : head + 4], "big")
+            if marker == b"\xff\xe1" and data[head + 4 : head + 10] == b"Exif\x00\x00":
+                if end > len(data):
+                    data += self._read(path, len(data), end - len(data))
+                # piexif takes the segment without its marker and length
+                return data[head + 4 : end]
+            head = end
+        # The segments go past the header
+        return path
+
+    def _read_other_exif(self, path: str, header: bytes) -> bytes | str | None:
+        """
+        Args:
+            header (bytes): First bytes of a file that is not a JPEG
+
+        Returns:
+            bytes | str | None: Here the path, piexif reads the file itself
+        """
+        return path
+
+    ############################################################################
+    # writing
+    ############################################################################
+    def makedirs(self, path: str) -> None:
+        if path in self.__directories:
+            return
+        super().makedirs(path)
+        self.__directories.add(path)
+
+    def move(self, path: str, directory: str) -> None:
+        super().move(path, directory)
+        self._forget(path)
+
+    def rename(self, path: str, new_path: str) -> None:
+        if path == new_path:
+            return
+        self.__queue(path, lambda: self._rename(path, new_path), new_path)
+
+    def utime(self, path: str, timestamp: float) -> None:
+        if self._is_time_set(path, timestamp):
+            return
+        self.__queue(path, lambda: self._utime(path, timestamp))
+
+    def _is_time_set(self, path: str, timestamp: float) -> bool:
+        """
+        Returns:
+            bool: True when the listing already has this modified time, utime
+            then queues nothing
+        """
+
+        with self.__lock:
+            original: str = self.__queued.get(path, (path, None))[0]
+        stat: FileStat | None = self.__stats.get(original)
+        return bool(stat and stat.mtime == timestamp)
+
+    def apply(self, path: str, operation: Callable[[str], None]) -> None:
+        self.__queue(path, lambda: operation(path))
+
+    def __queue(
+        self, path: str, operation: Callable[[], None], new_path: str | None = None
+    ) -> None:
+        directory: str = os.path.dirname(path)
+        with self.__lock:
+            switched: bool = bool(self.__queued) and (
+                directory != self.__queued_directory
+                or len(self.__queued) >= self.__batch
+            )
+        if switched:
+            self.__apply_queued()
+        with self.__lock:
+            original, operations = self.__queued.pop(path, (path, []))
+            operations.append(operation)
+            self.__queued[new_path or path] = (original, operations)
+            self.__queued_directory = directory
+
+    def __apply_queued(self) -> None:
+        executor: ThreadPoolExecutor = self.__get_executor()
+        with self.__lock:
+            queued: list[tuple[str, list[Callable[[], None]]]] = list(
+                self.__queued.items()
+            )
+            self.__queued.clear()
+            self.__applying = [
+                future for future in self.__applying if not future.done()
+            ]
+            self.__applying += [
+                executor.submit(self.__run, path, operations)
+                for path, (_, operations) in queued
+            ]
+
+    def __run(self, path: str, operations: list[Callable[[], None]]) -> None:
+        for operation in operations:
+            try:
+                operation()
+            except OSError as e:
+                # The next operations depend on this one
+                self.__logger.warning("Could not update file [%s]. [%s]", path, e)
+                return
+
+    def flush(self) -> None:
+        self.__apply_queued()
+        with self.__lock:
+            applying: list[Future] = self.__applying
+            self.__applying = []
+        wait(applying)
+
+    def close(self) -> None:
+        self.flush()
+        with self.__lock:
+            executor: ThreadPoolExecutor | None = self.__executor
+            self.__executor = None
+            self.__headers.clear()
+            self.__upcoming = iter(())
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.__stats.clear()
+        self.__directories.clear()
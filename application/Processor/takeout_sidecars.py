@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   takeout_sidecars.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Index of the JSON files that Google Takeout writes next to every
+             photo, with the time the photo was taken.  Takeout often strips
+             the EXIF of the photos, the JSON is then the only date.
+"""
+
+import json, logging, os, re
+from logging import Logger
+
+JSON_SUFFIX: str = ".json"
+# The media name is kept whole in the JSON as its title, the name of the
+# JSON file may be cut by Takeout.
+SUPPLEMENTAL_SUFFIX: str = "supplemental-metadata"
+
+
+class TakeoutSidecars:
+    """
+    # Takeout Sidecars
+
+    The JSON of 'IMG_1234.jpg' is named one of:
+
+     - IMG_1234.jpg.json
+     - IMG_1234.jpg.supplemental-metadata.json, cut to a total of 51
+       characters, e.g. IMG_1234.jpg.supplemental-metad.json
+     - IMG_1234.jpg(1).json for the duplicate IMG_1234(1).jpg
+
+    and an edited copy, IMG_1234-edited.jpg, has the JSON of the original.
+    Each JSON is indexed under the name it was made for and under its
+    title, the original name of the media.
+    """
+
+    __logger: Logger = logging.getLogger(__name__)
+    __counter_pattern: re.Pattern = re.compile(r"^(.*)(\(\d+\))$")
+    __edited_pattern: re.Pattern = re.compile(r"-edited(?=\.[^.]+$)")
+
+    def __init__(self) -> None:
+        # Path of the media -> time it was taken, seconds since the epoch
+        self.__times: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.__times)
+
+    @staticmethod
+    def is_sidecar(filename: str) -> bool:
+        return filename.lower().endswith(JSON_SUFFIX)
+
+    def add(self, directory: str, filename: str, data: bytes) -> bool:
+        """
+        Args:
+            directory (str): Directory of the JSON and of its media
+            filename (str): Name of the JSON file
+            data (bytes): Content of the JSON file
+
+        Returns:
+            bool: True when the JSON has the time a photo was taken
+        """
+
+        try:
+            metadata: dict = json.loads(data)
+            timestamp: float = float(metadata["photoTakenTime"]["timestamp"])
+        except (ValueError, KeyError, TypeError):
+            # The metadata of an album or an unrelated JSON file
+            return False
+        if timestamp <= 0:
+            return False
+
+        self.__times.setdefault(
+            os.path.join(directory, self.__get_media_name(filename)), timestamp
+        )
+        title: object = metadata.get("title")
+        if isinstance(title, str) and title:
+            self.__times.setdefault(os.path.join(directory, title), timestamp)
+        return True
+
+    def get_time(self, filepath: str) -> float | None:
+        """
+        Returns:
+            float | None: Time the photo was taken, seconds since the epoch,
+            None without a JSON
+        """
+
+        timestamp: float | None = self.__times.get(filepath)
+        if timestamp is None:
+            original: str = self.__edited_pattern.sub("", filepath)
+            if original != filepath:
+                timestamp = self.__times.get(original)
+        self.__logger.debug("Takeout time of [%s] is [%s]", filepath, timestamp)
+        return timestamp
+
+    def __get_media_name(self, filename: str) -> str:
+        """
+        Returns:
+            str: Name of the media the JSON was made for
+        """
+
+        stem: str = filename[: -len(JSON_SUFFIX)]
+        match: re.Match | None = self.__counter_pattern.match(stem)
+        counter: str = ""
+        if match:
+            stem, counter = match.group(1), match.group(2)
+
+        base, dot, suffix = stem.rpartition(".")
+        if dot and base and suffix and SUPPLEMENTAL_SUFFIX.startswith(suffix):
+            stem = base
+        if counter:
+            # IMG_1234.jpg(1).json is the JSON of IMG_1234(1).jpg
+            name, dot, extension = stem.rpartition(".")
+            stem = f"{name}{counter}.{extension}" if dot else f"{stem}{counter}"
+        return stem
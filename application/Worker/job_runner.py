@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   job_runner.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Run the pending jobs of the JobQueue with one ProcessImage, so
+             that every job shares the loaded AI models, the inference pool
+             and the prefetcher.  The jobs run one after the other, or
+             interleaved a slice of files at a time so that a short job is
+             not stuck behind a long one.  Each job has its own Worker, with
+             its own progress, metrics and summary.  Jobs added while the
+             queue runs are picked up, also by another process such as
+             run_jobs.py.
+"""
+
+import datetime, logging
+from logging import Logger
+from PySide6.QtCore import QThread, Signal
+from Processor.job_queue import Job, JobQueue, JobState
+from Processor.process_image import ProcessImage
+from Processor.run_metrics import RunMetrics
+from Worker.worker import Worker
+from Helper.cancel_token import CancelToken, Cancelled
+import Helper.memory_profile as memory_profile
+import Helper.tracing as tracing
+
+
+class JobRunner(QThread):
+    """
+    Same controls as the Worker, so that the window can stop, pause and
+    watch either of them.  'progress' is the one of the job that runs,
+    'job_changed' is sent with the id of a job whose state or progress was
+    saved.
+    """
+
+    progress: Signal = Signal(int)
+    log_message: Signal = Signal(str, str)
+    job_changed: Signal = Signal(str)
+    finished: Signal = Signal()
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        process_image: ProcessImage,
+        job_queue: JobQueue,
+        interleave: bool = False,
+        slice_files: int = 25,
+    ) -> None:
+        """
+        Args:
+            process_image (ProcessImage): Shared by all the jobs, with the
+                models loaded when a job describes images
+            job_queue (JobQueue): Jobs to run, the states are saved to it
+            interleave (bool): Run the jobs in turn, slice_files files each
+            slice_files (int): Files of a job between two switches
+        """
+
+        super().__init__()
+        self.__process_image = process_image
+        self.__job_queue = job_queue
+        self.__interleave = interleave
+        self.__slice_files = max(1, slice_files)
+        self.__cancel: CancelToken = CancelToken()
+        self.__worker: Worker = None
+
+    def setStop(self) -> None:
+        self.__cancel.cancel()
+
+    def pause(self) -> None:
+        self.__cancel.pause()
+
+    def resume(self) -> None:
+        self.__cancel.resume()
+
+    def is_paused(self) -> bool:
+        return self.__cancel.is_paused()
+
+    def get_metrics(self) -> RunMetrics | None:
+        """
+        Returns:
+            RunMetrics | None: Metrics of the job that runs
+        """
+        return self.__worker.get_metrics() if self.__worker else None
+
+    ############################################################################
+    # run
+    ############################################################################
+    def run(self):
+        self.log_message.emit("Starting the job queue ...", "default")
+        if not self.__process_image:
+            self.__process_image = ProcessImage()
+        active: list[tuple[Job, Worker]] = []
+        try:
+            while True:
+                self.__cancel.check()
+                self.__pick_up(active)
+                if not active:
+                    break
+                job, worker = active.pop(0)
+                if not self.__run_slice(job, worker):
+                    # The job goes to the end to interleave with the others
+                    active.append((job, worker))
+            self.log_message.emit("Job queue finished.", "default")
+        except Cancelled:
+            self.log_message.emit("User interrupted ...", "error")
+            for job, worker in active:
+                self.__save_progress(job, worker, state=JobState.PENDING)
+        finally:
+            self.__process_image.set_cancel_token(None)
+            trace_file: str | None = tracing.finish()
+            if trace_file:
+                self.log_message.emit(f"Trace written to [{trace_file}]", "default")
+            memory_file: str | None = memory_profile.finish()
+            if memory_file:
+                self.log_message.emit(
+                    f"Memory profile written to [{memory_file}]", "default"
+                )
+
+    def __pick_up(self, active: list[tuple[Job, Worker]]) -> None:
+        """
+        Start the pending jobs, only one at a time when they are not
+        interleaved.
+        """
+
+        for job in self.__job_queue.get_pending():
+            if active and not self.__interleave:
+                return
+            job = self.__job_queue.claim(job.id)
+            if job is None:
+                # Removed, or taken by the queue of another process
+                continue
+            self.job_changed.emit(job.id)
+            self.log_message.emit("hr", "hr")
+            self.log_message.emit(f"Starting job [{job.describe()}]", "header")
+            worker: Worker = Worker(
+                self.__process_image,
+                job.source,
+                job.destination,
+                job.get_worker_options(),
+                cancel=self.__cancel,
+            )
+            worker.log_message.connect(self.log_message)
+            worker.progress.connect(self.progress)
+            active.append((job, worker))
+
+    def __run_slice(self, job: Job, worker: Worker) -> bool:
+        """
+        Returns:
+            bool: True when the job is done or failed
+        """
+
+        self.__worker = worker
+        try:
+            done: bool = worker.run_slice(
+                self.__slice_files if self.__interleave else None
+            )
+        except Cancelled:
+            raise
+        except Exception as e:
+            self.__logger.exception("Job [%s] failed", job.id)
+            self.log_message.emit(f"Job [{job.id}] failed. [{e}]", "error")
+            self.__finish(job, worker, JobState.FAILED)
+            return True
+        if done:
+            self.__finish(job, worker, JobState.DONE)
+        else:
+            self.__save_progress(job, worker)
+        return done
+
+    def __finish(self, job: Job, worker: Worker, state: JobState) -> None:
+        self.log_message.emit(f"Job [{job.id}] {state.value}", "header")
+        self.__save_progress(
+            job,
+            worker,
+            state=state,
+            summary=tuple(worker.finish()),
+            finished=datetime.datetime.now().isoformat(timespec="seconds"),
+        )
+
+    def __save_progress(self, job: Job, worker: Worker, **fields) -> None:
+        files_done, files_total = worker.get_counts()
+        self.__job_queue.update(
+            job.id, files_done=files_done, files_total=files_total, **fields
+        )
+        self.job_changed.emit(job.id)
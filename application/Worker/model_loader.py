@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   model_loader.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Load the AI models on a background thread.  Importing torch and
+             transformers and reading the models takes a minute or more, so
+             it is done after the main window is shown and the progress is
+             sent to the window through signals.  The loading cannot be
+             interrupted, so it runs on a daemon thread that does not hold
+             the application open when the window is closed.
+"""
+
+import logging, threading
+from logging import Logger
+from PySide6.QtCore import QObject, Signal
+from Processor.process_image import ProcessImage
+
+
+class ModelLoader(QObject):
+    """
+    Log in to Hugging Face, then import and load every AI model.  Emits
+    'loaded' with the ready ProcessImage, or 'failed' with the error.  The
+    signals are delivered on the thread of the connected window.
+    """
+
+    progress: Signal = Signal(str, int)
+    loaded: Signal = Signal(object)
+    failed: Signal = Signal(str)
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(self, huggingface_token: str | None) -> None:
+        super().__init__()
+        self.__huggingface_token = huggingface_token
+        self.__thread: threading.Thread = None
+
+    def start(self) -> None:
+        self.__thread = threading.Thread(
+            target=self.__run, name="model-loader", daemon=True
+        )
+        self.__thread.start()
+
+    def isRunning(self) -> bool:
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def __run(self) -> None:
+        try:
+            if self.__huggingface_token:
+                self.progress.emit("Logging in to Hugging Face", 0)
+                from huggingface_hub import login
+
+                login(token=self.__huggingface_token)
+
+            process_image: ProcessImage = ProcessImage()
+            process_image.post_process(self.progress.emit)
+            self.progress.emit("AI models are ready", 100)
+            self.loaded.emit(process_image)
+        except Exception as e:
+            self.__logger.exception("Could not load the AI models")
+            self.failed.emit(str(e))
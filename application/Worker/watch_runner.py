@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   watch_runner.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Process the new images of a watched folder as they arrive, a
+             small batch at a time.  One Worker is kept for the whole watch,
+             so that the AI models, the storage and the metrics are not
+             set up again for every batch.
+"""
+
+import logging
+from logging import Logger
+from PySide6.QtCore import QThread, Signal
+from MainWindow.processing_options import ProcessingOptions
+from Processor.folder_watcher import FolderWatcher
+from Processor.process_directory import ProcessDirectory
+from Processor.process_image import ProcessImage
+from Processor.run_metrics import RunMetrics
+from Worker.worker import Worker
+from Helper.cancel_token import CancelToken, Cancelled
+import Helper.memory_profile as memory_profile
+import Helper.tracing as tracing
+
+
+class WatchRunner(QThread):
+    """
+    Same controls as the Worker, so that the window can stop, pause and
+    watch either of them.  The watch runs until it is stopped.
+    """
+
+    progress: Signal = Signal(int)
+    log_message: Signal = Signal(str, str)
+    finished: Signal = Signal()
+
+    __logger: Logger = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        process_image: ProcessImage,
+        root: str,
+        move_dir: str,
+        options: dict,
+        settle: float = 2.0,
+        batch_files: int = 25,
+        existing: bool = False,
+        poll: bool = False,
+    ) -> None:
+        """
+        Args:
+            process_image (ProcessImage): With the models loaded when the
+                images are described
+            root (str): Folder to watch
+            move_dir (str): Directory the files are moved or copied to
+            options (dict): Options of the Worker
+            settle (float): Seconds the size and the modified time of a new
+                file must stay the same before it is processed
+            batch_files (int): Files processed at most between two checks
+                for new files
+            existing (bool): Also process the files already in the folder
+            poll (bool): Poll the folder instead of using inotify
+        """
+
+        super().__init__()
+        self.__process_image = process_image
+        self.__root = root
+        self.__move_dir = move_dir
+        self.__options = options
+        self.__settle = settle
+        self.__batch_files = max(1, batch_files)
+        self.__existing = existing
+        self.__poll = poll
+        self.__cancel: CancelToken = CancelToken()
+        self.__worker: Worker = None
+
+    def setStop(self) -> None:
+        self.__cancel.cancel()
+
+    def pause(self) -> None:
+        self.__cancel.pause()
+
+    def resume(self) -> None:
+        self.__cancel.resume()
+
+    def is_paused(self) -> bool:
+        return self.__cancel.is_paused()
+
+    def get_metrics(self) -> RunMetrics | None:
+        return self.__worker.get_metrics() if self.__worker else None
+
+    ############################################################################
+    # run
+    ############################################################################
+    def run(self):
+        if not self.__process_image:
+            self.__process_image = ProcessImage()
+        watcher: FolderWatcher = FolderWatcher(
+            self.__root,
+            self.__options[ProcessingOptions.RECURSE_DIRECTORY.name],
+            ProcessDirectory()._is_valid_image,
+            self.__settle,
+            use_inotify=not self.__poll,
+        )
+        self.__worker = Worker(
+            self.__process_image,
+            self.__root,
+            self.__move_dir,
+            self.__options,
+            cancel=self.__cancel,
+        )
+        self.__worker.log_message.connect(self.log_message)
+        self.__worker.progress.connect(self.progress)
+        try:
+            watcher.start(self.__existing)
+            self.log_message.emit(
+                f"Watching [{self.__root}] for new images "
+                f"({'inotify' if watcher.is_inotify() else 'polling'}) ...",
+                "header",
+            )
+            while True:
+                self.__cancel.check()
+                # Short waits, a stop is seen within a second
+                filepaths: list[str] = watcher.wait(1.0, self.__batch_files)
+                if not filepaths:
+                    continue
+                self.__worker.add_files(filepaths)
+                try:
+                    self.__worker.run_slice()
+                finally:
+                    # The renamed files must not come back as new files
+                    watcher.ignore(self.__worker.pop_results())
+        except Cancelled:
+            self.log_message.emit("Stopped watching.", "default")
+        except Exception as e:
+            self.__logger.exception("Watching [%s] failed", self.__root)
+            self.log_message.emit(f"Watching [{self.__root}] failed. [{e}]", "error")
+        finally:
+            watcher.close()
+            self.__worker.finish()
+            self.__process_image.set_cancel_token(None)
+            trace_file: str | None = tracing.finish()
+            if trace_file:
+                self.log_message.emit(f"Trace written to [{trace_file}]", "default")
+            memory_file: str | None = memory_profile.finish()
+            if memory_file:
+                self.log_message.emit(
+                    f"Memory profile written to [{memory_file}]", "default"
+                )
@@ -7,12 +7,25 @@
 @Contact :   sgs@sunilsamuel.com
 """
 
-import logging
+import itertools, logging, time
 from logging import Logger
+from typing import Iterable
 from PySide6.QtCore import QThread, Signal
 from Processor.process_directory import ProcessDirectory
+from Processor.file_queue import FileQueue, FileState
+from Processor.metadata_pool import MetadataPool, MetadataResult
 from Processor.process_image import ProcessImage
+from Processor.run_metrics import RunMetrics, format_snapshot
+from Processor.storage import Storage, get_storage
 from MainWindow.processing_options import ProcessingOptions
+from Helper.cancel_token import CancelToken, Cancelled
+import Helper.memory_profile as memory_profile
+import Helper.metrics_endpoint as metrics_endpoint
+import Helper.tracing as tracing
+
+# Fewer pending files than this are processed in this process without the AI
+# description, the MetadataPool would take longer to start than to run them.
+METADATA_POOL_MIN_FILES: int = 64
 
 
 class Worker(QThread):
@@ -25,16 +38,31 @@ class Worker(QThread):
     log_message: Signal = Signal(str, str)
     finished: Signal = Signal()
 
-    # Lazy loading to show splash page
-    __process_image: ProcessImage = ProcessImage()
+    # Created in run when the window did not provide one
+    __process_image: ProcessImage = None
 
-    # This flag is used to stop the worker while it's running.
-    __is_running = True
+    # Stops or pauses the worker while it's running, checked between files,
+    # at every stage of a file and by the AI models after every token.
+    __cancel: CancelToken = None
 
     __dir: str = None
     __move_dir: str = None
     __options: dict[str, bool] = None
-    __logger: Logger = logging.getLogger(__file__)
+    # Files of the directory, None until the scan of the first slice
+    __file_queue: FileQueue = None
+    # Files the AI skipped, reported by finish
+    __skipped: dict[str, str] = None
+    # New paths of the processed files once add_files is used, see
+    # pop_results
+    __results: list[str] | None = None
+    # File system calls of the run, see ProcessingOptions.NETWORK_STORAGE
+    __storage: Storage = None
+    # Status of each processing step for the current file, used for the
+    # per-file summary log record.
+    __file_status: list[str] = None
+    # Rolling metrics of the current run, read by the window
+    __metrics: RunMetrics = None
+    __logger: Logger = logging.getLogger(__name__)
 
     def __init__(
         self,
@@ -42,15 +70,91 @@ class Worker(QThread):
         dir: str,
         move_dir: str,
         options: dict[str, bool],
+        cancel: CancelToken | None = None,
     ) -> None:
+        """
+        Args:
+            cancel (CancelToken | None): Token shared with other workers, e.g.
+                the jobs of a JobRunner, a new one when not given
+        """
         super().__init__()
         self.__dir = dir
         self.__move_dir = move_dir
         self.__options = options
         self.__process_image = process_image
+        self.__cancel = cancel or CancelToken()
+        self.__file_queue = None
+        self.__skipped = {}
+        self.__results = None
 
     def setStop(self) -> None:
-        self.__is_running = False
+        self.__cancel.cancel()
+
+    def pause(self) -> None:
+        """
+        Pause at the next cancellation point.  The models, the queue and
+        the prefetched images stay in memory so that resume continues at
+        once.
+        """
+        self.__cancel.pause()
+
+    def resume(self) -> None:
+        self.__cancel.resume()
+
+    def is_paused(self) -> bool:
+        return self.__cancel.is_paused()
+
+    def get_metrics(self) -> RunMetrics | None:
+        """
+        Returns:
+            RunMetrics | None: Metrics of the run, None before the scan
+        """
+        return self.__metrics
+
+    def get_counts(self) -> tuple[int, int]:
+        """
+        Returns:
+            tuple[int, int]: Files processed and files found, (0, 0) before
+            the scan
+        """
+        if self.__file_queue is None:
+            return 0, 0
+        return (
+            len(self.__file_queue) - self.__file_queue.count(FileState.PENDING),
+            len(self.__file_queue),
+        )
+
+    def add_files(self, filepaths: Iterable[str]) -> int:
+        """
+        Queue files for the next run_slice instead of scanning the
+        directory, e.g. the new files of a watched folder.  The storage and
+        the metrics of the run are kept from one call to the next.
+
+        Returns:
+            int: Number of files added
+        """
+
+        if self.__file_queue is None:
+            self.__scan(FileQueue())
+            self.__results = []
+        count: int = 0
+        for filepath in filepaths:
+            self.__file_queue.append(filepath)
+            count += 1
+        self.__metrics.add_files(count)
+        return count
+
+    def pop_results(self) -> list[str]:
+        """
+        Returns:
+            list[str]: New path of each file processed since the last call,
+            only for the files given to add_files
+        """
+
+        rval: list[str] = self.__results or []
+        if self.__results is not None:
+            self.__results = []
+        return rval
 
     def run(self):
         """
@@ -58,37 +162,273 @@ class Worker(QThread):
         """
 
         self.log_message.emit("Starting background task...", "default")
+        try:
+            self.run_slice()
+        except Cancelled:
+            self.log_message.emit("User interrupted ...", "error")
+        finally:
+            if self.__process_image:
+                self.__process_image.set_cancel_token(None)
+            trace_file: str | None = tracing.finish()
+            if trace_file:
+                self.log_message.emit(f"Trace written to [{trace_file}]", "default")
+            memory_file: str | None = memory_profile.finish()
+            if memory_file:
+                self.log_message.emit(
+                    f"Memory profile written to [{memory_file}]", "default"
+                )
+            self.finish()
+
+    ############################################################################
+    # run_slice
+    ############################################################################
+    def run_slice(self, limit: int | None = None) -> bool:
+        """
+        Process the next pending files, the directory is scanned on the
+        first call.  The JobRunner interleaves its jobs with it.  Without
+        the AI description all the files are processed in one slice by the
+        MetadataPool, unless the storage cannot be shared by its processes
+        or there are only a few files.
+
+        Args:
+            limit (int | None): Files of the slice, None for all
+
+        Raises:
+            Cancelled: The run was cancelled
+
+        Returns:
+            bool: True when no file is pending anymore
+        """
+
+        if self.__file_queue is None:
+            self.__scan()
+        self.__process_image.set_cancel_token(self.__cancel)
+        self.__process_image.set_storage(self.__storage)
+
+        classify: bool = self.__options[ProcessingOptions.CLASSIFY_IMAGE.name]
+        if (
+            not classify
+            and self.__storage.supports_processes()
+            and self.__file_queue.count(FileState.PENDING) >= METADATA_POOL_MIN_FILES
+        ):
+            self.__run_metadata_only(self.__file_queue)
+        else:
+            # The done files before the first pending one are not walked
+            # again, a watched folder keeps adding to the queue
+            start: int = self.__file_queue.first_pending() or 0
+            files: list[tuple[int, str]] = list(
+                itertools.islice(self.__file_queue.iter_pending(start), limit)
+            )
+            self.__storage.prefetch(filename for _, filename in files)
+            if classify:
+                # Work on the upcoming images while the current one is
+                # processed.
+                self.__process_image.start_prefetch(
+                    [filename for _, filename in files],
+                    self.__options["ai_level"],
+                    self.__options.get(ProcessingOptions.OCR_TEXT.name, False),
+                    self.__options.get(ProcessingOptions.OBJECT_LABELS.name, False),
+                )
+            try:
+                self.__run_sequential(files)
+            finally:
+                self.__process_image.stop_prefetch()
+                self.__skipped.update(self.__process_image.pop_skipped())
+                # The queued renames are done before the next job runs
+                self.__storage.flush()
+
+        if self.__file_queue.first_pending() is not None:
+            return False
+        self.log_message.emit("Background task finished.", "default")
+        return True
+
+    def finish(self) -> list[str]:
+        """
+        Report the files that the AI skipped and the summary of the run.
+
+        Returns:
+            list[str]: The lines of the summary, none before the scan
+        """
+
+        self.__emit_skipped(self.__skipped)
+        self.__skipped = {}
+        if self.__storage:
+            self.__storage.close()
+        if not self.__metrics:
+            return []
+        # The summary of the run, also for runs without a window
+        lines: list[str] = format_snapshot(self.__metrics.snapshot())
+        for line in lines:
+            self.__logger.info("Run summary: %s", line)
+            self.log_message.emit(line, "default")
+        return lines
+
+    def __scan(self, file_queue: FileQueue | None = None) -> None:
+        """
+        Args:
+            file_queue (FileQueue | None): Files to process, the files of the
+                directory when not given
+        """
 
         if not self.__process_image:
             self.__process_image = ProcessImage()
-
-        file_list: list[str] = list(
-            ProcessDirectory().pre_process_directory(
-                self.__dir, self.__options[ProcessingOptions.RECURSE_DIRECTORY.name]
+        # Serves until the application exits when a port is configured
+        port: int | None = metrics_endpoint.start()
+        if port:
+            self.log_message.emit(
+                f"Metrics on [http://127.0.0.1:{port}/metrics]", "default"
             )
+
+        self.__storage = get_storage(
+            self.__options.get(ProcessingOptions.NETWORK_STORAGE.name, False),
+            (self.__dir, self.__move_dir),
         )
-        total_files: int = len(file_list)
+        if file_queue is not None:
+            self.__file_queue = file_queue
+        else:
+            with tracing.span("Worker.scan", "worker", directory=self.__dir):
+                directory: ProcessDirectory = ProcessDirectory(self.__storage)
+                self.__file_queue = directory.build_file_queue(
+                    self.__dir, self.__options[ProcessingOptions.RECURSE_DIRECTORY.name]
+                )
+        total_files: int = len(self.__file_queue)
         self.log_message.emit(f"Total files = [{total_files}]", "default")
+        self.__metrics = RunMetrics(
+            total_files,
+            cache_stats=self.__process_image.get_cache_stats,
+            queue_depths=self.__process_image.get_queue_depths,
+        )
 
-        for index, filename in enumerate(file_list):
-            if not self.__is_running:
-                self.log_message.emit("User interrupted ...", "error")
-                return
+    def __run_sequential(self, files: Iterable[tuple[int, str]]) -> None:
+        total_files: int = len(self.__file_queue)
+        for index, filename in files:
+            # Waits here while paused, raises Cancelled once stopped
+            self.__cancel.check()
 
             self.log_message.emit("hr", "hr")
 
             self.log_message.emit(f"Processing File [{filename}]", "header")
-            self.__process_image.init(filename)
-            self.__process_move_files(filename)
-            self.__process_classify_image(filename)
-            self.__process_created_date(filename)
+            start_time: float = time.perf_counter()
+            self.__file_status = []
+            nbytes: int = self.__get_size(filename)
+            try:
+                with tracing.span("Worker.file", "worker", file=filename):
+                    with self.__metrics.stage("Read"):
+                        self.__process_image.init(filename)
+                    with self.__metrics.stage("Move/Copy File"):
+                        self.__process_move_files(filename)
+                    with self.__metrics.stage("Classify Image"):
+                        self.__process_classify_image(filename)
+                    with self.__metrics.stage("Created Date"):
+                        self.__process_created_date(filename)
+            except Cancelled:
+                raise
+            except Exception as e:
+                # e.g. removed or renamed since it was queued, the other
+                # files of the run are still processed
+                self.__logger.exception("Could not process file [%s]", filename)
+                self.__emit_process_status(
+                    False, "", f"Could not process file [{filename}]. [{e}]", "Read"
+                )
+                self.__file_queue.set_state(index, FileState.FAILED)
+                self.progress.emit(index / total_files * 100)
+                continue
+            self.__file_queue.set_state(index, FileState.DONE)
+            self.__metrics.file_done(nbytes)
+            if self.__results is not None:
+                self.__results.append(self.__process_image.get_filepath())
 
             self.log_message.emit(f"Processing file {filename}", "default")
-            self.__logger.info(f"Processing file [{filename}]")
+            self.__logger.info(
+                "Processed file [%s] => [%s] date [%s] from [%s] steps [%s] in [%.3f]s",
+                filename,
+                self.__process_image.get_filepath(),
+                self.__process_image.get_created_date(),
+                self.__process_image.get_date_source(),
+                ", ".join(self.__file_status),
+                time.perf_counter() - start_time,
+            )
             self.progress.emit(index / total_files * 100)
 
-        self.log_message.emit("Background task finished.", "default")
+    ############################################################################
+    # __run_metadata_only
+    ############################################################################
+    def __run_metadata_only(self, file_queue: FileQueue) -> None:
+        """
+        Without the AI description, the files are processed in parallel by
+        the MetadataPool.  The results come back in queue order and are
+        reported the same way as in the sequential loop.
+        """
+
+        total_files: int = len(file_queue)
+        metadata_pool: MetadataPool = MetadataPool(
+            self.__options, self.__move_dir, source_dir=self.__dir
+        )
+        self.log_message.emit(
+            f"Metadata only mode with [{metadata_pool.get_workers()}] processes",
+            "default",
+        )
+
+        results = metadata_pool.run(file_queue)
+        try:
+            for result in results:
+                self.__cancel.check()
+                self.__emit_metadata_result(result)
+                self.__metrics.record_stage("Metadata", result.elapsed)
+                self.__metrics.file_done(result.size)
+                if self.__results is not None:
+                    self.__results.append(result.filepath)
+                file_queue.set_state(
+                    result.index,
+                    (
+                        FileState.DONE
+                        if all(flag for _, flag, _ in result.steps)
+                        else FileState.FAILED
+                    ),
+                )
+                self.progress.emit(result.index / total_files * 100)
+        finally:
+            # Closing the generator shuts the process pool down.
+            results.close()
 
+    def __emit_skipped(self, skipped: dict[str, str]) -> None:
+        if not skipped:
+            return
+        self.log_message.emit(
+            f"Skipped [{len(skipped)}] images that were too large or too slow",
+            "error",
+        )
+        for filepath, reason in skipped.items():
+            self.__logger.warning("Skipped file [%s]. [%s]", filepath, reason)
+            self.log_message.emit(f"Skipped [{filepath}]. {reason}", "error")
+
+    def __get_size(self, filepath: str) -> int:
+        return self.__storage.get_size(filepath)
+
+    @tracing.traced("worker")
+    def __emit_metadata_result(self, result: MetadataResult) -> None:
+        self.__file_status = []
+        self.log_message.emit(f"Processing File [{result.filename}]", "header")
+        for process_name, flag, new_filename in result.steps:
+            if process_name == "Created Date":
+                self.__emit_created_date_status(result.filename, flag, new_filename)
+            elif process_name == "Move/Copy File":
+                self.__emit_move_files_status(result.filename, flag, new_filename)
+            else:
+                self.__emit_process_status(
+                    flag, "", f"Could not process file [{new_filename}]", process_name
+                )
+        self.__logger.info(
+            "Processed file [%s] => [%s] date [%s] from [%s] steps [%s] in [%.3f]s",
+            result.filename,
+            result.filepath,
+            result.created_date,
+            result.date_source,
+            ", ".join(self.__file_status),
+            result.elapsed,
+        )
+
+    @tracing.traced("worker")
     def __process_created_date(self, filename: str) -> None:
         create_date: bool = self.__options[ProcessingOptions.CREATED_DATE.name]
         self.log_message.emit(
@@ -96,19 +436,27 @@ class Worker(QThread):
         )
         if create_date:
             flag, new_filename = self.__process_image.process_created_date()
-            self.__emit_process_status(
-                flag,
-                f"Successfully renamed file [{filename}] to [{new_filename}]",
-                f"File [{new_filename}] already has date.  Therefore, not processing file.",
-                "Created Date",
-            )
+            self.__emit_created_date_status(filename, flag, new_filename)
 
+    def __emit_created_date_status(
+        self, filename: str, flag: bool, new_filename: str
+    ) -> None:
+        self.__emit_process_status(
+            flag,
+            f"Successfully renamed file [{filename}] to [{new_filename}]",
+            f"File [{new_filename}] already has date.  Therefore, not processing file.",
+            "Created Date",
+        )
+
+    @tracing.traced("worker")
     def __process_classify_image(self, filename: str) -> None:
         classify_image: bool = self.__options[ProcessingOptions.CLASSIFY_IMAGE.name]
         self.log_message.emit(f"Process Classify Image -[{classify_image}]", "default")
         if classify_image:
             flag, description = self.__process_image.process_classify_image_to_text(
-                self.__options["ai_level"]
+                self.__options["ai_level"],
+                self.__options.get(ProcessingOptions.OCR_TEXT.name, False),
+                self.__options.get(ProcessingOptions.OBJECT_LABELS.name, False),
             )
             self.__emit_process_status(
                 flag,
@@ -117,6 +465,7 @@ class Worker(QThread):
                 "Classify Image",
             )
 
+    @tracing.traced("worker")
     def __process_move_files(self, filename: str) -> None:
         process_file: bool = (
             self.__options[ProcessingOptions.MOVE_FILES.name]
@@ -130,16 +479,26 @@ class Worker(QThread):
                 self.__move_dir,
                 self.__options[ProcessingOptions.CREATE_MONTH_FOLDER.name],
             )
-            self.__emit_process_status(
-                flag,
-                f"Successfully moved/copied file [{filename}] to [{new_filename}]",
-                f"Could not move/copy file [{filename}] with error [{new_filename}]",
-                "Move/Copy File",
-            )
+            self.__emit_move_files_status(filename, flag, new_filename)
+
+    def __emit_move_files_status(
+        self, filename: str, flag: bool, new_filename: str
+    ) -> None:
+        self.__emit_process_status(
+            flag,
+            f"Successfully moved/copied file [{filename}] to [{new_filename}]",
+            f"Could not move/copy file [{filename}] with error [{new_filename}]",
+            "Move/Copy File",
+        )
 
     def __emit_process_status(
         self, process_status: bool, msg_success: str, msg_fail: str, process_name: str
     ) -> None:
+        if not process_status:
+            self.__metrics.record_error(process_name)
+        self.__file_status.append(
+            f"{process_name}={'ok' if process_status else 'failed'}"
+        )
         if process_status:
             self.log_message.emit(f"{process_name} -> {msg_success}", "default")
         else:
@@ -13,9 +13,10 @@
              according to the age of the image.
 """
 
-import sys, logging, os, time
+import sys, logging, os
 from logging import Logger
 import Helper.file_to_string as helper
+import Helper.log_config as log_config
 from MainWindow.new_window import MainWindow
 
 from PySide6.QtCore import Qt
@@ -26,13 +27,9 @@ from PySide6.QtGui import QPixmap
 import resources_rc
 
 if __name__ == "__main__":
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(name)s - %(funcName)s - %(message)s",
-        filename="image_processor.log",
-        # Remove the file, if it exists.
-        filemode="w",
-    )
+    # Log records are written to the file by a background thread.  The file
+    # is overwritten on every start.
+    log_config.setup_logging("image_processor.log")
 
     logger: Logger = logging.getLogger(__name__)
     root_dir: str = os.path.dirname(__file__)
@@ -63,14 +60,16 @@ if __name__ == "__main__":
         Qt.GlobalColor.black,
     )
     app.processEvents()
-    time.sleep(2)
 
     app.setStyleSheet(
         helper.read_style_file_from_resource(":/app_stylesheet.qss", logger)
     )
     main_app: MainWindow = MainWindow(root_dir)
     main_app.show()
-    main_app.post_process()
     splash.finish(main_app.get_window())
+    # The AI models are loaded in the background, see the status bar.
+    main_app.post_process()
 
-    sys.exit(app.exec())
+    exit_code: int = app.exec()
+    log_config.shutdown_logging()
+    sys.exit(exit_code)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   auto_tune.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Calibrate the AI models for this machine.  Every backend is run
+             on a few sample images while sweeping the torch thread count
+             and the number of inference worker processes.  The best
+             setting of each backend is stored in the configuration
+             directory, per machine and set of models, and is loaded by the
+             application on every start.
+
+             python auto_tune.py sample1.jpg sample2.jpg sample3.jpg
+"""
+
+import argparse, logging, sys
+from logging import Logger
+import Helper.log_config as log_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="+", help="Sample images")
+    parser.add_argument(
+        "--min-images",
+        type=int,
+        default=8,
+        help="Images processed per trial, the samples are repeated if needed",
+    )
+    args = parser.parse_args()
+
+    log_config.setup_logging("auto_tune.log")
+    logger: Logger = logging.getLogger(__name__)
+    # Show the progress of the trials on the console as well
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    from Processor.AIProessor.image_to_text import ImageToText
+
+    try:
+        image_to_text: ImageToText = ImageToText()
+        filename: str = image_to_text.auto_tune(args.images, args.min_images)
+        for name, config in image_to_text.get_tuning().items():
+            logger.info("[%s] => [%s]", name, config)
+        logger.info("Tuning saved to [%s]", filename)
+    finally:
+        log_config.shutdown_logging()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   prepare_models.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Prepare the AI models for fast and offline loading.  Every model
+             is downloaded once and saved in the configuration directory (or
+             IMAGE_PROCESSOR_MODELS) as safetensors in the dtype used at run
+             time, with its processors and its remote code.  The application
+             then loads the snapshots without the network, and without
+             converting the weights.  Run again to refresh the snapshots.
+
+             python prepare_models.py
+             python prepare_models.py --dtype float32 --backends ClipProcessor
+"""
+
+import argparse, logging, sys
+from logging import Logger
+import Helper.log_config as log_config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--dtype",
+        choices=("float32", "float16", "bfloat16"),
+        help="Defaults to float16 with a GPU and float32 otherwise",
+    )
+    parser.add_argument(
+        "--backends", nargs="+", help="Class names of the backends to prepare"
+    )
+    args = parser.parse_args()
+
+    log_config.setup_logging("prepare_models.log")
+    logger: Logger = logging.getLogger(__name__)
+    logging.getLogger().addHandler(logging.StreamHandler(sys.stdout))
+
+    import torch
+    from Processor.AIProessor import model_snapshot
+    from Processor.AIProessor.automodel_llm import AutomodelLLM
+    from Processor.AIProessor.clip_processor import ClipProcessor
+    from Processor.AIProessor.huggingface_pipeline import HuggingFacePipeline
+
+    try:
+        device: str = "cpu"
+        if torch.cuda.is_available():
+            device = "cuda"
+        elif torch.backends.mps.is_available():
+            device = "mps"
+        dtype: str = args.dtype or model_snapshot.get_default_dtype(device)
+
+        for backend in (HuggingFacePipeline, ClipProcessor, AutomodelLLM):
+            if args.backends and backend.__name__ not in args.backends:
+                continue
+            logger.info("Preparing [%s] as [%s]", backend.__name__, dtype)
+            for snapshot_dir in backend.prepare_snapshot(dtype):
+                logger.info("Snapshot [%s]", snapshot_dir)
+        logger.info("Models saved to [%s]", model_snapshot.get_snapshot_root())
+    finally:
+        log_config.shutdown_logging()
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+@File    :   run_jobs.py
+@Time    :   2026/10/19
+@Author  :   Sunil Samuel
+@Version :   1.0
+@Contact :   sgs@sunilsamuel.com
+@Desc    :   Edit and run the job queue without the window.  The queue is the
+             one of the window, kept in the configuration directory.  The AI
+             models are loaded once and shared by all the jobs.
+
+             python run_jobs.py add ~/Pictures/2019 --destination ~/Sorted --move
+             python run_jobs.py add ~/Pictures/scans --no-ai
+             python run_jobs.py add s3://photos/2019 --destination s3://sorted --move
+             python run_jobs.py add takeout-001.zip --destination ~/Sorted --copy
+             python run_jobs.py list
+             python run_jobs.py run --interleave
+             python run_jobs.py watch ~/Uploads --destination ~/Sorted --move
+"""
+
+import argparse, signal, sys
+import Helper.log_config as log_config
+from MainWindow.processing_options import ProcessingOptions
+from Processor.job_queue import JobQueue
+from Processor.storage import is_archive, is_object_path
+
+
+def get_options(args: argparse.Namespace) -> dict[str, bool]:
+    """
+    Returns:
+        dict[str, bool]: ProcessingOptions of the 'add' and 'watch' arguments
+    """
+
+    return {
+        ProcessingOptions.CREATED_DATE.name: not args.no_date,
+        ProcessingOptions.RECURSE_DIRECTORY.name: not args.no_recurse,
+        ProcessingOptions.MOVE_FILES.name: args.move,
+        ProcessingOptions.COPY_FILES.name: args.copy,
+        ProcessingOptions.CREATE_MONTH_FOLDER.name: args.month_folder,
+        ProcessingOptions.CLASSIFY_IMAGE.name: not args.no_ai,
+        ProcessingOptions.OCR_TEXT.name: args.ocr and not args.no_ai,
+        ProcessingOptions.OBJECT_LABELS.name: args.objects and not args.no_ai,
+        ProcessingOptions.NETWORK_STORAGE.name: args.network,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Processing arguments of 'add' and 'watch'
+    processing = argparse.ArgumentParser(add_help=False)
+    processing.add_argument(
+        "--destination", default="", help="Directory the files are moved to"
+    )
+    transfer = processing.add_mutually_exclusive_group()
+    transfer.add_argument("--move", action="store_true", help="Move the files")
+    transfer.add_argument("--copy", action="store_true", help="Copy the files")
+    processing.add_argument(
+        "--month-folder",
+        action="store_true",
+        help="Create a month folder inside the year folder",
+    )
+    processing.add_argument("--no-ai", action="store_true", help="No AI description")
+    processing.add_argument(
+        "--level",
+        type=int,
+        choices=(0, 1, 2),
+        default=2,
+        help="Detail of the description, 0 brief to 2 full",
+    )
+    processing.add_argument(
+        "--ocr", action="store_true", help="Add the text of the image"
+    )
+    processing.add_argument(
+        "--objects", action="store_true", help="Add the objects of the image"
+    )
+    processing.add_argument(
+        "--no-recurse", action="store_true", help="Skip the sub-folders"
+    )
+    processing.add_argument(
+        "--no-date", action="store_true", help="Do not add the created date"
+    )
+    processing.add_argument(
+        "--network",
+        action="store_true",
+        help="The directories are on a NAS or a network share",
+    )
+
+    add = commands.add_parser(
+        "add", parents=[processing], help="Add a job to the queue"
+    )
+    add.add_argument(
+        "source", help="Directory of the images, or a zip or a tar archive"
+    )
+
+    commands.add_parser("list", help="List the jobs")
+    remove = commands.add_parser("remove", help="Remove jobs")
+    remove.add_argument("ids", nargs="+", help="Ids of the jobs")
+    commands.add_parser("clear", help="Remove the done and failed jobs")
+
+    run = commands.add_parser("run", help="Run the pending jobs")
+    run.add_argument(
+        "--interleave",
+        action="store_true",
+        help="Run the jobs in turn instead of one after the other",
+    )
+    run.add_argument(
+        "--slice",
+        type=int,
+        default=25,
+        help="Files of a job between two switches when interleaved",
+    )
+
+    watch = commands.add_parser(
+        "watch",
+        parents=[processing],
+        help="Process the new images of a folder as they arrive",
+    )
+    watch.add_argument("source", help="Directory to watch")
+    watch.add_argument(
+        "--settle",
+        type=float,
+        default=2.0,
+        help="Seconds a new file must stay the same before it is processed",
+    )
+    watch.add_argument(
+        "--batch",
+        type=int,
+        default=25,
+        help="Files processed at most between two checks for new files",
+    )
+    watch.add_argument(
+        "--existing",
+        action="store_true",
+        help="Also process the images already in the directory",
+    )
+    watch.add_argument(
+        "--poll", action="store_true", help="Poll the directory instead of inotify"
+    )
+    args = parser.parse_args()
+
+    log_config.setup_logging("run_jobs.log")
+    job_queue: JobQueue = JobQueue()
+
+    try:
+        if args.command in ("add", "watch"):
+            if (args.move or args.copy) and not args.destination:
+                parser.error("--move and --copy need a --destination")
+        if args.command == "add":
+            if is_archive(args.source) and not (args.move or args.copy):
+                # The files of an archive cannot be renamed in place
+                parser.error("An archive needs --copy and a --destination")
+            job = job_queue.add(
+                args.source, args.destination, get_options(args), args.level
+            )
+            print(job.describe())
+        elif args.command == "watch":
+            if is_archive(args.source) or is_object_path(args.source):
+                # Only a local or a mounted directory has change events
+                parser.error("Only a directory can be watched")
+            # Imported here so that editing the queue does not need Qt
+            from Processor.process_image import ProcessImage
+            from Worker.watch_runner import WatchRunner
+
+            options: dict = {**get_options(args), "ai_level": args.level}
+            process_image: ProcessImage = ProcessImage()
+            if options[ProcessingOptions.CLASSIFY_IMAGE.name]:
+                process_image.post_process(
+                    lambda message, percent: print(f"[{percent:3}%] {message}")
+                )
+            watcher: WatchRunner = WatchRunner(
+                process_image,
+                args.source,
+                args.destination,
+                options,
+                args.settle,
+                args.batch,
+                args.existing,
+                args.poll,
+            )
+            watcher.log_message.connect(
+                lambda message, type: print(message) if type != "hr" else None
+            )
+            # Ctrl-C stops within a second, after the file being processed
+            signal.signal(signal.SIGINT, lambda *_: watcher.setStop())
+            watcher.run()
+        elif args.command == "list":
+            for job in job_queue.get_jobs():
+                print(job.describe())
+                for line in job.summary:
+                    print(f"    {line}")
+        elif args.command == "remove":
+            for job_id in args.ids:
+                if not job_queue.remove(job_id):
+                    print(f"No job [{job_id}]", file=sys.stderr)
+        elif args.command == "clear":
+            print(f"Removed [{job_queue.clear_finished()}] jobs")
+        else:
+            # Imported here so that editing the queue does not need Qt
+            from Processor.process_image import ProcessImage
+            from Worker.job_runner import JobRunner
+
+            process_image: ProcessImage = ProcessImage()
+            if any(
+                job.options.get(ProcessingOptions.CLASSIFY_IMAGE.name)
+                for job in job_queue.get_pending()
+            ):
+                process_image.post_process(
+                    lambda message, percent: print(f"[{percent:3}%] {message}")
+                )
+            runner: JobRunner = JobRunner(
+                process_image, job_queue, args.interleave, args.slice
+            )
+            runner.log_message.connect(
+                lambda message, type: print(message) if type != "hr" else None
+            )
+            # Ctrl-C stops at the next cancellation point, the running jobs
+            # are pending again
+            signal.signal(signal.SIGINT, lambda *_: runner.setStop())
+            # Runs on this thread, there is no event loop to wait on
+            runner.run()
+    finally:
+        log_config.shutdown_logging()